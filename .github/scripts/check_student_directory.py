@@ -4,30 +4,57 @@
 Behavior:
  - Reads `students/students.csv` from the repo root and maps Github Username -> Directory.
  - Uses the GitHub event payload (environment variable GITHUB_EVENT_PATH) to get PR author and changed files.
+ - Changed files come from `git diff --name-only base...head` when both commits are present
+   locally, otherwise from the GitHub API (CHANGED_FILES_PROVIDER=auto|git|api).
  - If any changed file is outside the allowed directory for the author, exit with code 2.
  - If author cannot be mapped, exit with code 3 (manual check required).
  - If any changed file inside the student's directory is not inside a `task_*` folder,
      exit with code 5 (only task folders are permitted).
 
-This script is intentionally small and dependency-free.
+Batch mode (`--all-open-prs` or `--pr-list 101,102`) loads the roster and whitelist once,
+fetches PR objects and file lists concurrently and writes one result per PR to
+CHECK_RESULTS_PATH (same schema as check_result.json, keyed by PR number).
+
+The git provider needs only the standard library (plus roster.py for students.csv);
+the API provider, workflow_dispatch PR lookups and batch mode use github_client.py,
+which requires `requests`.
 """
-import csv
+import argparse
 import json
 import os
+import subprocess
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from roster import load_roster
+
 try:
     import requests
+    from github_client import shared_client
 except ImportError:
     requests = None
+    shared_client = None
 
 
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 STUDENTS_CSV = os.path.join(REPO_ROOT, 'students', 'students.csv')
 # result file path (workflow will read this)
 CHECK_RESULT_PATH = os.environ.get('CHECK_RESULT_PATH', os.path.join(REPO_ROOT, '.github', 'check_result.json'))
+# combined result file for batch mode: {"<pr number>": <check_result>, ...}
+CHECK_RESULTS_PATH = os.environ.get('CHECK_RESULTS_PATH', os.path.join(REPO_ROOT, '.github', 'check_results.json'))
+# GET /pulls/{n}/files returns at most 3000 files (30 pages of 100)
+FILES_API_MAX_PAGES = 30
+PAGE_WORKERS = 6
+
+
+class ChangedFilesError(RuntimeError):
+    """The changed-file list could not be read completely."""
 
 
 def read_codeowners(repo_root):
@@ -55,18 +82,11 @@ LOG.addHandler(handler)
 
 
 def load_students_map(csv_path):
-    mapping = {}
+    """{github login (lower-case): Directory} from the shared roster index."""
     if not os.path.exists(csv_path):
         LOG.error("students.csv not found at %s", csv_path)
-        return mapping
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            gh = (row.get('Github Username') or '').strip()
-            directory = (row.get('Directory') or '').strip()
-            if gh:
-                mapping[gh.lower()] = directory
-    return mapping
+        return {}
+    return load_roster(csv_path).github_directories()
 
 
 def load_event(event_path):
@@ -115,8 +135,14 @@ def _find_pr_in_obj(obj):
     return None
 
 
-def get_changed_files_from_event(event_or_pr):
-    """Return the list of changed files for the PR using the GitHub API."""
+def iter_changed_file_pages(event_or_pr, provider=None, page_workers=PAGE_WORKERS):
+    """Return (source, pages) for the PR's changed files; pages yields lists of paths.
+
+    provider: 'git' (local `git diff base...head`), 'api' (GitHub REST API) or
+    'auto' (git first, API as fallback). Defaults to CHANGED_FILES_PROVIDER env or 'auto'.
+    API pages are produced lazily, so a consumer may stop before all are fetched;
+    iterating raises ChangedFilesError if a page cannot be fetched.
+    """
     if isinstance(event_or_pr, dict) and 'pull_request' in event_or_pr:
         pr = event_or_pr['pull_request']
     else:
@@ -124,78 +150,130 @@ def get_changed_files_from_event(event_or_pr):
 
     if not isinstance(pr, dict):
         LOG.error('Invalid PR payload; expected dict, got %s', type(pr))
-        return []
+        return None, []
+
+    provider = (provider or os.environ.get('CHANGED_FILES_PROVIDER') or 'auto').lower()
+    order = ['git', 'api'] if provider == 'auto' else [provider]
+    for name in order:
+        fetch = CHANGED_FILES_PROVIDERS.get(name)
+        if fetch is None:
+            LOG.error('Unknown changed-files provider %r', name)
+            continue
+        pages = fetch(pr, page_workers)
+        if pages is None:
+            # provider not usable here (e.g. commits not present locally)
+            continue
+        return ('git diff' if name == 'git' else 'GitHub API'), pages
+    return None, []
 
-    files = fetch_changed_files_via_api(pr)
-    if files:
-        LOG.info('Fetched %d changed files via GitHub API', len(files))
-    else:
-        LOG.error('Unable to determine changed files via GitHub API')
+
+def get_changed_files_from_event(event_or_pr, provider=None, page_workers=PAGE_WORKERS):
+    """Return the list of changed files for the PR (see iter_changed_file_pages).
+
+    Raises ChangedFilesError when no provider is usable or a page fails, so a
+    failed fetch is never mistaken for a PR without changes.
+    """
+    source, pages = iter_changed_file_pages(event_or_pr, provider, page_workers)
+    if source is None:
+        raise ChangedFilesError('Unable to determine changed files via any provider')
+    files = [f for page in pages for f in page]
+    LOG.info('Fetched %d changed files via %s', len(files), source)
     return files
 
 
-def _parse_next_link(link_header):
-    if not link_header:
+def _git(repo_root, *args):
+    return subprocess.run(['git', '-C', repo_root, *args], capture_output=True, timeout=120)
+
+
+def fetch_changed_files_via_git(pr, repo_root=None):
+    """List changed files with `git diff --name-only base...head` from a local clone.
+
+    Uses base.sha/head.sha from the PR payload. Returns None when git or either
+    commit is unavailable so the caller can fall back to the API.
+    """
+    repo_root = repo_root or REPO_ROOT
+    base_sha = (pr.get('base') or {}).get('sha')
+    head_sha = (pr.get('head') or {}).get('sha')
+    if not base_sha or not head_sha:
         return None
-    parts = link_header.split(',')
-    for part in parts:
-        section = part.strip()
-        if not section.endswith('rel="next"'):
-            continue
-        url_part = section.split(';')[0].strip()
-        if url_part.startswith('<') and url_part.endswith('>'):
-            return url_part[1:-1]
-    return None
+    try:
+        for sha in (base_sha, head_sha):
+            if _git(repo_root, 'cat-file', '-e', f'{sha}^{{commit}}').returncode != 0:
+                LOG.info('Commit %s not available locally; git diff backend skipped', sha)
+                return None
+        # --no-renames: a move lists both paths (the source may be another student's
+        # folder), and no blobs are needed, so a blob:none clone stays offline
+        proc = _git(repo_root, 'diff', '--name-only', '--no-renames', '-z', f'{base_sha}...{head_sha}')
+    except (OSError, subprocess.SubprocessError) as exc:
+        LOG.info('git not usable (%s); git diff backend skipped', exc)
+        return None
+    if proc.returncode != 0:
+        LOG.warning('git diff failed: %s', proc.stderr.decode('utf-8', 'replace').strip())
+        return None
+    return [name for name in proc.stdout.decode('utf-8').split('\0') if name]
 
 
-def fetch_changed_files_via_api(pr):
+def iter_changed_file_pages_via_api(pr, workers=PAGE_WORKERS):
+    """Yield the PR's changed file names one API page at a time.
+
+    Raises ChangedFilesError when a page (or the whole list) cannot be fetched:
+    a partial list must not be validated as if it were complete.
+    """
     token = os.environ.get('GITHUB_TOKEN')
     url = pr.get('url')
     if not url:
-        LOG.error('PR URL not available; cannot query files')
-        return []
+        raise ChangedFilesError('PR URL not available; cannot query files')
 
-    headers = {'Accept': 'application/vnd.github+json'}
-    if token:
-        headers['Authorization'] = f'token {token}'
+    if shared_client is None:
+        raise ChangedFilesError('The GitHub API provider requires the requests package')
 
-    files = []
-    next_url = f"{url}/files?per_page=100"
-
-    while next_url:
-        if requests is not None:
-            resp = requests.get(next_url, headers=headers, timeout=30)
-            status = resp.status_code
-            data = resp.json() if status == 200 else None
-            link_header = resp.headers.get('Link')
-            error_text = resp.text if status != 200 else ''
-        else:
-            import urllib.request
+    client = shared_client(token)
+    changed_count = pr.get('changed_files')
+    if isinstance(changed_count, int) and changed_count > 0:
+        # page count is known up front: fetch pages concurrently, yielded in order
+        pages = client.iter_pages(f'{url}/files', changed_count, max_pages=FILES_API_MAX_PAGES, workers=workers)
+    else:
+        pages = client.iter_link_pages(f'{url}/files', params={'per_page': 100})
+    try:
+        for page in pages:
+            yield [item['filename'] for item in page if item.get('filename')]
+    except Exception as exc:
+        raise ChangedFilesError(f'Failed to fetch PR files via API: {exc}') from exc
+    finally:
+        pages.close()
+
+
+def fetch_changed_files_via_api(pr):
+    return [f for page in iter_changed_file_pages_via_api(pr) for f in page]
 
-            req = urllib.request.Request(next_url, headers=headers)
-            try:
-                with urllib.request.urlopen(req, timeout=30) as http_resp:
-                    status = http_resp.status
-                    raw = http_resp.read().decode('utf-8')
-                    data = json.loads(raw) if status == 200 else None
-                    link_header = http_resp.headers.get('Link')
-                    error_text = raw if status != 200 else ''
-            except Exception as exc:
-                LOG.error('Failed to fetch PR files via urllib: %s', exc)
-                return files
 
-        if status != 200 or data is None:
-            LOG.error('Failed to fetch PR files via API: %s %s', status, error_text)
-            return files
+def fetch_pr_json(repo, pr_num):
+    """Fetch a PR object by number (used for workflow_dispatch runs)."""
+    token = os.environ.get('GITHUB_TOKEN')
+    api_url = f'https://api.github.com/repos/{repo}/pulls/{pr_num}'
+    if shared_client is not None:
+        r = shared_client(token).get(api_url)
+        if r.status_code != 200:
+            raise RuntimeError(f'HTTP {r.status_code} {r.text}')
+        return r.json()
+    import urllib.request
+    req = urllib.request.Request(api_url)
+    if token:
+        req.add_header('Authorization', f'token {token}')
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.load(resp)
 
-        for item in data:
-            filename = item.get('filename')
-            if filename:
-                files.append(filename)
 
-        next_url = _parse_next_link(link_header)
+def _git_provider(pr, workers=None):
+    files = fetch_changed_files_via_git(pr)
+    return None if files is None else [files]
 
-    return files
+
+# name -> callable(pr) returning an iterable of filename pages, or None if unusable
+CHANGED_FILES_PROVIDERS = {
+    'git': _git_provider,
+    'api': iter_changed_file_pages_via_api,
+}
 
 
 def normalize_path(p):
@@ -205,24 +283,14 @@ def normalize_path(p):
 
 
 def collect_task_dirs(normalized_files, allowed_dir):
-    tasks = set()
+    """task_* folders touched inside allowed_dir (see classify_pages)."""
     if not allowed_dir:
-        return tasks
-    prefix = allowed_dir.rstrip('/') + '/'
-    for nf in normalized_files:
-        if not (nf == allowed_dir or nf.startswith(prefix)):
-            continue
-        rel = nf[len(prefix):] if nf.startswith(prefix) else ''
-        if not rel:
-            continue
-        first_segment = rel.split('/', 1)[0]
-        if first_segment.startswith('task_'):
-            tasks.add(first_segment)
-    return tasks
+        return set()
+    return classify_pages([normalized_files], allowed_dir)['tasks']
 
 
 def find_non_task_files(normalized_files, allowed_dir):
-    """Return a list of files that are inside the student's directory but not within a task_* folder.
+    """Files inside the student's directory but not within a task_* folder (see classify_pages).
 
     Example:
       allowed_dir = 'students/JohnDoe'
@@ -231,152 +299,313 @@ def find_non_task_files(normalized_files, allowed_dir):
     """
     if not allowed_dir:
         return []
-    prefix = allowed_dir.rstrip('/') + '/'
+    return classify_pages([normalized_files], allowed_dir)['non_task_files']
+
+
+def classify_pages(pages, allowed_dir, stop_on_violation=False):
+    """Classify changed paths in one pass, consuming pages as they arrive.
+
+    Returns a dict with `files` (every normalized path seen), `violations` (outside
+    allowed_dir), `non_task_files` (inside it but not under task_*), `tasks` (set of
+    task_* folders), `files_seen` and `stopped_early`. With stop_on_violation=True the remaining pages are not
+    consumed once a page contains a file outside allowed_dir: that verdict (exit 2)
+    cannot change, so there is no point fetching the rest of a huge PR.
+    """
+    allowed_dir = allowed_dir.rstrip('/')
+    prefix = allowed_dir + '/'
+    files = []
     violations = []
-    for nf in normalized_files:
-        if nf.startswith(prefix):
-            rel = nf[len(prefix):]
-            # skip empty rel (shouldn't happen for files)
-            if not rel:
-                continue
-            # if the first segment is not task_*, flag it
-            first_segment = rel.split('/', 1)[0]
-            if not first_segment.startswith('task_'):
-                violations.append(nf)
-    return violations
+    non_task = []
+    tasks = set()
+    seen = 0
+    stopped = False
+    pages = iter(pages)
+    try:
+        for page in pages:
+            for f in page:
+                seen += 1
+                nf = normalize_path(f)
+                files.append(nf)
+                if not nf.startswith(prefix):
+                    if nf != allowed_dir:
+                        violations.append(nf)
+                    continue
+                first_segment = nf[len(prefix):].split('/', 1)[0]
+                if not first_segment:
+                    continue
+                if first_segment.startswith('task_'):
+                    tasks.add(first_segment)
+                else:
+                    non_task.append(nf)
+            if violations and stop_on_violation:
+                stopped = True
+                break
+    finally:
+        if hasattr(pages, 'close'):
+            pages.close()
+    return {
+        'files': files,
+        'violations': violations,
+        'non_task_files': non_task,
+        'tasks': tasks,
+        'files_seen': seen,
+        'stopped_early': stopped,
+    }
+
+
+def build_whitelist(repo_root):
+    """Usernames exempt from validation: WHITELIST env plus CODEOWNERS."""
+    env_whitelist = os.environ.get('WHITELIST', '')
+    whitelist = set([x.strip().lower() for x in env_whitelist.split(',') if x.strip()])
+    whitelist.update(read_codeowners(repo_root))
+    return whitelist
 
 
-def main():
-    event_path = os.environ.get('GITHUB_EVENT_PATH')
-    event = load_event(event_path)
-    if not event:
-        LOG.error('No event payload — cannot validate')
-        # write result for workflow
-        json.dump({'exit_code': 1, 'message': 'No event payload', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(1)
+def write_result(result, path=None):
+    with open(path or CHECK_RESULT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
 
-    pr_info = get_pr_info(event)
-    # If the event is a workflow_dispatch payload, it may include inputs.pr_number — fetch the PR JSON
-    if not pr_info:
-        # workflow_dispatch payload shape contains 'inputs'
-        try:
-            inputs = event.get('inputs') if isinstance(event, dict) else None
-            pr_num = inputs.get('pr_number') if isinstance(inputs, dict) else None
-        except Exception:
-            pr_num = None
-        if pr_num:
-            LOG.info('workflow_dispatch with pr_number=%s — fetching PR JSON from GitHub API', pr_num)
-            # fetch PR JSON using stdlib to avoid extra deps
-            try:
-                import urllib.request
-                api_url = f'https://api.github.com/repos/{os.environ.get("GITHUB_REPOSITORY", os.environ.get("GITHUB_REPO", ""))}/pulls/{pr_num}'
-                # fallback to github.repository from env if available
-                if not api_url.endswith('/pulls/' + str(pr_num)):
-                    api_url = f'https://api.github.com/repos/{os.environ.get("GITHUB_REPOSITORY")}/pulls/{pr_num}'
-                req = urllib.request.Request(api_url)
-                token = os.environ.get('GITHUB_TOKEN')
-                if token:
-                    req.add_header('Authorization', f'token {token}')
-                with urllib.request.urlopen(req) as resp:
-                    pr_json = json.load(resp)
-                # set event to pr_json so get_pr_info can handle it
-                event = pr_json
-                pr_info = get_pr_info(event)
-            except Exception as e:
-                LOG.error('Failed to fetch PR JSON: %s', e)
-                print('Not a pull_request event — skipping')
-                sys.exit(0)
-        else:
-            print('Not a pull_request event — skipping')
-            sys.exit(0)
 
-    author = pr_info.get('author')
+def resolve_allowed_dir(author, students, whitelist):
+    """Return (allowed_dir, early_result). early_result is set when no file check is needed."""
     if not author:
         LOG.error('PR author not found')
-        json.dump({'exit_code': 1, 'message': 'PR author not found', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(1)
-
-    students = load_students_map(STUDENTS_CSV)
-    mapped_dir = students.get(author.lower())
-
-    # Build whitelist from env and CODEOWNERS
-    env_whitelist = os.environ.get('WHITELIST', '')
-    whitelist = set([x.strip().lower() for x in env_whitelist.split(',') if x.strip()])
-    codeowners = read_codeowners(REPO_ROOT)
-    whitelist.update(codeowners)
+        return None, {'exit_code': 1, 'message': 'PR author not found', 'logs': []}
 
     if author.lower() in whitelist:
         LOG.info('Author %s is in whitelist/Codeowners — skipping validation', author)
-        json.dump({'exit_code': 0, 'message': 'whitelisted', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(0)
+        return None, {'exit_code': 0, 'message': 'whitelisted', 'logs': []}
 
+    mapped_dir = students.get(author.lower())
     if not mapped_dir:
         LOG.warning('No mapping for GitHub user "%s" in students.csv — manual check required', author)
-        json.dump({'exit_code': 3, 'message': f'No mapping for {author} in students.csv', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(3)
+        return None, {'exit_code': 3, 'message': f'No mapping for {author} in students.csv', 'logs': []}
 
     # Normalize allowed directory
     allowed = normalize_path(mapped_dir)
     if allowed.endswith('/'):
         allowed = allowed.rstrip('/')
+    return allowed, None
 
-    changed_files = get_changed_files_from_event(event)
-    if not changed_files:
-        LOG.info('No changed files detected')
-        json.dump({'exit_code': 0, 'message': 'no changed files', 'logs': []}, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
-        sys.exit(0)
 
-    violations = []
-    normalized_files = []
-    allowed_prefix = allowed.rstrip('/') + '/'
-    for f in changed_files:
-        nf = normalize_path(f)
-        normalized_files.append(nf)
-        in_dir = nf == allowed or nf.startswith(allowed_prefix)
-        if not in_dir:
-            violations.append(nf)
+def validate_changed_files(author, allowed, pages, stop_on_violation=False):
+    """Validate changed files (an iterable of path pages) against the student's directory.
+
+    Returns the check_result dict. It carries the normalized `changed_files`, and on
+    success with a single task also `student` (directory name) and `task`, so later
+    steps (on_success_create_issue.py) need not list the PR files again.
+    """
+    try:
+        verdict = classify_pages(pages, allowed, stop_on_violation)
+    except ChangedFilesError as exc:
+        LOG.error('%s', exc)
+        return {'exit_code': 1, 'author': author, 'allowed': allowed,
+                'message': f'Failed to list changed files: {exc}', 'logs': []}
+    if not verdict['files_seen']:
+        LOG.info('No changed files detected')
+        return {'exit_code': 0, 'message': 'no changed files', 'logs': []}
 
+    violations = verdict['violations']
     logs = [f'{datetime.utcnow().isoformat()}Z - checked author {author}']
-    result = {'author': author, 'allowed': allowed, 'violations': violations, 'logs': logs}
+    result = {'author': author, 'allowed': allowed, 'violations': violations, 'logs': logs,
+              'changed_files': verdict['files']}
+    if verdict['stopped_early']:
+        logs.append(f'stopped after {verdict["files_seen"]} files: violation found, remaining pages (if any) skipped')
+        result['truncated'] = True
     if violations:
         print('Detected files outside allowed directory:')
         for v in violations:
             print(' -', v)
         result.update({'exit_code': 2, 'message': 'files outside allowed directory'})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
         LOG.error('Validation failed, violations: %s', violations)
-        sys.exit(2)
+        return result
 
     # Enforce that any files within the student's directory are placed inside task_* folders
-    non_task = find_non_task_files(normalized_files, allowed)
+    non_task = verdict['non_task_files']
     if non_task:
         print('Detected files in student directory that are not inside a task_* folder:')
         for v in non_task:
             print(' -', v)
         result.update({'exit_code': 5, 'message': 'non-task files modified in student directory', 'non_task_files': non_task})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
         LOG.error('Validation failed, non-task files inside %s: %s', allowed, non_task)
-        sys.exit(5)
+        return result
 
-    tasks = collect_task_dirs(normalized_files, allowed)
+    tasks = verdict['tasks']
     if len(tasks) > 1:
         sorted_tasks = sorted(tasks)
         print('Detected changes across multiple tasks:')
         for t in sorted_tasks:
             print(' -', t)
         result.update({'exit_code': 4, 'message': 'multiple task folders modified', 'tasks': sorted_tasks})
-        json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
         LOG.error('Validation failed, multiple task folders detected: %s', sorted_tasks)
-        sys.exit(4)
+        return result
 
     if tasks:
         result['tasks'] = sorted(tasks)
+        result['student'] = allowed.rsplit('/', 1)[-1]
+        result['task'] = result['tasks'][0]
 
     # success
     result.update({'exit_code': 0, 'message': 'ok'})
-    json.dump(result, open(CHECK_RESULT_PATH, 'w', encoding='utf-8'), ensure_ascii=False)
     LOG.info('Validation successful: all files within %s', allowed)
-    sys.exit(0)
+    return result
+
+
+def list_open_prs(repo):
+    token = os.environ.get('GITHUB_TOKEN')
+    client = shared_client(token)
+    return list(client.paginate(f'https://api.github.com/repos/{repo}/pulls', params={'state': 'open', 'per_page': 100}))
+
+
+def run_batch(repo, pr_numbers=None, out_path=None, workers=8):
+    """Validate many PRs in one process and write the combined result file.
+
+    pr_numbers=None validates every open PR. Returns 0 when every PR passed, 1 otherwise.
+    """
+    if shared_client is None:
+        LOG.error('Batch mode requires the requests package')
+        return 1
+    if not repo:
+        LOG.error('Repository not set (use --repo or GITHUB_REPOSITORY)')
+        return 1
+
+    students = load_students_map(STUDENTS_CSV)
+    whitelist = build_whitelist(REPO_ROOT)
+    # PRs x pages in flight must fit the client's connection pool, or connections are dropped and reopened
+    pool_size = shared_client(os.environ.get('GITHUB_TOKEN')).pool_size
+    workers = max(1, min(workers, pool_size))
+    page_workers = max(1, pool_size // workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if pr_numbers is None:
+            try:
+                prs = list_open_prs(repo)
+            except Exception as exc:
+                LOG.error('Failed to list open PRs of %s: %s', repo, exc)
+                return 1
+        else:
+            def _fetch(num):
+                try:
+                    return fetch_pr_json(repo, num)
+                except Exception as exc:
+                    LOG.error('Failed to fetch PR #%s: %s', num, exc)
+                    return {'number': num, 'fetch_error': str(exc)}
+            prs = list(pool.map(_fetch, pr_numbers))
+        LOG.info('Validating %d pull requests', len(prs))
+
+        # only PRs with a mapped author need their file list
+        plans = []
+        for pr in prs:
+            author = (pr.get('user') or {}).get('login')
+            if 'fetch_error' in pr:
+                allowed, early = None, {'exit_code': 1, 'message': f"Failed to fetch PR: {pr['fetch_error']}", 'logs': []}
+            else:
+                allowed, early = resolve_allowed_dir(author, students, whitelist)
+            plans.append((pr, author, allowed, early))
+        def _files(pr):
+            try:
+                return get_changed_files_from_event(pr, page_workers=page_workers)
+            except ChangedFilesError as exc:
+                LOG.error('PR #%s: %s', pr.get('number'), exc)
+                return exc
+
+        pending = [pr for pr, _, _, early in plans if early is None]
+        file_lists = dict(zip((id(pr) for pr in pending), pool.map(_files, pending)))
+
+    results = {}
+    for pr, author, allowed, early in plans:
+        number = str(pr.get('number'))
+        files = file_lists.get(id(pr))
+        if early is not None:
+            result = early
+        elif isinstance(files, ChangedFilesError):
+            # never validate (and later approve) a PR whose file list is unknown
+            result = {'exit_code': 1, 'author': author, 'allowed': allowed,
+                      'message': f'Failed to list changed files: {files}', 'logs': []}
+        else:
+            result = validate_changed_files(author, allowed, [files])
+        results[number] = result
+
+    out_path = out_path or CHECK_RESULTS_PATH
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    shared_client(os.environ.get('GITHUB_TOKEN')).log_stats(LOG)
+    failed = [n for n, r in results.items() if r.get('exit_code') != 0]
+    LOG.info('Wrote %d results to %s; failing PRs: %s', len(results), out_path, ', '.join(failed) or 'none')
+    return 1 if failed else 0
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description='Validate that PR changes stay inside the student directory')
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument('--all-open-prs', action='store_true', help='Validate every open PR (batch mode)')
+    mode.add_argument('--pr-list', help='Comma-separated PR numbers to validate (batch mode)')
+    ap.add_argument('--repo', default=os.environ.get('GITHUB_REPOSITORY', ''), help='owner/repo for batch mode')
+    ap.add_argument('--out', default=None, help='Combined result file for batch mode (default: CHECK_RESULTS_PATH)')
+    ap.add_argument('--workers', type=int, default=8, help='Concurrent API requests in batch mode')
+    ap.add_argument('--fail-fast', action='store_true', default=os.environ.get('CHECK_FAIL_FAST') == '1',
+                    help='Stop fetching file pages once a file outside the student directory is found (env CHECK_FAIL_FAST=1)')
+    return ap.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.all_open_prs or args.pr_list:
+        pr_numbers = None
+        if args.pr_list:
+            pr_numbers = [x.strip().lstrip('#') for x in args.pr_list.split(',') if x.strip()]
+        sys.exit(run_batch(args.repo, pr_numbers, args.out, args.workers))
+
+    event_path = os.environ.get('GITHUB_EVENT_PATH')
+    event = load_event(event_path)
+    if not event:
+        LOG.error('No event payload — cannot validate')
+        # write result for workflow
+        write_result({'exit_code': 1, 'message': 'No event payload', 'logs': []})
+        sys.exit(1)
+
+    pr_info = get_pr_info(event)
+    # If the event is a workflow_dispatch payload, it may include inputs.pr_number — fetch the PR JSON
+    if not pr_info:
+        # workflow_dispatch payload shape contains 'inputs'
+        try:
+            inputs = event.get('inputs') if isinstance(event, dict) else None
+            pr_num = inputs.get('pr_number') if isinstance(inputs, dict) else None
+        except Exception:
+            pr_num = None
+        if pr_num:
+            LOG.info('workflow_dispatch with pr_number=%s — fetching PR JSON from GitHub API', pr_num)
+            try:
+                repo = os.environ.get('GITHUB_REPOSITORY') or os.environ.get('GITHUB_REPO', '')
+                pr_json = fetch_pr_json(repo, pr_num)
+                # set event to pr_json so get_pr_info can handle it
+                event = pr_json
+                pr_info = get_pr_info(event)
+            except Exception as e:
+                LOG.error('Failed to fetch PR JSON: %s', e)
+                print('Not a pull_request event — skipping')
+                sys.exit(0)
+        else:
+            print('Not a pull_request event — skipping')
+            sys.exit(0)
+
+    author = pr_info.get('author')
+    students = load_students_map(STUDENTS_CSV) if author else {}
+    whitelist = build_whitelist(REPO_ROOT) if author else set()
+    allowed, result = resolve_allowed_dir(author, students, whitelist)
+    if result is None:
+        source, pages = iter_changed_file_pages(event)
+        if source is None:
+            LOG.error('Unable to determine changed files via any provider')
+            result = {'exit_code': 1, 'author': author, 'allowed': allowed,
+                      'message': 'Failed to list changed files: no provider usable', 'logs': []}
+        else:
+            result = validate_changed_files(author, allowed, pages, stop_on_violation=args.fail_fast)
+            LOG.info('Fetched changed files via %s', source)
+        if shared_client is not None:
+            shared_client(os.environ.get('GITHUB_TOKEN')).log_stats(LOG)
+    write_result(result)
+    sys.exit(result['exit_code'])
 
 
 if __name__ == '__main__':
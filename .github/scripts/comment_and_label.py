@@ -3,22 +3,41 @@
 
 Features added:
 - Logging (stdout)
-- Avoid duplicate labels (checks existing labels first)
-- Avoid duplicate bot comments (searches comments for identical body or marker)
+- Avoid duplicate labels: on success only the missing 'Dir approved' is added and a present
+  'Wrong dir' deleted; on failure the label set is re-read right before a single PUT /labels
+- Avoid duplicate bot comments: the marker comment is looked up newest-first over all
+  comment pages (per_page=100), stopping at the first match
+- With COMMENT_STATE_PATH set, the bot comment id, ETag and body hash are persisted so a
+  re-run re-validates the comment with one conditional request (304 when unchanged)
 - Short and long templates for comments
+- Independent reads (issue, comments) and writes (labels, comment, close) run concurrently
+- Sweep mode (`--sweep PATH`): apply a combined check_results.json (or a directory of
+  result files) to all of its PRs through a bounded pool, spacing writes to stay under
+  GitHub's secondary rate limits; `--dry-run` prints the planned mutations instead
 """
 import os
+import re
 import json
 import sys
+import argparse
+import hashlib
 import logging
-from typing import Any, List
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
 
 try:
-    import requests
+    from github_client import GitHubClient, parse_link, shared_client
 except Exception:
     print('requests not installed')
     sys.exit(1)
 
+from rate_limit import RateLimiter
+
 
 LOG = logging.getLogger('comment_and_label')
 LOG.setLevel(logging.INFO)
@@ -36,144 +55,455 @@ LONG_TEMPLATE = (
     'Инструкция: перенесите ваши файлы в указанную папку students/NameLatin/task_xx/ и создайте новый PR. Если вы считаете, что изменения вне папки обоснованы, ответьте на этот комментарий и преподаватель рассмотрит ваш случай.'
 )
 
+COMMENT_MARKER = '<!-- student-dir-checker -->'
+COMMENTS_PER_PAGE = 100
+
+# GitHub asks for at most ~80 content-creating requests per minute and a pause between them
+DEFAULT_WRITES_PER_MINUTE = 60
+DEFAULT_SWEEP_WORKERS = 4
+
 MULTI_TASK_TEMPLATE = (
     '⚠️ В одном pull request обнаружены изменения сразу по нескольким заданиям: {tasks}.\n\n'
     'Пожалуйста, разделите каждое задание в отдельный PR (например, task_01 — один PR, task_02 — другой).'
 )
 
 
-def get_issue_comments(repo: str, pr_number: str, headers: dict) -> List[dict]:
+def body_digest(body: str) -> str:
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def load_comment_state(path: str) -> dict:
+    """{'owner/repo#N': {'comment_id', 'etag', 'digest'}} persisted between runs; {} if missing."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_comment_state(path: str, state: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except OSError as exc:
+        LOG.warning('Could not save comment state to %s: %s', path, exc)
+
+
+def _page_number(url: str) -> int:
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(url).query)
+    try:
+        return int(query.get('page', ['1'])[0])
+    except ValueError:
+        return 1
+
+
+def _newest_marked(comments: List[dict], marker: str) -> Optional[dict]:
+    for c in reversed(comments):
+        if marker in (c.get('body') or ''):
+            return c
+    return None
+
+
+def find_marker_comment(repo: str, pr_number: str, client: GitHubClient, marker: str = COMMENT_MARKER) -> Optional[dict]:
+    """Newest comment containing `marker`, paging from the last page backwards.
+
+    The comments endpoint lists oldest first, so page 1 (needed for the `Link`
+    header anyway) is checked last. Returns None when absent or on errors.
+    """
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.get(url, headers=headers)
+    r = client.get(url, params={'per_page': COMMENTS_PER_PAGE})
     if r.status_code != 200:
         LOG.warning('Failed to fetch comments: %s %s', r.status_code, r.text)
-        return []
+        return None
+    first_page = r.json()
+    last_url = parse_link(r.headers.get('Link'), 'last')
+    for page in range(_page_number(last_url) if last_url else 1, 1, -1):
+        rp = client.get(url, params={'per_page': COMMENTS_PER_PAGE, 'page': page})
+        if rp.status_code != 200:
+            LOG.warning('Failed to fetch comments page %s: %s %s', page, rp.status_code, rp.text)
+            return None
+        found = _newest_marked(rp.json(), marker)
+        if found is not None:
+            return found
+    return _newest_marked(first_page, marker)
+
+
+def lookup_marker_comment(
+    repo: str,
+    pr_number: str,
+    client: GitHubClient,
+    cached: Optional[dict] = None,
+    marker: str = COMMENT_MARKER,
+) -> Optional[dict]:
+    """Return {'comment_id', 'etag', 'digest'} of the bot comment, or None.
+
+    A cached entry is re-validated with a conditional GET of that one comment
+    (304 -> unchanged); if it is gone or lost the marker, all pages are searched.
+    """
+    if cached and cached.get('comment_id'):
+        url = f'https://api.github.com/repos/{repo}/issues/comments/{cached["comment_id"]}'
+        headers = {'If-None-Match': cached['etag']} if cached.get('etag') else {}
+        r = client.get(url, headers=headers)
+        if r.status_code == 304:
+            LOG.info('Bot comment id=%s unchanged (304)', cached['comment_id'])
+            return dict(cached)
+        if r.status_code == 200 and marker in (r.json().get('body') or ''):
+            body = r.json().get('body') or ''
+            return {'comment_id': cached['comment_id'], 'etag': r.headers.get('ETag'), 'digest': body_digest(body)}
+        LOG.info('Cached bot comment id=%s not usable (HTTP %s), searching comments', cached['comment_id'], r.status_code)
+    found = find_marker_comment(repo, pr_number, client, marker)
+    if found is None:
+        return None
+    return {'comment_id': found.get('id'), 'etag': None, 'digest': body_digest(found.get('body') or '')}
+
+
+def get_issue(repo: str, pr_number: str, client: GitHubClient) -> dict:
+    """The PR's issue object (labels and state in one call); {} on failure."""
+    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}'
+    r = client.get(url)
+    if r.status_code != 200:
+        LOG.warning('Failed to fetch issue: %s %s', r.status_code, r.text)
+        return {}
     return r.json()
 
 
-def get_issue_labels(repo: str, pr_number: str, headers: dict) -> List[str]:
+def post_comment(repo: str, pr_number: str, client: GitHubClient, body: str) -> Any:
+    """Create the comment; returns the response (its id and ETag are persisted)."""
+    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
+    r = client.post(url, json={'body': body})
+    LOG.info('post_comment status=%s', r.status_code)
+    return r
+
+
+def update_comment(repo: str, comment_id: int, client: GitHubClient, body: str) -> Any:
+    url = f'https://api.github.com/repos/{repo}/issues/comments/{comment_id}'
+    r = client.patch(url, json={'body': body})
+    LOG.info('update_comment status=%s', r.status_code)
+    return r
+
+
+def get_labels(repo: str, pr_number: str, client: GitHubClient) -> Optional[List[str]]:
+    """Current label names of the PR; None on failure."""
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.get(url, headers=headers)
+    r = client.get(url, params={'per_page': 100})
     if r.status_code != 200:
         LOG.warning('Failed to fetch labels: %s %s', r.status_code, r.text)
-        return []
+        return None
     return [lbl['name'] for lbl in r.json()]
 
 
-def post_comment(repo: str, pr_number: str, headers: dict, body: str) -> int:
-    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.post(url, headers=headers, json={'body': body})
-    LOG.info('post_comment status=%s', r.status_code)
+def set_labels(repo: str, pr_number: str, client: GitHubClient, labels: List[str]) -> int:
+    """Replace all labels of the PR in one call.
+
+    The PUT drops any label added since `labels` was computed, so build the list from a
+    read taken just before the call (see reset_labels); the window between that read and
+    this write remains.
+    """
+    url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
+    r = client.put(url, json={'labels': labels})
+    LOG.info('set_labels(%s) status=%s', ', '.join(labels), r.status_code)
     return r.status_code
 
 
-def add_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
+def add_labels(repo: str, pr_number: str, client: GitHubClient, labels: List[str]) -> int:
+    """Add labels without touching the others (used when the current set is unknown)."""
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.post(url, headers=headers, json=[label])
-    LOG.info('add_label status=%s', r.status_code)
+    r = client.post(url, json={'labels': labels})
+    LOG.info('add_labels(%s) status=%s', ', '.join(labels), r.status_code)
     return r.status_code
 
 
-def remove_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
-    # DELETE /repos/{owner}/{repo}/issues/{issue_number}/labels/{name}
-    import urllib.parse
+def remove_label(repo: str, pr_number: str, client: GitHubClient, label: str) -> int:
+    """Delete one label; other labels are not touched."""
     name = urllib.parse.quote(label, safe='')
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels/{name}'
-    r = requests.delete(url, headers=headers)
+    r = client.delete(url)
     LOG.info('remove_label(%s) status=%s', label, r.status_code)
     return r.status_code
 
 
-def close_pull_request(repo: str, pr_number: str, headers: dict) -> int:
+def reset_labels(repo: str, pr_number: str, client: GitHubClient, add: List[str], remove: List[str]) -> int:
+    """Re-read the labels and PUT the reconciled set; labels added meanwhile are kept."""
+    current = get_labels(repo, pr_number, client)
+    if current is None:
+        # never PUT a label set computed from a failed read
+        return add_labels(repo, pr_number, client, add)
+    desired = reconcile_labels(current, add, remove)
+    if desired is None:
+        return 200
+    return set_labels(repo, pr_number, client, desired)
+
+
+def close_pull_request(repo: str, pr_number: str, client: GitHubClient) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}'
-    r = requests.patch(url, headers=headers, json={'state': 'closed'})
+    r = client.patch(url, json={'state': 'closed'})
     LOG.info('close_pr status=%s', r.status_code)
     return r.status_code
 
 
-def main() -> int:
-    repo = os.environ.get('REPO')
-    pr = os.environ.get('PR_NUMBER')
-    token = os.environ.get('GITHUB_TOKEN')
-    path = os.environ.get('CHECK_RESULT_PATH', '.github/check_result.json')
-
-    if not repo or not pr or not token:
-        LOG.error('Missing required environment variables (REPO, PR_NUMBER, GITHUB_TOKEN)')
-        return 1
-
-    if not os.path.exists(path):
-        LOG.info('No result file at %s', path)
-        return 0
+def reconcile_labels(current: Iterable[str], add: Iterable[str], remove: Iterable[str]) -> Optional[List[str]]:
+    """Desired label list (current order kept), or None when nothing changes."""
+    current = list(current)
+    drop = set(remove)
+    desired = [name for name in current if name not in drop]
+    desired += [name for name in add if name not in desired]
+    return None if desired == current else desired
 
-    data: Any = json.load(open(path, encoding='utf-8'))
-    exit_code = int(data.get('exit_code', 1))
-    headers = {'Authorization': f'token {token}', 'Accept': 'application/vnd.github.v3+json'}
 
-    # Success path (exit_code == 0): ensure label 'Dir approved', remove 'Wrong dir'
-    if exit_code == 0:
-        existing_labels = get_issue_labels(repo, pr, headers)
-        if 'Wrong dir' in existing_labels:
-            remove_label(repo, pr, headers, 'Wrong dir')
-        if 'Dir approved' not in existing_labels:
-            add_label(repo, pr, headers, 'Dir approved')
-        # no comment, do not close
-        LOG.info('Success: ensured label Dir approved and removed Wrong dir (if present)')
-        return 0
+def run_concurrently(calls: List[Callable[[], Any]], max_workers: Optional[int] = None) -> List[Any]:
+    """Run independent API calls at once; results in call order. max_workers=1 runs them in turn."""
+    if len(calls) <= 1 or max_workers == 1:
+        return [call() for call in calls]
+    with ThreadPoolExecutor(max_workers=min(len(calls), max_workers or len(calls))) as pool:
+        return list(pool.map(lambda call: call(), calls))
 
-    # Treat 2 (outside dir), 3 (no mapping), 4 (multiple tasks), 5 (non-task files) as failures
-    if exit_code not in (2, 3, 4, 5):
-        LOG.info('No failure detected (exit_code=%s), nothing to do', exit_code)
-        return 0
 
+def build_comment_body(exit_code: int, data: dict) -> str:
     violations = data.get('violations', [])
     non_task_files = data.get('non_task_files', [])
     author = data.get('author', 'unknown')
     allowed = data.get('allowed', 'unknown')
     tasks = data.get('tasks', [])
 
-    # Prepare body
     if exit_code == 3:
-        body = f"⚠️ Невозможно сопоставить пользователя **{author}** с `students/students.csv`. Пожалуйста, проверьте вручную."
-    elif exit_code == 4:
+        return f"⚠️ Невозможно сопоставить пользователя **{author}** с `students/students.csv`. Пожалуйста, проверьте вручную."
+    if exit_code == 4:
         tasks_list = ', '.join(f'`{t}`' for t in tasks[:10])
-        body = MULTI_TASK_TEMPLATE.format(tasks=tasks_list or '—')
-    else:
-        # For exit_code 2 -> files outside allowed directory (violations)
-        # For exit_code 5 -> files inside student dir but outside task_* (non_task_files)
-        files_src = non_task_files if exit_code == 5 else violations
-        files_list = '\n'.join(f'- {v}' for v in files_src[:20])
-        body = LONG_TEMPLATE.format(allowed=allowed, files=files_list)
-
-    # Avoid duplicate comments: look for an existing bot comment with marker and update it
-    marker = '<!-- student-dir-checker -->'
-    marked_body = marker + '\n' + body
-    comments = get_issue_comments(repo, pr, headers)
-    existing_id = None
-    for c in comments:
-        if marker in (c.get('body') or ''):
-            existing_id = c.get('id')
-            LOG.info('Found existing bot comment id=%s, will update', existing_id)
-            break
-
-    if existing_id:
-        # update comment via PATCH
-        url = f'https://api.github.com/repos/{repo}/issues/comments/{existing_id}'
-        r = requests.patch(url, headers=headers, json={'body': marked_body})
-        LOG.info('update_comment status=%s', r.status_code)
+        return MULTI_TASK_TEMPLATE.format(tasks=tasks_list or '—')
+    # For exit_code 2 -> files outside allowed directory (violations)
+    # For exit_code 5 -> files inside student dir but outside task_* (non_task_files)
+    files_src = non_task_files if exit_code == 5 else violations
+    files_list = '\n'.join(f'- {v}' for v in files_src[:20])
+    return LONG_TEMPLATE.format(allowed=allowed, files=files_list)
+
+
+def apply_result(
+    repo: str,
+    pr: str,
+    data: dict,
+    client: GitHubClient,
+    state: Optional[dict] = None,
+    dry_run: bool = False,
+    max_workers: Optional[int] = None,
+    limiter: Any = None,
+) -> List[str]:
+    """Comment, label and close one PR according to its check result.
+
+    Returns the planned mutations (e.g. 'PUT labels: Wrong dir'); with dry_run
+    only the reads are sent. `state` is the comment state mapping and is updated
+    in place; `limiter.acquire()` is called before every write.
+    """
+    exit_code = int(data.get('exit_code', 1))
+    writes: List[Tuple[str, Callable[[], Any]]] = []
+
+    # Success path (exit_code == 0): ensure label 'Dir approved', remove 'Wrong dir'.
+    # Per-label calls only touch their own label, so concurrent label edits survive.
+    if exit_code == 0:
+        issue = get_issue(repo, pr, client)
+        current = [lbl['name'] for lbl in issue.get('labels', [])]
+        if 'Dir approved' not in current:
+            writes.append(('POST labels: Dir approved', lambda: add_labels(repo, pr, client, ['Dir approved'])))
+        if 'Wrong dir' in current:
+            writes.append(('DELETE label: Wrong dir', lambda: remove_label(repo, pr, client, 'Wrong dir')))
+        # no comment, do not close
+        if not dry_run:
+            _run_writes(writes, max_workers, limiter)
+            LOG.info('Success: ensured label Dir approved and removed Wrong dir (if present)')
+        return [desc for desc, _ in writes]
+
+    # Treat 2 (outside dir), 3 (no mapping), 4 (multiple tasks), 5 (non-task files) as failures
+    if exit_code not in (2, 3, 4, 5):
+        LOG.info('No failure detected for PR #%s (exit_code=%s), nothing to do', pr, exit_code)
+        return []
+
+    # One round of reads: labels/state and the bot comment
+    marked_body = COMMENT_MARKER + '\n' + build_comment_body(exit_code, data)
+    state = {} if state is None else state
+    state_key = f'{repo}#{pr}'
+    issue, existing = run_concurrently([
+        lambda: get_issue(repo, pr, client),
+        lambda: lookup_marker_comment(repo, pr, client, state.get(state_key)),
+    ], max_workers)
+
+    # Avoid duplicate comments: update an existing bot comment with the marker
+    digest = body_digest(marked_body)
+    if existing is None:
+        writes.append(('POST comment', lambda: post_comment(repo, pr, client, marked_body)))
+    elif existing['digest'] != digest:
+        LOG.info('Found existing bot comment id=%s, will update', existing['comment_id'])
+        writes.append((f'PATCH comment {existing["comment_id"]}',
+                       lambda: update_comment(repo, existing['comment_id'], client, marked_body)))
     else:
-        post_comment(repo, pr, headers, marked_body)
+        LOG.info('Existing bot comment id=%s is up to date', existing['comment_id'])
+    comment_written = bool(writes)
 
     # Remove previous success label and ensure failure label
-    existing_labels = get_issue_labels(repo, pr, headers)
-    if 'Dir approved' in existing_labels:
-        remove_label(repo, pr, headers, 'Dir approved')
-    if 'Wrong dir' not in existing_labels:
-        add_label(repo, pr, headers, 'Wrong dir')
+    if not issue:
+        # never PUT a label set computed from a failed read
+        writes.append(('POST labels: Wrong dir', lambda: add_labels(repo, pr, client, ['Wrong dir'])))
+    else:
+        current = [lbl['name'] for lbl in issue.get('labels', [])]
+        desired = reconcile_labels(current, ['Wrong dir'], ['Dir approved'])
+        if desired is not None:
+            writes.append((f'PUT labels: {", ".join(desired)}',
+                           lambda: reset_labels(repo, pr, client, ['Wrong dir'], ['Dir approved'])))
+
+    if issue.get('state') != 'closed':
+        writes.append(('PATCH state: closed', lambda: close_pull_request(repo, pr, client)))
+
+    if dry_run:
+        return [desc for desc, _ in writes]
+
+    results = _run_writes(writes, max_workers, limiter)
+    if comment_written and results[0].status_code in (200, 201):
+        r = results[0]
+        existing = {'comment_id': r.json().get('id'), 'etag': r.headers.get('ETag'), 'digest': digest}
+    if existing:
+        state[state_key] = existing
+    return [desc for desc, _ in writes]
 
-    close_pull_request(repo, pr, headers)
+
+def _run_writes(writes: List[Tuple[str, Callable[[], Any]]], max_workers: Optional[int], limiter: Any) -> List[Any]:
+    def _paced(call: Callable[[], Any]) -> Callable[[], Any]:
+        def _call() -> Any:
+            limiter.acquire()
+            return call()
+        return _call
+
+    calls = [call if limiter is None else _paced(call) for _, call in writes]
+    return run_concurrently(calls, max_workers)
+
+
+def _pr_from_name(path: str) -> Optional[str]:
+    m = re.search(r'(\d+)$', os.path.splitext(os.path.basename(path))[0])
+    return m.group(1) if m else None
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    """{pr number: check_result} from a combined file or a directory of result files.
+
+    A combined file is what `check_student_directory.py --pr-list/--all-open-prs` writes.
+    In a directory, every *.json file is either such a mapping or one check_result
+    whose PR is its `pr_number` field or the trailing number of the file name
+    (`123.json`, `check_result_123.json`).
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, n) for n in os.listdir(path) if n.endswith('.json'))
+    else:
+        files = [path]
+    results: Dict[str, dict] = {}
+    for file in files:
+        with open(file, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            LOG.warning('Skipping %s: not a JSON object', file)
+            continue
+        if 'exit_code' not in data:
+            results.update({str(k).lstrip('#'): v for k, v in data.items() if isinstance(v, dict)})
+            continue
+        pr = str(data.get('pr_number') or '') or _pr_from_name(file)
+        if not pr:
+            LOG.warning('Skipping %s: cannot tell which PR it belongs to', file)
+            continue
+        results[pr] = data
+    return results
+
+
+def sweep(
+    repo: str,
+    results: Dict[str, dict],
+    client: GitHubClient,
+    workers: int = DEFAULT_SWEEP_WORKERS,
+    dry_run: bool = False,
+    writes_per_minute: float = DEFAULT_WRITES_PER_MINUTE,
+    state_path: Optional[str] = None,
+) -> int:
+    """Apply many check results at once. PRs run in a pool of `workers`; each PR's
+    own calls run in turn, so at most `workers` requests are in flight. Returns 1
+    if any PR failed with an exception."""
+    state = load_comment_state(state_path) if state_path else {}
+    limiter = None if dry_run else RateLimiter(writes_per_minute)
+    prs = sorted(results, key=lambda n: (not n.isdigit(), int(n) if n.isdigit() else 0, n))
+
+    def _one(pr: str) -> Optional[List[str]]:
+        try:
+            return apply_result(repo, pr, results[pr], client, state, dry_run=dry_run, max_workers=1, limiter=limiter)
+        except Exception as exc:
+            LOG.error('PR #%s: %s', pr, exc)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        planned = dict(zip(prs, pool.map(_one, prs)))
+
+    if dry_run:
+        for pr in prs:
+            for desc in planned[pr] or []:
+                print(f'#{pr}: {desc}')
+    if state_path and not dry_run:
+        save_comment_state(state_path, state)
+    failed = [pr for pr in prs if planned[pr] is None]
+    changed = sum(1 for pr in prs if planned[pr])
+    LOG.info('Sweep over %d PRs: %d %s, failed: %s', len(prs), changed,
+             'would change' if dry_run else 'changed', ', '.join(failed) or 'none')
+    client.log_stats(LOG)
+    return 1 if failed else 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description='Comment, label and close PRs based on check_student_directory results')
+    ap.add_argument('--sweep', metavar='PATH',
+                    help='Combined check_results.json or a directory of result files; handles every PR in it')
+    ap.add_argument('--dry-run', action='store_true', default=os.environ.get('COMMENT_DRY_RUN') == '1',
+                    help='Only read from GitHub and print the planned mutations (env COMMENT_DRY_RUN=1)')
+    ap.add_argument('--workers', type=int, default=DEFAULT_SWEEP_WORKERS, help='PRs handled at once in sweep mode')
+    ap.add_argument('--writes-per-minute', type=float, default=DEFAULT_WRITES_PER_MINUTE,
+                    help='Upper bound on mutating requests in sweep mode (0 = unlimited)')
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv or [])
+    repo = os.environ.get('REPO')
+    pr = os.environ.get('PR_NUMBER')
+    token = os.environ.get('GITHUB_TOKEN')
+    path = os.environ.get('CHECK_RESULT_PATH', '.github/check_result.json')
+    state_path = os.environ.get('COMMENT_STATE_PATH')
+
+    if args.sweep:
+        if not repo or not token:
+            LOG.error('Missing required environment variables (REPO, GITHUB_TOKEN)')
+            return 1
+        if not os.path.exists(args.sweep):
+            LOG.error('No results at %s', args.sweep)
+            return 1
+        return sweep(repo, load_results(args.sweep), shared_client(token), args.workers,
+                     args.dry_run, args.writes_per_minute, state_path)
+
+    if not repo or not pr or not token:
+        LOG.error('Missing required environment variables (REPO, PR_NUMBER, GITHUB_TOKEN)')
+        return 1
+
+    if not os.path.exists(path):
+        LOG.info('No result file at %s', path)
+        return 0
+
+    data: Any = json.load(open(path, encoding='utf-8'))
+    client = shared_client(token)
+    state = load_comment_state(state_path) if state_path else {}
+    planned = apply_result(repo, pr, data, client, state, dry_run=args.dry_run)
+    if args.dry_run:
+        for desc in planned:
+            print(f'#{pr}: {desc}')
+    elif state_path and state.get(f'{repo}#{pr}'):
+        save_comment_state(state_path, state)
+    client.log_stats(LOG)
 
     return 0
 
 
 if __name__ == '__main__':
-    sys.exit(main())
+    sys.exit(main(sys.argv[1:]))
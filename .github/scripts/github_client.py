@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""Small shared GitHub REST client for the scripts in `.github/scripts`.
+
+Features:
+- One `requests.Session` per client, so calls reuse keep-alive connections
+- Default timeout on every call
+- Bounded retries with exponential backoff on 5xx and rate-limit responses; POST and
+  PATCH are only retried on rate-limit responses (never applied), so a write that
+  failed after GitHub applied it is not repeated
+- Honors `Retry-After` and `X-RateLimit-Reset` when GitHub asks us to wait
+- Per-endpoint call/latency counters (see `GitHubClient.stats`)
+
+Usage:
+    from github_client import shared_client
+    client = shared_client(os.environ.get('GITHUB_TOKEN'))
+    r = client.get(f'/repos/{repo}/pulls/{pr}')
+"""
+from __future__ import annotations
+
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+API_URL = 'https://api.github.com'
+DEFAULT_TIMEOUT = 30
+RETRY_STATUSES = {500, 502, 503, 504}
+# safe to repeat after a 5xx or a network error; POST/PATCH may already have been applied
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+LOG = logging.getLogger('github_client')
+
+
+def parse_link(link_header: Optional[str], rel: str = 'next') -> Optional[str]:
+    """Return the URL with the given rel ("next", "last", ...) from a GitHub `Link` header (or None)."""
+    if not link_header:
+        return None
+    for part in link_header.split(','):
+        section = part.strip()
+        if not section.endswith(f'rel="{rel}"'):
+            continue
+        url_part = section.split(';')[0].strip()
+        if url_part.startswith('<') and url_part.endswith('>'):
+            return url_part[1:-1]
+    return None
+
+
+def parse_next_link(link_header: Optional[str]) -> Optional[str]:
+    """Return the rel="next" URL from a GitHub `Link` header (or None)."""
+    return parse_link(link_header, 'next')
+
+
+def _endpoint_key(method: str, url: str) -> str:
+    # collapse ids so /issues/42/labels and /issues/43/labels share one counter
+    path = url.split('?', 1)[0]
+    if path.startswith(API_URL):
+        path = path[len(API_URL):]
+    path = re.sub(r'/\d+(?=/|$)', '/:n', path)
+    return f'{method.upper()} {path}'
+
+
+class GitHubClient:
+    """Pooled, retrying wrapper around `requests.Session` for the GitHub API."""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        *,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_sleep: float = 60.0,
+        pool_size: int = 10,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_sleep = max_sleep
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept': 'application/vnd.github+json'})
+        if token:
+            self.session.headers['Authorization'] = f'token {token}'
+
+    def url(self, path: str) -> str:
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f'{API_URL}/{path.lstrip("/")}'
+
+    def _record(self, key: str, elapsed: float, retried: bool) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(key, {'calls': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            if retried:
+                entry['retries'] += 1
+            else:
+                entry['calls'] += 1
+            entry['total_seconds'] += elapsed
+            entry['max_seconds'] = max(entry['max_seconds'], elapsed)
+
+    def _retry_delay(self, resp: Optional[requests.Response], attempt: int, idempotent: bool = True) -> Optional[float]:
+        """Return seconds to wait before retrying, or None if the response is final.
+
+        Non-idempotent requests are retried only when GitHub rate-limited them with
+        Retry-After or X-RateLimit-Reset, i.e. when they were not applied.
+        """
+        exp = self.backoff * (2 ** attempt)
+        if resp is None:  # connection error / timeout
+            return min(exp, self.max_sleep) if idempotent else None
+        status = resp.status_code
+        headers = resp.headers
+        if status in (403, 429):
+            retry_after = headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(max(float(retry_after), 0.0), self.max_sleep)
+                except ValueError:
+                    return min(exp, self.max_sleep)
+            if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+                try:
+                    wait = float(headers['X-RateLimit-Reset']) - time.time()
+                except ValueError:
+                    wait = exp
+                return min(max(wait, 0.0) + 1, self.max_sleep)
+            if not idempotent:
+                return None
+            if status == 429 or 'secondary rate limit' in (resp.text or '').lower():
+                return min(exp, self.max_sleep)
+            return None
+        if status in RETRY_STATUSES and idempotent:
+            return min(exp, self.max_sleep)
+        return None
+
+    def request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """Send a request, retrying transient failures. Returns the last response.
+
+        Network errors are re-raised once retries are exhausted; HTTP errors are
+        returned as-is so callers keep checking `status_code` themselves.
+        """
+        url = self.url(path)
+        kwargs.setdefault('timeout', self.timeout)
+        key = _endpoint_key(method, url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            resp: Optional[requests.Response] = None
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self._record(key, time.monotonic() - started, attempt > 0)
+                delay = self._retry_delay(None, attempt, idempotent)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                LOG.warning('%s failed (%s), retrying in %.1fs', key, exc, delay)
+            else:
+                self._record(key, time.monotonic() - started, attempt > 0)
+                delay = self._retry_delay(resp, attempt, idempotent)
+                if delay is None or attempt >= self.max_retries:
+                    return resp
+                LOG.warning('%s returned %s, retrying in %.1fs', key, resp.status_code, delay)
+            attempt += 1
+            self._sleep(delay)
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('PUT', path, **kwargs)
+
+    def patch(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def iter_link_pages(self, path: str, params: Optional[dict] = None) -> Iterator[List[Any]]:
+        """Yield one list per page, following `Link: rel="next"`.
+
+        Raises RuntimeError on a non-200 page.
+        """
+        url: Optional[str] = self.url(path)
+        while url:
+            r = self.get(url, params=params)
+            if r.status_code != 200:
+                raise RuntimeError(f'GET {url} failed: HTTP {r.status_code} {r.text}')
+            yield r.json()
+            url = parse_next_link(r.headers.get('Link'))
+            params = None  # the next link already carries the query string
+
+    def paginate(self, path: str, params: Optional[dict] = None) -> Iterator[Any]:
+        """Yield items from a list endpoint, following `Link: rel="next"`."""
+        for page in self.iter_link_pages(path, params):
+            yield from page
+
+    def iter_pages(
+        self,
+        path: str,
+        total_items: int,
+        per_page: int = 100,
+        params: Optional[dict] = None,
+        workers: int = 8,
+        max_pages: Optional[int] = None,
+    ) -> Iterator[List[Any]]:
+        """Yield pages of a list endpoint in order, fetching them concurrently.
+
+        Used when the item count is known up front. Pages are requested as
+        `?per_page=..&page=N` through a bounded thread pool; closing the generator
+        early cancels the pages that have not started yet. Raises RuntimeError if
+        a page fails.
+        """
+        pages = max(1, math.ceil(total_items / per_page))
+        if max_pages is not None:
+            pages = min(pages, max_pages)
+        base = dict(params or {})
+        base['per_page'] = per_page
+
+        def _page(n: int) -> List[Any]:
+            r = self.get(path, params={**base, 'page': n})
+            if r.status_code != 200:
+                raise RuntimeError(f'GET {path} page {n} failed: HTTP {r.status_code} {r.text}')
+            return r.json()
+
+        if pages == 1:
+            yield _page(1)
+            return
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, pages)))
+        try:
+            futures = [pool.submit(_page, n) for n in range(1, pages + 1)]
+            for future in futures:
+                yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def fetch_pages(self, path: str, total_items: int, **kwargs: Any) -> List[Any]:
+        """Like `iter_pages`, but return all items concatenated in page order."""
+        return [item for page in self.iter_pages(path, total_items, **kwargs) for item in page]
+
+    def log_stats(self, logger: logging.Logger = LOG) -> None:
+        with self._lock:
+            items = sorted(self.stats.items())
+        for key, s in items:
+            calls = int(s['calls'])
+            avg = s['total_seconds'] / max(calls + s['retries'], 1)
+            logger.info('api %s calls=%d retries=%d avg=%.3fs max=%.3fs', key, calls, int(s['retries']), avg, s['max_seconds'])
+
+
+_CLIENTS: Dict[Optional[str], GitHubClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def shared_client(token: Optional[str] = None) -> GitHubClient:
+    """Return a process-wide client for `token`, creating it on first use."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(token)
+        if client is None:
+            client = GitHubClient(token)
+            _CLIENTS[token] = client
+        return client
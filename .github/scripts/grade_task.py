@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""AI-check every student of a task in one run.
+
+Usage:
+    python .github/scripts/grade_task.py --task task_03 [--students A,B | --group АС-63] \
+        [--engine github] [--models gpt5-mini,phi-3.5-mini] [--workers 4] [--rpm 10] [--out-dir ai_grades]
+
+For each selected roster entry that has a `students/<Name>/<task>` folder, the prompt
+is built in-process with `prepare_AI_prompt.assemble_prompt` (task readme and variants
+are read once), student files are collected and packed like in `run_ai_check.py`,
+and the model calls run through a bounded thread pool behind a per-engine rate limiter.
+
+Writes `<out-dir>/<task>/<Name>.md` per student and `<out-dir>/<task>/summary.csv`
+with the extracted `Итого: NNN / 100` score (empty if not found).
+
+Env: GITHUB_TOKEN (github engine) or OPENAI_API_KEY (openai engine), MODEL, AI_CACHE_DIR.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Mapping
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import prepare_AI_prompt  # noqa: E402
+import run_ai_check  # noqa: E402
+from rate_limit import RateLimiter  # noqa: E402
+from roster import Student, load_roster  # noqa: E402
+from sparse_checkout import is_sparse_checkout  # noqa: E402
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# requests per minute per engine (GitHub Models free tier is the tight one)
+DEFAULT_RPM = {'github': 10, 'openai': 60}
+
+SCORE_RE = re.compile(r'Итого\s*[:：]?\s*(\d+(?:[.,]\d+)?)\s*/\s*(\d+)', re.IGNORECASE)
+SUMMARY_FIELDS = ['student', 'variant', 'task', 'status', 'model', 'score', 'max_score', 'response_file']
+
+
+def extract_score(text: str) -> tuple[str, str]:
+    """Return (score, max) from the last 'Итого: NNN / MMM' line, or ('', '')."""
+    matches = SCORE_RE.findall(text or '')
+    if not matches:
+        return '', ''
+    score, max_score = matches[-1]
+    return score.replace(',', '.'), max_score
+
+
+def select_students(roster, names: list[str] | None = None, group: str | None = None) -> list[Student]:
+    """Roster entries to grade, in roster order, optionally filtered by name or group."""
+    if names:
+        selected = []
+        for name in names:
+            s = roster.find(name)
+            if s is None:
+                print(f'Warning: {name} not found in students.csv', file=sys.stderr)
+            elif s not in selected:
+                selected.append(s)
+    else:
+        selected = list(roster)
+    if group:
+        selected = [s for s in selected if (s.row.get('Group') or '').strip() == group]
+    return [s for s in selected if s.dir_name]
+
+
+def grade_student(
+    student: Student,
+    task_folder: str,
+    readme_text: str | prepare_AI_prompt.SectionIndex,
+    variants: str | Mapping[int, str],
+    *,
+    session,
+    engine: str,
+    token: str,
+    models: list[str],
+    out_dir: Path,
+    limiter: RateLimiter | None = None,
+    timeout: float = 120,
+    cache_dir: Path | None = None,
+    cache_max_mb: float = run_ai_check.DEFAULT_CACHE_MAX_MB,
+    cache_max_age_days: float = run_ai_check.DEFAULT_CACHE_MAX_AGE_DAYS,
+    max_input_tokens: int = 0,
+) -> dict:
+    name = student.dir_name
+    row = {'student': name, 'variant': student.variant or '', 'task': task_folder,
+           'status': '', 'model': '', 'score': '', 'max_score': '', 'response_file': ''}
+    if not (ROOT / 'students' / name / task_folder).is_dir():
+        # a sparse checkout may simply not include this student's folder
+        row['status'] = 'not checked out' if is_sparse_checkout(ROOT) else 'no submission'
+        return row
+
+    prompt_text = prepare_AI_prompt.assemble_prompt(name, task_folder, student.variant or '(unknown)', readme_text, variants)
+    files = run_ai_check.collect_files(name, task_folder)
+    prompts = run_ai_check.build_model_prompts(prompt_text, files, models, max_input_tokens)
+
+    max_age = cache_max_age_days * 86400
+    hit = run_ai_check.cached_response(cache_dir, engine, models, prompts, max_age) if cache_dir else None
+    if hit is not None:
+        result = {'ok': True, 'model': hit[0], 'text': hit[1], 'cached': True}
+    else:
+        result = run_ai_check.run_with_fallback(
+            session, engine, models, token, prompts,
+            timeout=timeout, files_count=len(files), limiter=limiter,
+        )
+    out_file = out_dir / f'{name}.md'
+    row['response_file'] = out_file.name
+    if not result['ok']:
+        out_file.write_text(result['error'], encoding='utf-8')
+        row['status'] = 'error'
+        return row
+
+    out_file.write_text(result['text'], encoding='utf-8')
+    if cache_dir is not None and not result.get('cached'):
+        run_ai_check.store_response(cache_dir, engine, result['model'], prompts[result['model']], result['text'],
+                                    cache_max_mb, max_age)
+    row['score'], row['max_score'] = extract_score(result['text'])
+    row.update({'status': 'cached' if result.get('cached') else 'ok', 'model': result['model']})
+    return row
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description='AI-check every student for one task')
+    ap.add_argument('--task', required=True, help='Task number, e.g. task_03 or 3')
+    ap.add_argument('--students', help='Comma-separated NameLatin/directory names (default: whole roster)')
+    ap.add_argument('--group', help='Only students of this group (students.csv "Group" column)')
+    ap.add_argument('--engine', choices=['github', 'openai'], default='github')
+    ap.add_argument('--models', default=None, help='Comma-separated candidate models (default: MODEL env / engine default)')
+    ap.add_argument('--workers', type=int, default=4, help='Students graded concurrently')
+    ap.add_argument('--rpm', type=float, default=None, help='Max model requests per minute (default depends on engine)')
+    ap.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+    ap.add_argument('--max-input-tokens', type=int, default=int(os.environ.get('AI_MAX_INPUT_TOKENS') or 0))
+    ap.add_argument('--cache-dir', default=os.environ.get('AI_CACHE_DIR'), help='Response cache directory (see run_ai_check.py)')
+    ap.add_argument('--cache-max-mb', type=float, default=run_ai_check.DEFAULT_CACHE_MAX_MB, help='Evict least recently used responses above this size')
+    ap.add_argument('--cache-max-age-days', type=float, default=run_ai_check.DEFAULT_CACHE_MAX_AGE_DAYS, help='Ignore and evict responses older than this')
+    ap.add_argument('--out-dir', default='ai_grades', help='Responses go to <out-dir>/<task>/')
+    args = ap.parse_args(argv)
+
+    m = re.search(r'(\d+)', args.task)
+    if not m:
+        print('Invalid task name, specify a number like 03 or task_03', file=sys.stderr)
+        return 2
+    task_folder = f'task_{int(m.group(1)):02d}'
+
+    token = run_ai_check.engine_token(args.engine)
+    if not token:
+        env_name = 'GITHUB_TOKEN' if args.engine == 'github' else 'OPENAI_API_KEY'
+        print(f'{env_name} is required in env for {args.engine} engine', file=sys.stderr)
+        return 2
+    models = [x.strip() for x in (args.models or run_ai_check.default_model(args.engine)).split(',') if x.strip()]
+
+    students_csv = ROOT / 'students' / 'students.csv'
+    if not students_csv.exists():
+        print(f'students.csv not found at {students_csv}', file=sys.stderr)
+        return 2
+    names = [x.strip() for x in args.students.split(',') if x.strip()] if args.students else None
+    students = select_students(load_roster(students_csv), names, args.group)
+    if not students:
+        print('No students selected', file=sys.stderr)
+        return 2
+
+    # task inputs are read once for the whole run
+    readme_index = prepare_AI_prompt.load_section_index(ROOT / 'tasks' / task_folder / 'readme.md')
+    variants = prepare_AI_prompt.load_variant_table(ROOT / 'tasks' / task_folder / 'Варианты.md')
+
+    out_dir = Path(args.out_dir) / task_folder
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, args.workers)
+    limiter = RateLimiter(args.rpm if args.rpm is not None else DEFAULT_RPM[args.engine])
+    session = run_ai_check.new_session(pool_size=workers)
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+
+    def _grade(student: Student) -> dict:
+        try:
+            return grade_student(
+                student, task_folder, readme_index, variants,
+                session=session, engine=args.engine, token=token, models=models, out_dir=out_dir,
+                limiter=limiter, timeout=args.timeout, cache_dir=cache_dir, cache_max_mb=args.cache_max_mb,
+                cache_max_age_days=args.cache_max_age_days, max_input_tokens=args.max_input_tokens,
+            )
+        except Exception as exc:  # one broken submission must not stop the batch
+            print(f'Error grading {student.dir_name}: {exc}', file=sys.stderr)
+            return {'student': student.dir_name, 'variant': student.variant or '', 'task': task_folder, 'status': f'error: {exc}'}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(_grade, students))
+
+    summary = out_dir / 'summary.csv'
+    with summary.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+    counts: dict[str, int] = {}
+    for r in rows:
+        key = r['status'].split(':', 1)[0]
+        counts[key] = counts.get(key, 0) + 1
+    print(f'Graded {len(rows)} students for {task_folder}: ' + ', '.join(f'{k}={v}' for k, v in sorted(counts.items())))
+    print(f'Summary written to {summary}')
+    return 1 if counts.get('error') else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -6,28 +6,44 @@ Inputs via env:
 - PR_NUMBER: number
 - GITHUB_TOKEN: token
 - CHECK_RESULT_PATH: path to .github/check_result.json (optional)
+- ISSUE_INDEX_PATH: where to keep the issue index between runs (optional)
 
 Issue requirements:
 - Title: [LABS][NameLatin][taskN]
 - Body contains:
   NameLatin = ...\n
   taskN = ...\n
-This script detects NameLatin and task folder from check_result.json and changed files.
+This script takes NameLatin and the task folder from check_result.json: the validator
+stores `student`/`task` and the `changed_files` list there. The PR file list is only
+fetched from the API when the result file lacks both (older results, whitelisted authors).
+
+Re-runs (e.g. a `synchronize` push) reuse the open issue with the same title instead of
+opening a duplicate. Without a saved index the open issues are listed once (`state=open`).
+With ISSUE_INDEX_PATH the index is kept on disk and refreshed from the listing sorted by
+`updated`: its first page is re-validated with If-None-Match (304 -> nothing changed),
+and otherwise only the issues updated since the last run are read.
 """
 import os
 import json
 import sys
+import hashlib
 import logging
-from typing import List
+from typing import Dict, List, Optional
 
 import re
 
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
 try:
-    import requests
+    from github_client import GitHubClient, parse_link, shared_client
 except Exception:
     print('requests not installed')
     sys.exit(1)
 
+from student_paths import student_from_dir, student_task_pairs
+
 
 LOG = logging.getLogger('on_success_create_issue')
 LOG.setLevel(logging.INFO)
@@ -36,92 +52,174 @@ handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
 LOG.addHandler(handler)
 
 
-def get_pr_changed_files(repo: str, pr_number: str, headers: dict) -> List[str]:
-    url = f'https://api.github.com/repos/{repo}/pulls/{pr_number}/files?per_page=100'
+def get_pr_changed_files(repo: str, pr_number: str, client: GitHubClient) -> List[str]:
+    url = f'https://api.github.com/repos/{repo}/pulls/{pr_number}/files'
     files = []
-    while url:
-        r = requests.get(url, headers=headers)
-        if r.status_code != 200:
-            LOG.warning('Failed to fetch PR files: %s %s', r.status_code, r.text)
-            break
-        data = r.json()
-        for item in data:
+    try:
+        for item in client.paginate(url, params={'per_page': 100}):
             name = item.get('filename')
             if name:
                 files.append(name)
-        # pagination
-        link = r.headers.get('Link', '')
-        next_url = None
-        for part in link.split(','):
-            part = part.strip()
-            if part.endswith('rel="next"'):
-                m = re.match(r'<([^>]+)>;\s*rel="next"', part)
-                if m:
-                    next_url = m.group(1)
-        url = next_url
+    except RuntimeError as exc:
+        LOG.warning('Failed to fetch PR files: %s', exc)
     return files
 
 
-def add_label(repo: str, pr_number: str, headers: dict, label: str) -> int:
+def add_label(repo: str, pr_number: str, client: GitHubClient, label: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.post(url, headers=headers, json=[label])
+    r = client.post(url, json=[label])
     LOG.info('add_label status=%s', r.status_code)
     return r.status_code
 
 
-def ensure_label(repo: str, pr_number: str, headers: dict, label: str):
+def ensure_label(repo: str, pr_number: str, client: GitHubClient, label: str):
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/labels'
-    r = requests.get(url, headers=headers)
+    r = client.get(url)
     if r.status_code == 200:
         names = [x['name'] for x in r.json()]
         if label in names:
             return
-    add_label(repo, pr_number, headers, label)
+    add_label(repo, pr_number, client, label)
+
+
+def body_digest(body: str) -> str:
+    return hashlib.sha256((body or '').encode('utf-8')).hexdigest()
+
+
+def load_issue_index(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_issue_index(path: str, index: dict) -> None:
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as exc:
+        LOG.warning('Could not save issue index to %s: %s', path, exc)
+
+
+def _index_entry(item: dict) -> dict:
+    return {'title': item.get('title') or '', 'state': item.get('state'),
+            'updated_at': item.get('updated_at') or '', 'digest': body_digest(item.get('body'))}
+
+
+def open_issue_index(repo: str, client: GitHubClient) -> dict:
+    """Cold lookup: an index of the open issues only, from one `state=open` listing.
+
+    Its `updated_at` watermark lets the next run (with ISSUE_INDEX_PATH) continue
+    incrementally: anything closed or created later is updated after it.
+    """
+    issues: Dict[str, dict] = {}
+    newest = ''
+    try:
+        for item in client.paginate(f'https://api.github.com/repos/{repo}/issues', params={'state': 'open', 'per_page': 100}):
+            newest = max(newest, item.get('updated_at') or '')
+            if 'pull_request' not in item:
+                issues[str(item['number'])] = _index_entry(item)
+    except RuntimeError as exc:
+        LOG.warning('Failed to list open issues: %s', exc)
+        return {'repo': repo, 'issues': {}}
+    LOG.info('Listed %d open issues', len(issues))
+    return {'repo': repo, 'etag': None, 'updated_at': newest, 'issues': issues}
 
 
-def create_issue(repo: str, headers: dict, title: str, body: str) -> int:
+def refresh_issue_index(repo: str, client: GitHubClient, index: Optional[dict] = None) -> dict:
+    """Bring the index {'repo', 'etag', 'updated_at', 'issues': {number: entry}} up to date.
+
+    Without a saved index this is the cold `state=open` lookup (open_issue_index).
+    A saved index is refreshed from the `state=all` listing sorted by `updated`
+    (newest first), so any change to any issue changes page 1: a 304 on it means
+    the index is current, and otherwise pages are read only until issues older
+    than the watermark show up. Pull requests in the listing are skipped. On
+    errors the saved index is returned.
+    """
+    index = dict(index or {})
+    if index.get('repo') != repo or not index.get('updated_at'):
+        return open_issue_index(repo, client)
+    issues: Dict[str, dict] = dict(index.get('issues') or {})
+    watermark = index['updated_at']
+
+    url = f'https://api.github.com/repos/{repo}/issues'
+    params = {'state': 'all', 'sort': 'updated', 'direction': 'desc', 'per_page': 100}
+    headers = {'If-None-Match': index['etag']} if index.get('etag') and issues else {}
+    r = client.get(url, params=params, headers=headers)
+    if r.status_code == 304:
+        LOG.info('Issue index is current (304), %d issues', len(issues))
+        return index
+    etag = r.headers.get('ETag')
+    newest = watermark
+    while True:
+        if r.status_code != 200:
+            LOG.warning('Failed to list issues: %s %s', r.status_code, r.text)
+            return index
+        items = r.json()
+        for item in items:
+            updated = item.get('updated_at') or ''
+            newest = max(newest, updated)
+            if 'pull_request' not in item:
+                issues[str(item['number'])] = _index_entry(item)
+        # everything below the watermark is already in the index
+        next_url = parse_link(r.headers.get('Link'), 'next')
+        if not next_url or (items and (items[-1].get('updated_at') or '') < watermark):
+            break
+        r = client.get(next_url)
+    LOG.info('Issue index refreshed: %d issues', len(issues))
+    return {'repo': repo, 'etag': etag, 'updated_at': newest, 'issues': issues}
+
+
+def find_open_issue(index: dict, title: str) -> Optional[int]:
+    """Number of the oldest open issue titled exactly `title`, or None."""
+    numbers = [int(n) for n, e in (index.get('issues') or {}).items() if e.get('state') == 'open' and e.get('title') == title]
+    return min(numbers) if numbers else None
+
+
+def update_issue(repo: str, client: GitHubClient, number: int, body: str) -> int:
+    url = f'https://api.github.com/repos/{repo}/issues/{number}'
+    r = client.patch(url, json={'body': body})
+    LOG.info('update_issue status=%s', r.status_code)
+    return r.status_code
+
+
+def create_issue(repo: str, client: GitHubClient, title: str, body: str) -> int:
     url = f'https://api.github.com/repos/{repo}/issues'
-    r = requests.post(url, headers=headers, json={"title": title, "body": body})
+    r = client.post(url, json={"title": title, "body": body})
     LOG.info('create_issue status=%s', r.status_code)
     if r.status_code in (200,201):
         return r.json().get('number')
     return 0
 
 
-def comment_pr(repo: str, pr_number: str, headers: dict, body: str):
+def comment_pr(repo: str, pr_number: str, client: GitHubClient, body: str):
     url = f'https://api.github.com/repos/{repo}/issues/{pr_number}/comments'
-    r = requests.post(url, headers=headers, json={'body': body})
+    r = client.post(url, json={'body': body})
     LOG.info('comment_pr status=%s', r.status_code)
 
 
+def student_and_task_from_result(data: dict) -> tuple[str, str] | None:
+    """(student, task) recorded by check_student_directory.py, or None if the result lacks them."""
+    if data.get('student') and data.get('task'):
+        return data['student'], data['task']
+    if data.get('changed_files'):
+        return detect_student_and_task(data['changed_files'], data.get('allowed'))
+    return None
+
+
 def detect_student_and_task(files: List[str], fallback_allowed: str | None) -> tuple[str, str]:
     # Expect paths like students/NameLatin/task_XX/...
-    student = ''
-    task = ''
-    for f in files:
-        m = re.match(r'^students/([^/]+)/((task_|Task_)(\d{1,2}))/.*', f)
-        if m:
-            student = m.group(1)
-            task = m.group(2)
-            break
-        m2 = re.match(r'^students/([^/]+)/(task_\d{2})/.*', f)
-        if m2:
-            student = m2.group(1)
-            task = m2.group(2)
-            break
-    if not student and fallback_allowed:
-        # allowed path like students/NameLatin
-        m = re.match(r'/?\.?/?students/([^/]+)', fallback_allowed.replace('\\','/'))
-        if m:
-            student = m.group(1)
-    if not task:
-        # try to find explicit task folder among files
-        for f in files:
-            m = re.search(r'(task_\d{2})', f, re.IGNORECASE)
-            if m:
-                task = m.group(1)
-                break
-    return student, task
+    pairs = student_task_pairs(files)
+    if len(pairs) > 1:
+        LOG.warning('Several student/task folders changed, using the first: %s', pairs)
+    if pairs:
+        return pairs[0]
+    return student_from_dir(fallback_allowed), ''
 
 
 def main() -> int:
@@ -134,45 +232,60 @@ def main() -> int:
         LOG.error('Missing required environment variables (REPO, PR_NUMBER, GITHUB_TOKEN)')
         return 1
 
-    headers = {'Authorization': f'token {token}', 'Accept': 'application/vnd.github.v3+json'}
+    client = shared_client(token)
 
     # Only proceed if success
-    allowed = None
+    data = {}
     if os.path.exists(path):
         try:
             data = json.load(open(path, encoding='utf-8'))
             if int(data.get('exit_code', 1)) != 0:
                 LOG.info('Validation not successful, skipping success handler')
                 return 0
-            allowed = data.get('allowed')
         except Exception:
-            pass
+            data = {}
 
-    files = get_pr_changed_files(repo, pr, headers)
-    student, task = detect_student_and_task(files, allowed)
+    detected = student_and_task_from_result(data)
+    if detected is None:
+        LOG.info('No changed files in %s, listing PR files via the API', path)
+        detected = detect_student_and_task(get_pr_changed_files(repo, pr, client), data.get('allowed'))
+    student, task = detected
     if not student or not task:
         LOG.warning('Could not detect student or task from PR files')
         # still label as approved, but skip issue creation
-        ensure_label(repo, pr, headers, 'Dir approved')
+        ensure_label(repo, pr, client, 'Dir approved')
         return 0
 
     # Normalize task to task_N (no leading zeros in title as per requirement)
     m = re.search(r'(\d{1,2})', task)
     taskN = f'task{int(m.group(1))}' if m else task
 
-    ensure_label(repo, pr, headers, 'Dir approved')
+    ensure_label(repo, pr, client, 'Dir approved')
 
     title = f'[LABS][{student}][{taskN}]'
     body = f'NameLatin = {student}\n\n' \
            f'taskN = {taskN}\n\n' \
            f'(Auto-created by CI on directory approval)'
 
-    issue_number = create_issue(repo, headers, title, body)
-    if issue_number:
-        comment_pr(repo, pr, headers, f'Created tracking issue #{issue_number} for AI check: {title}')
+    index_path = os.environ.get('ISSUE_INDEX_PATH')
+    index = refresh_issue_index(repo, client, load_issue_index(index_path) if index_path else None)
+    existing = find_open_issue(index, title)
+    if existing:
+        entry = index['issues'][str(existing)]
+        if entry.get('digest') != body_digest(body) and update_issue(repo, client, existing, body) == 200:
+            entry['digest'] = body_digest(body)
+        LOG.info('Tracking issue #%s already open for %s, not creating another', existing, title)
     else:
-        LOG.warning('Issue creation failed')
+        issue_number = create_issue(repo, client, title, body)
+        if issue_number:
+            index.setdefault('issues', {})[str(issue_number)] = {'title': title, 'state': 'open', 'updated_at': '', 'digest': body_digest(body)}
+            comment_pr(repo, pr, client, f'Created tracking issue #{issue_number} for AI check: {title}')
+        else:
+            LOG.warning('Issue creation failed')
+    if index_path:
+        save_issue_index(index_path, index)
 
+    client.log_stats(LOG)
     return 0
 
 
@@ -2,84 +2,200 @@
 
 Usage: python prepare_AI_prompt.py --student <StudentDirectoryName> --task <taskN>
 
-The script reads `students/students.csv` to determine the variant number for the given
-student, reads `tasks/task_<taskN>/readme.md` and `tasks/task_<taskN>/Варианты.md` and
-assembles the prompt according to the required template.
+The script looks the student up in the shared roster index (`roster.py`, built from
+`students/students.csv`) to determine the variant number, reads `tasks/task_<taskN>/readme.md`
+and `tasks/task_<taskN>/Варианты.md` and assembles the prompt according to the required template.
 
 It prints the prompt to stdout.
+
+With --cache-dir (or PROMPT_CACHE_DIR) assembled prompts are stored under a sha256 of the
+readme and variants file contents plus the student and variant, so unchanged inputs skip
+all markdown parsing. `--warm task_XX --cache-dir DIR` precomputes prompts for the whole roster.
+
+Library use (other scripts import this module instead of running it):
+    build_prompt(student, task_folder, cache_dir=None) -> the text main() prints
+    assemble_prompt(student, task, variant, readme, variants) with preloaded
+    load_section_index(...) / load_variant_table(...) for batch callers
 """
 
 from __future__ import annotations
 
 import argparse
-import csv
+import bisect
+import functools
+import hashlib
+import os
 import re
 import sys
+import threading
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from roster import load_roster
 
 
 ROOT = Path(__file__).resolve().parents[2]
 
 
-def read_students_csv(path: Path) -> list[dict]:
-    with path.open(encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+# `## Header` line (matched on the stripped line) and the unstripped line that ends a section
+HEADER_RE = re.compile(r"^##\s+(.*?)\s*$")
+SECTION_BREAK_RE = re.compile(r"^##\s+")
+# <!-- START: tag -->, <!-- END tag -->, <!-- STOP-tag -->
+MARKER_RE = re.compile(r"<!--\s*(START|END|STOP)\s*(?:[:\-]\s*|\s+)([^>]+?)\s*-->", re.IGNORECASE)
 
 
-def find_student_variant(students: list[dict], student_dir_name: str) -> str | None:
-    # students.csv has a column 'Directory' with paths like './students/Name'
-    for row in students:
-        directory = (row.get('Directory') or '').replace('\\', '/').strip()
-        # accept either the NameLatin or last segment
-        last = Path(directory).name
-        if last == student_dir_name or (row.get('NameLatin') or '') == student_dir_name:
-            return row.get('Вариант') or row.get('Variant') or row.get('Вариант ')
-    return None
+def normalize_header(header: str) -> str:
+    return " ".join(header.split()).casefold()
 
 
-def _build_marker_regex(tag: str, keywords: tuple[str, ...]) -> re.Pattern[str]:
-    joined = "|".join(keywords)
-    return re.compile(
-        rf"<!--\s*(?:{joined})\s*(?:[:\-]\s*|\s+){re.escape(tag)}\s*-->",
-        re.IGNORECASE,
-    )
+class SectionIndex:
+    """One-pass index of a task readme: `## ` headers and START/END markers mapped to spans.
 
+    Build it with `index_for_text` or `load_section_index` so each readme is scanned once.
+    """
 
-def extract_section_by_markers(readme_text: str, tags: list[str] | None) -> str:
-    if not tags:
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.splitlines()
+        # normalized header -> index of the line after the first such header
+        self.headers: dict[str, int] = {}
+        # line indices that end a section
+        self.breaks: list[int] = []
+        for i, line in enumerate(self.lines):
+            m = HEADER_RE.match(line.strip())
+            if m:
+                self.headers.setdefault(normalize_header(m.group(1)), i + 1)
+            if SECTION_BREAK_RE.match(line):
+                self.breaks.append(i)
+        # normalized tag -> offsets: content start after START markers, marker start for END/STOP
+        self.starts: dict[str, list[int]] = {}
+        self.ends: dict[str, list[int]] = {}
+        for m in MARKER_RE.finditer(text):
+            tag = normalize_header(m.group(2))
+            if m.group(1).upper() == "START":
+                self.starts.setdefault(tag, []).append(m.end())
+            else:
+                self.ends.setdefault(tag, []).append(m.start())
+
+    def by_markers(self, tags: list[str] | None) -> str:
+        for tag in tags or ():
+            key = normalize_header(tag)
+            starts = self.starts.get(key)
+            if not starts:
+                continue
+            ends = self.ends.get(key, [])
+            i = bisect.bisect_left(ends, starts[0])
+            if i == len(ends):
+                continue
+            return self.text[starts[0] : ends[i]].strip()
         return ""
-    for tag in tags:
-        start_pattern = _build_marker_regex(tag, ("START",))
-        end_pattern = _build_marker_regex(tag, ("END", "STOP"))
-        start_match = start_pattern.search(readme_text)
-        if not start_match:
+
+    def by_headers(self, headers: list[str]) -> str:
+        for header in headers:
+            start = self.headers.get(normalize_header(header))
+            if start is None:
+                continue
+            i = bisect.bisect_left(self.breaks, start)
+            stop = self.breaks[i] if i < len(self.breaks) else len(self.lines)
+            return "\n".join(self.lines[start:stop]).strip()
+        return ""
+
+    def section(self, headers: list[str], marker_tags: list[str] | None = None) -> str:
+        marker_content = self.by_markers(marker_tags)
+        if marker_content:
+            return strip_leading_header(marker_content, headers)
+        return self.by_headers(headers)
+
+
+@functools.lru_cache(maxsize=32)
+def index_for_text(readme_text: str) -> SectionIndex:
+    return SectionIndex(readme_text)
+
+
+_FILE_MEMO: dict[tuple[str, str, int, int], object] = {}
+_FILE_MEMO_LOCK = threading.Lock()
+
+
+def _memoized_by_mtime(kind: str, path: Path, build):
+    """build(text) for the file contents, memoized by (kind, path, mtime, size); build('') if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return build("")
+    key = (kind, str(path.resolve()), st.st_mtime_ns, st.st_size)
+    with _FILE_MEMO_LOCK:
+        value = _FILE_MEMO.get(key)
+    if value is None:
+        value = build(path.read_text(encoding="utf-8"))
+        with _FILE_MEMO_LOCK:
+            _FILE_MEMO[key] = value
+    return value
+
+
+def load_section_index(path: Path) -> SectionIndex:
+    """Section index of a readme file, memoized by (path, mtime, size); empty if missing."""
+    return _memoized_by_mtime("readme", path, index_for_text)
+
+
+# "12. Тема ..." starts a variant entry; headers and unindented prose after a blank line end it
+VARIANT_RE = re.compile(r"^(\d+)\.\s+(.*)")
+
+
+@functools.lru_cache(maxsize=32)
+def parse_variants(variants_text: str) -> MappingProxyType:
+    """{variant number: description} from a Варианты.md list.
+
+    Continuation lines of an entry (wrapped text, indented sub-items, indented
+    paragraphs after a blank line) are kept, joined with newlines.
+    """
+    table: dict[int, str] = {}
+    current: int | None = None
+    collected: list[str] = []
+    pending_blank = False
+
+    def flush() -> None:
+        if current is not None:
+            table.setdefault(current, "\n".join(collected).strip())
+
+    for line in variants_text.splitlines():
+        m = VARIANT_RE.match(line)
+        if m:
+            flush()
+            current, collected, pending_blank = int(m.group(1)), [m.group(2).strip()], False
             continue
-        end_match = end_pattern.search(readme_text, pos=start_match.end())
-        if not end_match:
+        if current is None:
             continue
-        return readme_text[start_match.end() : end_match.start()].strip()
-    return ""
+        if not line.strip():
+            pending_blank = True
+            continue
+        if line.lstrip().startswith("#") or (pending_blank and not line[:1].isspace()):
+            flush()
+            current, collected = None, []
+            continue
+        if pending_blank:
+            collected.append("")
+            pending_blank = False
+        collected.append(line.strip())
+    flush()
+    return MappingProxyType(table)
+
+
+def load_variant_table(path: Path) -> MappingProxyType:
+    """Parsed Варианты.md, memoized by (path, mtime, size); empty if missing."""
+    return _memoized_by_mtime("variants", path, parse_variants)
+
+
+def extract_section_by_markers(readme_text: str, tags: list[str] | None) -> str:
+    return index_for_text(readme_text).by_markers(tags)
 
 
 def extract_section_by_headers(readme_text: str, headers: list[str]) -> str:
-    lines = readme_text.splitlines()
-    for header in headers:
-        pattern = re.compile(rf"^##\s+{re.escape(header)}\s*$", re.IGNORECASE)
-        start = None
-        for i, line in enumerate(lines):
-            if pattern.match(line.strip()):
-                start = i + 1
-                break
-        if start is None:
-            continue
-        collected: list[str] = []
-        for line in lines[start:]:
-            if re.match(r"^##\s+", line):
-                break
-            collected.append(line)
-        return "\n".join(collected).strip()
-    return ""
+    return index_for_text(readme_text).by_headers(headers)
 
 
 def strip_leading_header(text: str, headers: list[str]) -> str:
@@ -90,22 +206,16 @@ def strip_leading_header(text: str, headers: list[str]) -> str:
         lines.pop(0)
     if not lines:
         return ""
-    first = lines[0].strip()
-    for header in headers:
-        pattern = re.compile(rf"^##\s+{re.escape(header)}\s*$", re.IGNORECASE)
-        if pattern.match(first):
+    m = HEADER_RE.match(lines[0].strip())
+    if m and normalize_header(m.group(1)) in {normalize_header(h) for h in headers}:
+        lines.pop(0)
+        while lines and not lines[0].strip():
             lines.pop(0)
-            while lines and not lines[0].strip():
-                lines.pop(0)
-            break
     return "\n".join(lines).strip()
 
 
 def extract_section(readme_text: str, headers: list[str], marker_tags: list[str] | None = None) -> str:
-    marker_content = extract_section_by_markers(readme_text, marker_tags)
-    if marker_content:
-        return strip_leading_header(marker_content, headers)
-    return extract_section_by_headers(readme_text, headers)
+    return index_for_text(readme_text).section(headers, marker_tags)
 
 
 def load_file(path: Path) -> str:
@@ -114,15 +224,15 @@ def load_file(path: Path) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def assemble_prompt(student: str, task: str, variant: str, readme_text: str, variants_text: str) -> str:
-    description = extract_section(readme_text, ['Описание'], ['description'])
-    criteria = extract_section(
-        readme_text,
+def assemble_prompt(student: str, task: str, variant: str, readme_text: str | SectionIndex, variants_text: str | Mapping[int, str]) -> str:
+    index = readme_text if isinstance(readme_text, SectionIndex) else index_for_text(readme_text)
+    description = index.section(['Описание'], ['description'])
+    criteria = index.section(
         ['Критерии оценивания (100 баллов)', 'Критерии оценивания'],
         ['criteria'],
     )
-    artifacts = extract_section(readme_text, ['Артефакты (что сдаём)', 'Артефакты'], ['artifacts'])
-    bonuses = extract_section(readme_text, ['Бонусы (+ до 10)', 'Бонусы'], ['bonuses'])
+    artifacts = index.section(['Артефакты (что сдаём)', 'Артефакты'], ['artifacts'])
+    bonuses = index.section(['Бонусы (+ до 10)', 'Бонусы'], ['bonuses'])
 
     criteria_parts: list[str] = []
     if criteria:
@@ -131,18 +241,11 @@ def assemble_prompt(student: str, task: str, variant: str, readme_text: str, var
         criteria_parts.append('Бонусы (+ до 10)\n' + bonuses)
     criteria_text = '\n\n'.join(criteria_parts).strip()
 
-    # Get variant description from variants_text
-    variant_desc = ""
+    table = parse_variants(variants_text) if isinstance(variants_text, str) else variants_text
     try:
-        variant_num = int(variant)
-        lines = variants_text.splitlines()
-        for line in lines:
-            m = re.match(rf"^{variant_num}\.\s+(.*)", line)
-            if m:
-                variant_desc = m.group(1).strip()
-                break
-    except Exception:
-        pass
+        variant_desc = table.get(int(variant), "")
+    except ValueError:
+        variant_desc = ""
 
     system_message = (
         "Ты строгий проверяющий лабораторных работ. Оценивай только по критериям, не рассуждай вне шаблона, "
@@ -182,36 +285,133 @@ def assemble_prompt(student: str, task: str, variant: str, readme_text: str, var
     return "\n".join(prompt_lines)
 
 
+PROMPT_CACHE_VERSION = "1"
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of the file contents ('' for a missing file)."""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return ""
+
+
+# editing the prompt wording in this file invalidates cached prompts without a version bump
+TEMPLATE_DIGEST = file_digest(Path(__file__))
+
+
+def prompt_cache_key(student: str, task: str, variant: str, readme_digest: str, variants_digest: str) -> str:
+    h = hashlib.sha256()
+    for part in (PROMPT_CACHE_VERSION, TEMPLATE_DIGEST, student, task, variant, readme_digest, variants_digest):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def read_cached_prompt(cache_dir: Path, key: str) -> str | None:
+    try:
+        return (cache_dir / f"{key}.txt").read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def write_cached_prompt(cache_dir: Path, key: str, prompt: str) -> None:
+    path = cache_dir / f"{key}.txt"
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(prompt, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as exc:
+        print(f"Warning: could not write prompt cache: {exc}", file=sys.stderr)
+
+
+def student_variant(student: str, students_csv: Path) -> str:
+    entry = load_roster(students_csv).find(student) if students_csv.exists() else None
+    return (entry.variant if entry else None) or "(unknown)"
+
+
+def build_prompt(student: str, task_folder: str, cache_dir: Path | None = None, variant: str | None = None) -> str:
+    """Prompt for one student, served from `cache_dir` when the task files and variant are unchanged."""
+    if variant is None:
+        variant = student_variant(student, ROOT / "students" / "students.csv")
+    readme_path = ROOT / "tasks" / task_folder / "readme.md"
+    variants_path = ROOT / "tasks" / task_folder / "Варианты.md"
+
+    key = None
+    if cache_dir is not None:
+        key = prompt_cache_key(student, task_folder, variant, file_digest(readme_path), file_digest(variants_path))
+        cached = read_cached_prompt(cache_dir, key)
+        if cached is not None:
+            return cached
+
+    prompt = assemble_prompt(student, task_folder, variant, load_section_index(readme_path), load_variant_table(variants_path))
+    if key is not None:
+        write_cached_prompt(cache_dir, key, prompt)
+    return prompt
+
+
+def warm_cache(task_folder: str, cache_dir: Path) -> int:
+    """Store prompts for every roster student; returns how many were built (not already cached)."""
+    students_csv = ROOT / "students" / "students.csv"
+    if not students_csv.exists():
+        return 0
+    readme_path = ROOT / "tasks" / task_folder / "readme.md"
+    variants_path = ROOT / "tasks" / task_folder / "Варианты.md"
+    readme_digest = file_digest(readme_path)
+    variants_digest = file_digest(variants_path)
+    readme_index = None
+    variants = None
+    built = 0
+    for entry in load_roster(students_csv):
+        student = entry.dir_name
+        if not student:
+            continue
+        variant = entry.variant or "(unknown)"
+        key = prompt_cache_key(student, task_folder, variant, readme_digest, variants_digest)
+        if (cache_dir / f"{key}.txt").exists():
+            continue
+        if readme_index is None:
+            readme_index = load_section_index(readme_path)
+            variants = load_variant_table(variants_path)
+        write_cached_prompt(cache_dir, key, assemble_prompt(student, task_folder, variant, readme_index, variants))
+        built += 1
+    return built
+
+
+def task_folder_name(task_raw: str) -> str | None:
+    """Normalize '3', 'task_3', 'task03' to 'task_03'."""
+    m = re.search(r'(\d+)', task_raw)
+    return f'task_{int(m.group(1)):02d}' if m else None
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
-    parser.add_argument('--student', '-s', required=True, help='Student directory name (NameLatin)')
-    parser.add_argument('--task', '-t', required=True, help='Task number, e.g. task_01 or task_1 or 01')
+    parser.add_argument('--student', '-s', help='Student directory name (NameLatin)')
+    parser.add_argument('--task', '-t', help='Task number, e.g. task_01 or task_1 or 01')
+    parser.add_argument('--cache-dir', default=os.environ.get('PROMPT_CACHE_DIR'),
+                        help='Assembled prompt cache directory (env PROMPT_CACHE_DIR); disabled if unset')
+    parser.add_argument('--warm', metavar='TASK', help='Precompute prompts for every student of TASK into --cache-dir and exit')
     args = parser.parse_args(argv)
 
-    student = args.student
-    task_raw = args.task
-    # normalize task folder name to task_XX
-    m = re.search(r'(\d+)', task_raw)
-    if not m:
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+    if args.warm:
+        task_folder = task_folder_name(args.warm)
+        if not task_folder or cache_dir is None:
+            print('--warm needs a task number and --cache-dir', file=sys.stderr)
+            return 2
+        built = warm_cache(task_folder, cache_dir)
+        print(f'Warmed {built} prompts for {task_folder} in {cache_dir}', file=sys.stderr)
+        return 0
+
+    if not args.student or not args.task:
+        parser.error('--student and --task are required')
+    task_folder = task_folder_name(args.task)
+    if not task_folder:
         print('Invalid task name, specify a number like 01 or task_01', file=sys.stderr)
         return 2
-    task_num = int(m.group(1))
-    task_folder = f'task_{task_num:02d}'
-
-    students_csv = ROOT / 'students' / 'students.csv'
-    students = []
-    if students_csv.exists():
-        students = read_students_csv(students_csv)
-    variant = find_student_variant(students, student) or '(unknown)'
-
-    readme_path = ROOT / 'tasks' / task_folder / 'readme.md'
-    variants_path = ROOT / 'tasks' / task_folder / 'Варианты.md'
-
-    readme_text = load_file(readme_path)
-    variants_text = load_file(variants_path)
 
-    prompt = assemble_prompt(student, task_folder, variant, readme_text, variants_text)
-    print(prompt)
+    print(build_prompt(args.student, task_folder, cache_dir))
     return 0
 
 
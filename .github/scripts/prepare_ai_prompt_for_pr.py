@@ -1,72 +1,73 @@
 #!/usr/bin/env python3
 """Fetch PR context, prepare AI prompt, and checkout the PR branch.
 
+The prompt is built in-process with `prepare_AI_prompt.build_prompt`. Several PRs
+can be handled in one run by repeating --pr (the branch checkout is skipped then).
+
+Review queue prefetch: --prs 101,102 and/or --label-queue LABEL fetch the PRs and
+their file lists concurrently and write one `pr-<N>.md` (details, changed files,
+prompt) per PR into --out-dir, so the queue can be read offline.
+
+--worktree checks PRs out into a pool of `git worktree`s (one per PR, see
+worktree_pool.py) instead of `git checkout -B` in the main tree; with several
+--pr values every PR gets its own worktree.
+
 Optional: mark the PR with a comment and a label using --mark.
 """
 from __future__ import annotations
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 import subprocess
 import sys
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional
 import typer
 
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
 try:
-    import requests
+    from github_client import shared_client
 except Exception as exc:  # pragma: no cover - dependency error is fatal
     print("This script requires the requests package: {}".format(exc), file=sys.stderr)
     sys.exit(2)
 
+import prepare_AI_prompt
+from student_paths import student_task_pairs
+from worktree_pool import DEFAULT_MAX_WORKTREES, WorktreeError, WorktreePool
+
 ROOT = Path(__file__).resolve().parents[2]
 DEFAULT_REPO = "brstu/WT-AC-2025"
-PREPARE_SCRIPT = ROOT / ".github" / "scripts" / "prepare_AI_prompt.py"
-
-
-def build_headers(token: str | None) -> dict[str, str]:
-    headers = {"Accept": "application/vnd.github+json"}
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-    return headers
+DEFAULT_PROMPTS_DIR = "ai_prompts"
+# the PR files endpoint returns at most 3000 entries
+FILES_API_MAX_ITEMS = 3000
+PAGE_WORKERS = 4
 
 
 def fetch_pr(repo: str, pr_number: int, token: str | None) -> dict:
     url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}"
-    resp = requests.get(url, headers=build_headers(token), timeout=30)
+    resp = shared_client(token).get(url)
     if resp.status_code != 200:
         raise RuntimeError(f"Failed to fetch PR #{pr_number}: HTTP {resp.status_code} {resp.text}")
     return resp.json()
 
 
-def fetch_pr_files(repo: str, pr_number: int, token: str | None) -> list[dict]:
-    files: list[dict] = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/repos/{repo}/pulls/{pr_number}/files"
-        resp = requests.get(
-            url,
-            headers=build_headers(token),
-            params={"page": page, "per_page": 100},
-            timeout=30,
-        )
-        if resp.status_code != 200:
-            raise RuntimeError(
-                f"Failed to fetch files for PR #{pr_number}: HTTP {resp.status_code} {resp.text}"
-            )
-        batch = resp.json()
-        if not batch:
-            break
-        files.extend(batch)
-        if len(batch) < 100:
-            break
-        page += 1
-    return files
+def fetch_pr_files(repo: str, pr_number: int, token: str | None, total: int | None = None) -> list[dict]:
+    """Changed files of a PR. With `total` (the PR's changed_files) pages are fetched concurrently."""
+    if total:
+        path = f"/repos/{repo}/pulls/{pr_number}/files"
+        return shared_client(token).fetch_pages(path, min(total, FILES_API_MAX_ITEMS), workers=PAGE_WORKERS)
+    try:
+        return list(shared_client(token).paginate(f"/repos/{repo}/pulls/{pr_number}/files", params={"per_page": 100}))
+    except RuntimeError as exc:
+        raise RuntimeError(f"Failed to fetch files for PR #{pr_number}: {exc}") from exc
 
 
 def post_pr_comment(repo: str, pr_number: int, token: str | None, body: str) -> None:
     """Create an issue comment on the PR."""
     url = f"https://api.github.com/repos/{repo}/issues/{pr_number}/comments"
-    resp = requests.post(url, headers=build_headers(token), json={"body": body}, timeout=30)
+    resp = shared_client(token).post(url, json={"body": body})
     if resp.status_code not in (200, 201):
         raise RuntimeError(
             f"Failed to post comment to PR #{pr_number}: HTTP {resp.status_code} {resp.text}"
@@ -77,7 +78,7 @@ def add_pr_label(repo: str, pr_number: int, token: str | None, label: str) -> No
     """Add a label to the PR issue."""
     url = f"https://api.github.com/repos/{repo}/issues/{pr_number}/labels"
     # GitHub accepts either {"labels": [label]} or a JSON list payload [label]
-    resp = requests.post(url, headers=build_headers(token), json=[label], timeout=30)
+    resp = shared_client(token).post(url, json=[label])
     if resp.status_code not in (200, 201):
         raise RuntimeError(
             f"Failed to add label '{label}' to PR #{pr_number}: HTTP {resp.status_code} {resp.text}"
@@ -85,48 +86,104 @@ def add_pr_label(repo: str, pr_number: int, token: str | None, label: str) -> No
 
 
 def detect_student_task(paths: Iterable[str]) -> tuple[str, str]:
-    pairs: set[tuple[str, str]] = set()
-    for path in paths:
-        parts = path.split("/")
-        if len(parts) < 3 or parts[0] != "students":
-            continue
-        student = parts[1]
-        task_segment = parts[2]
-        match = re.search(r"(\d+)", task_segment)
-        if not match:
-            continue
-        task_number = int(match.group(1))
-        task_name = f"task_{task_number:02d}"
-        pairs.add((student, task_name))
+    pairs = student_task_pairs(paths)
     if not pairs:
         raise RuntimeError("Could not detect student/task from PR file list.")
     if len(pairs) > 1:
         raise RuntimeError(f"Multiple student/task combinations detected: {sorted(pairs)}")
-    return pairs.pop()
-
-
-def run_prepare_script(student: str, task: str) -> str:
-    if not PREPARE_SCRIPT.exists():
-        raise RuntimeError(f"prepare_AI_prompt.py not found at {PREPARE_SCRIPT}")
-    cmd = [sys.executable, str(PREPARE_SCRIPT), "--student", student, "--task", task]
-    env = os.environ.copy()
-    env.setdefault("PYTHONIOENCODING", "utf-8")
-    result = subprocess.run(
-        cmd,
-        cwd=ROOT,
-        capture_output=True,
-        text=True,
-        env=env,
-        encoding="utf-8",
-        errors="replace",
-    )
-    if result.returncode != 0:
-        raise RuntimeError(
-            "prepare_AI_prompt.py failed with code {}: {}".format(
-                result.returncode, result.stderr.strip()
-            )
-        )
-    return result.stdout.strip()
+    return pairs[0]
+
+
+def build_pr_prompt(student: str, task: str, cache_dir: Path | None = None) -> str:
+    """Same text `prepare_AI_prompt.py --student ... --task ...` prints, without a subprocess."""
+    task_folder = prepare_AI_prompt.task_folder_name(task)
+    if not task_folder:
+        raise RuntimeError(f"Invalid task name: {task}")
+    return prepare_AI_prompt.build_prompt(student, task_folder, cache_dir).strip()
+
+
+def prepare_pr(repo: str, pr: int, token: str | None, cache_dir: Path | None = None) -> str:
+    """Print PR details and changed files, then return the prepared prompt."""
+    pr_obj = fetch_pr(repo, pr, token)
+    print(f"PR #{pr} -> {pr_obj.get('title', '(no title)')}")
+
+    pr_files = fetch_pr_files(repo, pr, token)
+    filenames = [item.get("filename", "") for item in pr_files]
+    print("Changed files:")
+    for item in pr_files:
+        name = item.get("filename", "(unknown)")
+        status = item.get("status", "?")
+        print(f" - {status:>7} {name}")
+
+    student, task = detect_student_task(filenames)
+    print(f"Detected student='{student}' task='{task}'")
+    return build_pr_prompt(student, task, cache_dir)
+
+
+def list_labeled_prs(repo: str, token: str | None, label: str) -> list[int]:
+    """Open PR numbers carrying `label`, oldest first (the review queue order)."""
+    params = {"state": "open", "labels": label, "per_page": 100, "sort": "created", "direction": "asc"}
+    issues = shared_client(token).paginate(f"/repos/{repo}/issues", params=params)
+    return [item["number"] for item in issues if "pull_request" in item]
+
+
+def prefetch_pr(repo: str, pr: int, token: str | None, cache_dir: Path | None = None) -> dict:
+    """Fetch one PR's details and files and build its prompt without printing.
+
+    Returns {'pr', 'title', 'url', 'files', 'student', 'task', 'prompt'} or {'pr', 'error'}.
+    """
+    try:
+        pr_obj = fetch_pr(repo, pr, token)
+        pr_files = fetch_pr_files(repo, pr, token, total=pr_obj.get("changed_files"))
+        student, task = detect_student_task(item.get("filename", "") for item in pr_files)
+        prompt_text = build_pr_prompt(student, task, cache_dir)
+    except Exception as exc:
+        return {"pr": pr, "error": str(exc)}
+    return {
+        "pr": pr,
+        "title": pr_obj.get("title", "(no title)"),
+        "url": pr_obj.get("html_url", ""),
+        "files": [(item.get("status", "?"), item.get("filename", "(unknown)")) for item in pr_files],
+        "student": student,
+        "task": task,
+        "prompt": prompt_text,
+    }
+
+
+def write_prompt_file(out_dir: Path, result: dict) -> Path:
+    lines = [
+        f"# PR #{result['pr']}: {result['title']}",
+        "",
+        f"- URL: {result['url']}",
+        f"- Student: {result['student']}",
+        f"- Task: {result['task']}",
+        "",
+        "## Changed files",
+        "",
+    ]
+    lines += [f"- {status} `{name}`" for status, name in result["files"]]
+    lines += ["", "## Prompt", "", "```text", result["prompt"], "```", ""]
+    path = out_dir / f"pr-{result['pr']}.md"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def prefetch_prs(
+    repo: str,
+    prs: list[int],
+    token: str | None,
+    out_dir: Path,
+    workers: int = 8,
+    cache_dir: Path | None = None,
+) -> list[dict]:
+    """Fetch all PRs concurrently and write one prompt file per PR into `out_dir`."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prs) or 1))) as pool:
+        results = list(pool.map(lambda n: prefetch_pr(repo, n, token, cache_dir), prs))
+    for result in results:
+        if "error" not in result:
+            result["path"] = write_prompt_file(out_dir, result)
+    return results
 
 
 def checkout_pr_branch(pr_number: int) -> None:
@@ -158,17 +215,56 @@ app = typer.Typer(add_completion=False, help="Prepare AI prompt for a PR or mark
 
 @app.command()
 def cli(
-    pr: int = typer.Option(..., "--pr", help="Pull request number"),
+    prs: List[int] = typer.Option([], "--pr", help="Pull request number (repeat for several PRs)"),
+    pr_list: Optional[str] = typer.Option(None, "--prs", help="Comma-separated PR numbers to prefetch into --out-dir"),
+    label_queue: Optional[str] = typer.Option(None, "--label-queue", help="Prefetch every open PR with this label into --out-dir"),
+    out_dir: Path = typer.Option(Path(DEFAULT_PROMPTS_DIR), "--out-dir", help="Where --prs/--label-queue write pr-<N>.md"),
+    workers: int = typer.Option(8, "--workers", help="PRs fetched concurrently with --prs/--label-queue"),
     repo: str = typer.Option(DEFAULT_REPO, "--repo", help="Repository in owner/name format"),
     token: Optional[str] = typer.Option(None, "--token", help="GitHub token (or use env GITHUB_TOKEN/GH_TOKEN)"),
     skip_checkout: bool = typer.Option(False, "--skip-checkout", help="Do not checkout the PR branch"),
+    worktree: bool = typer.Option(False, "--worktree", help="Check PRs out into per-PR worktrees instead of the main tree"),
+    worktree_dir: Optional[Path] = typer.Option(None, "--worktree-dir", envvar="PR_WORKTREE_DIR", help="Worktree pool directory"),
+    max_worktrees: int = typer.Option(DEFAULT_MAX_WORKTREES, "--max-worktrees", help="Least recently used worktrees beyond this are removed"),
     mark: bool = typer.Option(False, "--mark", help="Only add a comment and a label to the PR"),
     message: Optional[str] = typer.Option(None, "--message", help="Comment body to post (used with --mark)"),
     label: Optional[str] = typer.Option(None, "--label", help="Label to apply: 'rated' or 'defend' (used with --mark)"),
+    cache_dir: Optional[Path] = typer.Option(None, "--cache-dir", envvar="PROMPT_CACHE_DIR", help="Prompt cache directory (see prepare_AI_prompt.py)"),
 ) -> None:
     """CLI entry using Typer. Matches prior argparse behavior, plus early-exit marking."""
     eff_token = token or os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
 
+    if pr_list or label_queue:
+        queue = list(prs)
+        for part in (pr_list or "").split(","):
+            part = part.strip().lstrip("#")
+            if part:
+                if not part.isdigit():
+                    typer.secho(f"Error: invalid PR number in --prs: {part}", fg=typer.colors.RED, err=True)
+                    raise typer.Exit(code=2)
+                queue.append(int(part))
+        if label_queue:
+            queue += list_labeled_prs(repo, eff_token, label_queue)
+        queue = list(dict.fromkeys(queue))
+        if not queue:
+            print("No PRs to prefetch")
+            return
+        results = prefetch_prs(repo, queue, eff_token, out_dir, workers, cache_dir)
+        failed = [r for r in results if "error" in r]
+        for r in results:
+            if "error" in r:
+                typer.secho(f"PR #{r['pr']}: {r['error']}", fg=typer.colors.RED, err=True)
+            else:
+                print(f"PR #{r['pr']} {r['student']}/{r['task']} -> {r['path']}")
+        print(f"Prepared {len(results) - len(failed)} of {len(results)} prompts in {out_dir}")
+        if failed:
+            raise typer.Exit(code=1)
+        return
+
+    if not prs:
+        typer.secho("Error: give --pr, --prs or --label-queue", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=2)
+
     if mark:
         # Validation for mark-only path
         if not message or not label:
@@ -180,41 +276,56 @@ def cli(
         if not eff_token:
             typer.secho("Error: --mark requires authentication via --token or GITHUB_TOKEN/GH_TOKEN", fg=typer.colors.RED, err=True)
             raise typer.Exit(code=2)
-        # Optional title fetch (non-fatal)
-        try:
-            pr_obj = fetch_pr(repo, pr, eff_token)
-            print(f"PR #{pr} -> {pr_obj.get('title', '(no title)')}")
-        except Exception as exc:  # pragma: no cover
-            print(f"Warning: could not fetch PR details: {exc}")
-        print("Adding comment and label as requested by --mark ...")
-        post_pr_comment(repo, pr, eff_token, message)
-        add_pr_label(repo, pr, eff_token, label.lower())
-        print(f"Added label '{label.lower()}' and posted a comment to PR #{pr}.")
+        for pr in prs:
+            # Optional title fetch (non-fatal)
+            try:
+                pr_obj = fetch_pr(repo, pr, eff_token)
+                print(f"PR #{pr} -> {pr_obj.get('title', '(no title)')}")
+            except Exception as exc:  # pragma: no cover
+                print(f"Warning: could not fetch PR details: {exc}")
+            print("Adding comment and label as requested by --mark ...")
+            post_pr_comment(repo, pr, eff_token, message)
+            add_pr_label(repo, pr, eff_token, label.lower())
+            print(f"Added label '{label.lower()}' and posted a comment to PR #{pr}.")
         return
 
-    # Normal flow: prepare prompt and optionally checkout
-    pr_obj = fetch_pr(repo, pr, eff_token)
-    print(f"PR #{pr} -> {pr_obj.get('title', '(no title)')}")
+    pool = WorktreePool(pool_dir=worktree_dir, max_worktrees=max_worktrees) if worktree and not skip_checkout else None
 
-    pr_files = fetch_pr_files(repo, pr, eff_token)
-    filenames = [item.get("filename", "") for item in pr_files]
-    print("Changed files:")
-    for item in pr_files:
-        name = item.get("filename", "(unknown)")
-        status = item.get("status", "?")
-        print(f" - {status:>7} {name}")
-
-    student, task = detect_student_task(filenames)
-    print(f"Detected student='{student}' task='{task}'")
-
-    prompt_text = run_prepare_script(student, task)
-    print("\n=== Prepared prompt ===\n")
-    print(prompt_text)
-    print("\n=== End prompt ===\n")
+    # Normal flow: prepare prompt and optionally checkout
+    if len(prs) == 1:
+        prompt_text = prepare_pr(repo, prs[0], eff_token, cache_dir)
+        print("\n=== Prepared prompt ===\n")
+        print(prompt_text)
+        print("\n=== End prompt ===\n")
+        if pool is not None:
+            print(f"PR #{prs[0]} worktree: {pool.checkout(prs[0])}")
+        elif not skip_checkout:
+            checkout_pr_branch(prs[0])
+            print(f"Checked out local branch pr-{prs[0]}")
+        return
 
-    if not skip_checkout:
-        checkout_pr_branch(pr)
-        print(f"Checked out local branch pr-{pr}")
+    failed: list[int] = []
+    for pr in prs:
+        try:
+            prompt_text = prepare_pr(repo, pr, eff_token, cache_dir)
+        except Exception as exc:
+            typer.secho(f"PR #{pr}: {exc}", fg=typer.colors.RED, err=True)
+            failed.append(pr)
+            continue
+        print(f"\n=== Prepared prompt (PR #{pr}) ===\n")
+        print(prompt_text)
+        print(f"\n=== End prompt (PR #{pr}) ===\n")
+        if pool is not None:
+            try:
+                print(f"PR #{pr} worktree: {pool.checkout(pr)}")
+            except WorktreeError as exc:
+                typer.secho(f"PR #{pr}: {exc}", fg=typer.colors.RED, err=True)
+                failed.append(pr)
+    if pool is None and not skip_checkout:
+        print("Several PRs given; skipping branch checkout (use --worktree to check them out side by side)")
+    if failed:
+        typer.secho(f"Failed PRs: {', '.join(map(str, failed))}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
 
 
 def main() -> int:
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Indexed, cached view of `students/students.csv` shared by the scripts.
+
+The CSV is parsed once into an immutable `Roster` with O(1) lookups by GitHub
+username, NameLatin and student directory. Parsed rows are also written to a
+JSON snapshot (one file per CSV path, replaced in place) so repeated invocations
+in the same job skip CSV parsing entirely: when the CSV's mtime and size match
+the snapshot the CSV is not even read; otherwise its content hash decides.
+
+Usage:
+    from roster import load_roster
+    roster = load_roster()
+    student = roster.by_github('octocat')
+    student.variant, student.dir_name
+
+Env:
+    ROSTER_CACHE_DIR: snapshot directory (default: <tmp>/wt-ac-roster, empty string disables)
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional, Sequence, Tuple
+
+
+ROOT = Path(__file__).resolve().parents[2]
+STUDENTS_CSV = ROOT / 'students' / 'students.csv'
+SNAPSHOT_VERSION = 2
+
+# accepted spellings of the columns we index (compared after strip().lower())
+GITHUB_COLUMNS = ('github username', 'github_username', 'github')
+DIRECTORY_COLUMNS = ('directory', 'dir')
+NAME_LATIN_COLUMNS = ('namelatin',)
+VARIANT_COLUMNS = ('вариант', 'variant')
+
+
+def default_cache_dir() -> Optional[Path]:
+    value = os.environ.get('ROSTER_CACHE_DIR')
+    if value is None:
+        return Path(tempfile.gettempdir()) / 'wt-ac-roster'
+    return Path(value) if value else None
+
+
+def normalize_github(value: str) -> str:
+    """Lower-cased GitHub login from a cell that may hold '@user', a profile URL or a markdown link."""
+    v = (value or '').strip()
+    if '](' in v:
+        v = v.split('](', 1)[0]
+    v = v.replace('[', '').replace(']', '').strip()
+    if 'github.com/' in v:
+        v = v.split('github.com/')[-1].rstrip('/').strip()
+    v = v.lstrip('@')
+    m = re.match(r'^([A-Za-z0-9\-]+)', v)
+    return (m.group(1) if m else v).lower()
+
+
+def normalize_directory(value: str) -> str:
+    """'./students/Name/' or '.\\students\\Name' -> 'students/Name'."""
+    v = (value or '').strip().replace('\\', '/')
+    while v.startswith('./'):
+        v = v[2:]
+    return v.strip('/')
+
+
+@dataclass(frozen=True)
+class Student:
+    name_latin: str
+    directory: str  # as written in the CSV, e.g. './students/Name'
+    github: str     # normalized (lower-case) login, '' if missing
+    variant: Optional[str]
+    row: Mapping[str, str] = field(repr=False, compare=False)
+
+    @property
+    def dir_name(self) -> str:
+        """Last segment of the directory (falls back to NameLatin)."""
+        return normalize_directory(self.directory).rsplit('/', 1)[-1] or self.name_latin
+
+
+def _column(header: Sequence[str], names: Tuple[str, ...]) -> Optional[int]:
+    for idx, h in enumerate(header):
+        if (h or '').strip().lower() in names:
+            return idx
+    return None
+
+
+class Roster:
+    """Immutable, indexed roster. Build it with `load_roster` or `Roster.from_rows`."""
+
+    def __init__(self, header: Sequence[str], rows: Sequence[Sequence[str]]):
+        self.header: Tuple[str, ...] = tuple(header)
+        self.rows: Tuple[Tuple[str, ...], ...] = tuple(tuple(r) for r in rows)
+        gh_idx = _column(self.header, GITHUB_COLUMNS)
+        dir_idx = _column(self.header, DIRECTORY_COLUMNS)
+        latin_idx = _column(self.header, NAME_LATIN_COLUMNS)
+        variant_idx = _column(self.header, VARIANT_COLUMNS)
+
+        def cell(r: Tuple[str, ...], idx: Optional[int]) -> str:
+            return r[idx].strip() if idx is not None and idx < len(r) and r[idx] is not None else ''
+
+        students = []
+        by_github: Dict[str, Student] = {}
+        by_latin: Dict[str, Student] = {}
+        by_dir: Dict[str, Student] = {}
+        for r in self.rows:
+            row = MappingProxyType({(h or '').strip(): (r[i] if i < len(r) else '') for i, h in enumerate(self.header)})
+            s = Student(
+                name_latin=cell(r, latin_idx),
+                directory=cell(r, dir_idx),
+                github=normalize_github(cell(r, gh_idx)),
+                variant=cell(r, variant_idx) or None,
+                row=row,
+            )
+            students.append(s)
+            # first row wins, like the old linear scans
+            if s.github:
+                by_github.setdefault(s.github, s)
+            if s.name_latin:
+                by_latin.setdefault(s.name_latin, s)
+            if s.directory:
+                by_dir.setdefault(normalize_directory(s.directory), s)
+                by_dir.setdefault(s.dir_name, s)
+        self.students: Tuple[Student, ...] = tuple(students)
+        self._by_github = MappingProxyType(by_github)
+        self._by_latin = MappingProxyType(by_latin)
+        self._by_dir = MappingProxyType(by_dir)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[str]]) -> 'Roster':
+        rows = list(rows)
+        if not rows:
+            return cls((), ())
+        return cls(rows[0], rows[1:])
+
+    def __len__(self) -> int:
+        return len(self.students)
+
+    def __iter__(self) -> Iterator[Student]:
+        return iter(self.students)
+
+    def by_github(self, login: str) -> Optional[Student]:
+        return self._by_github.get(normalize_github(login))
+
+    def by_name_latin(self, name: str) -> Optional[Student]:
+        return self._by_latin.get((name or '').strip())
+
+    def by_directory(self, path_or_name: str) -> Optional[Student]:
+        return self._by_dir.get(normalize_directory(path_or_name))
+
+    def find(self, student: str) -> Optional[Student]:
+        """Look up by directory name or NameLatin (what the grading scripts receive)."""
+        return self.by_directory(student) or self.by_name_latin(student)
+
+    def github_directories(self) -> Dict[str, str]:
+        """{github login (lower-case): Directory as written in the CSV}."""
+        return {login: s.directory for login, s in self._by_github.items()}
+
+
+def parse_csv_text(text: str) -> list:
+    return [r for r in csv.reader(io.StringIO(text, newline=''))]
+
+
+_MEMO: Dict[Tuple[str, int, int], Roster] = {}
+_MEMO_LOCK = threading.Lock()
+
+
+def load_roster(path: Optional[os.PathLike] = None, cache_dir: Optional[os.PathLike] = None, use_cache: bool = True) -> Roster:
+    """Load and index the roster CSV.
+
+    Results are memoized in-process by (path, mtime, size) and, when use_cache is
+    set, snapshotted to `cache_dir` as JSON validated by mtime + size, then content hash.
+    Raises FileNotFoundError if the CSV does not exist.
+    """
+    csv_path = Path(path or STUDENTS_CSV).resolve()
+    st = csv_path.stat()
+    memo_key = (str(csv_path), st.st_mtime_ns, st.st_size)
+    with _MEMO_LOCK:
+        cached = _MEMO.get(memo_key)
+    if cached is not None:
+        return cached
+
+    snap_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+    snapshot = None
+    if use_cache and snap_dir:
+        path_key = hashlib.sha256(str(csv_path).encode('utf-8')).hexdigest()[:16]
+        snapshot = snap_dir / f'roster-{path_key}.json'
+
+    data: dict = {}
+    if snapshot is not None and snapshot.exists():
+        try:
+            data = json.loads(snapshot.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            data = {}
+        if data.get('version') != SNAPSHOT_VERSION or not isinstance(data.get('rows'), list):
+            data = {}
+
+    if data and data.get('mtime_ns') == st.st_mtime_ns and data.get('size') == st.st_size:
+        rows = data['rows']
+    else:
+        raw = csv_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        # same content with a new mtime (e.g. a fresh checkout) keeps the parsed rows
+        # utf-8-sig also accepts files without a BOM
+        rows = data['rows'] if data.get('sha256') == digest else parse_csv_text(raw.decode('utf-8-sig'))
+        if snapshot is not None:
+            record = {'version': SNAPSHOT_VERSION, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                      'sha256': digest, 'rows': rows}
+            try:
+                snapshot.parent.mkdir(parents=True, exist_ok=True)
+                tmp = snapshot.with_suffix(f'.{os.getpid()}.tmp')
+                tmp.write_text(json.dumps(record, ensure_ascii=False), encoding='utf-8')
+                os.replace(tmp, snapshot)
+            except OSError:
+                pass
+
+    roster = Roster.from_rows(rows)
+    with _MEMO_LOCK:
+        _MEMO[memo_key] = roster
+    return roster
+
+
+def student_directory(student: str, path: Optional[os.PathLike] = None) -> str:
+    """Folder name under students/ for a NameLatin or directory name.
+
+    Resolved through the roster so the sparse checkout and the graders read the same
+    folder; falls back to `student` itself when the CSV is missing or has no such row.
+    """
+    try:
+        entry = load_roster(path).find(student)
+    except (OSError, ValueError, csv.Error):
+        entry = None
+    return entry.dir_name if entry is not None and entry.dir_name else student
@@ -3,6 +3,7 @@
 
 Usage:
     python .github/scripts/run_ai_check.py --student NameLatin --task task_XX --prompt-file ai_prompt.txt --out ai_response.md --engine github
+    python .github/scripts/run_ai_check.py ... --models gpt5-mini,phi-3.5-mini,mistral-7b-instruct [--race 2]
 
 Env (github engine):
     GITHUB_TOKEN: GitHub token with access to Models API
@@ -12,19 +13,49 @@ Env (openai engine):
     OPENAI_API_KEY: OpenAI API key
         MODEL or OPENAI_MODEL: Optional, choose OpenAI model (defaults to gpt-4o-mini)
 
+Fallback: --models lists candidates tried in order inside one process (the student
+files, combined prompt and HTTP session are reused). --race N sends the first N
+candidates concurrently and keeps the first valid response. The chosen model is
+printed and, under GitHub Actions, written to $GITHUB_OUTPUT as `chosen_model`.
+
+Streaming (--stream or AI_STREAM=1): the completion is read as server-sent events
+and written to the output file as it arrives. A candidate that sends no content
+within --first-token-timeout seconds is abandoned and the next one is tried.
+Time to first token, total latency and tokens/sec of every attempt are written
+to a JSON sidecar (default <out>.metrics.json, e.g. ai_response.metrics.json).
+
+Prompt packing: the student files are fitted into each model's context window
+(MODEL_CONTEXT_TOKENS minus a response reserve, or --max-input-tokens) using a
+rough token estimate. Markup/styles/scripts go first, lockfiles and minified or
+generated files last; files that do not fit are truncated or dropped and listed
+in the --debug output.
+
+Optional response cache (--cache-dir or AI_CACHE_DIR): responses are stored under a
+sha256 of (engine, model, temperature, final prompt); a hit writes the output file
+without calling the API. Entries expire after --cache-max-age-days and the least
+recently used ones are evicted above --cache-max-mb.
+
 This script:
     - Reads the prepared prompt text
-    - Reads student files (text only) under students/NameLatin/task_XX
+    - Reads student files (text only) under students/<Directory>/task_XX (roster Directory for NameLatin)
     - Calls either GitHub Models or OpenAI chat completions endpoint
     - Writes the AI response to the output file
 """
 from __future__ import annotations
 
 import argparse
+import codecs
+import hashlib
+import math
 import os
+import time
 import sys
 import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable
 import re
 
 try:
@@ -33,55 +64,700 @@ except Exception:
     print('This script requires the requests package. Install it first.')
     sys.exit(2)
 
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+from rate_limit import RateLimiter  # noqa: E402
+from roster import student_directory  # noqa: E402
+
 
 ROOT = Path(__file__).resolve().parents[2]
 
-TEXT_EXTS = {
-    '.txt', '.md', '.html', '.css', '.js', '.ts', '.tsx', '.jsx', '.json', '.yml', '.yaml', '.xml', '.ini', '.cfg', '.py', '.java', '.c', '.cpp', '.h', '.hpp', '.rs', '.go', '.sh', '.bat', '.ps1'
+TEMPERATURE = 0.3
+
+# response cache (see cache_get / cache_put); AI_CACHE_DIR enables it without --cache-dir
+DEFAULT_CACHE_MAX_MB = 50
+DEFAULT_CACHE_MAX_AGE_DAYS = 30
+
+# Context windows (tokens) by model-name prefix; the longest matching prefix wins.
+MODEL_CONTEXT_TOKENS = {
+    'gpt5': 128000,
+    'gpt-5': 128000,
+    'gpt-4o': 128000,
+    'gpt-4.1': 128000,
+    'o1': 128000,
+    'o3': 128000,
+    'o4': 128000,
+    'phi-3.5': 128000,
+    'phi-3-mini-4k': 4096,
+    'phi-3-mini-128k': 128000,
+    'phi-4': 16384,
+    'llama-3.1': 128000,
+    'llama-3.2': 128000,
+    'llama-3.3': 128000,
+    'mistral-7b': 32768,
+    'mixtral-8x7b': 32768,
+    'mistral': 32768,
+    'gemma2': 8192,
+    'codegemma': 8192,
+    'starcoder2': 16384,
+    'codestral': 32768,
 }
+DEFAULT_CONTEXT_TOKENS = 8192
+# kept free for the model's answer
+RESPONSE_TOKEN_RESERVE = 1500
+# below this many free tokens a file is dropped rather than truncated
+MIN_TRUNCATED_FILE_TOKENS = 200
+
+FRONTEND_EXTS = {'.html', '.htm', '.css', '.scss', '.js', '.mjs', '.cjs', '.jsx', '.ts', '.tsx', '.vue', '.svelte'}
+LOCKFILE_NAMES = {'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'npm-shrinkwrap.json', 'composer.lock', 'poetry.lock', 'cargo.lock'}
+GENERATED_MARKERS = ('.min.', '.bundle.', '.chunk.')
 
 IGNORE_DIRS = {'node_modules', 'dist', 'build', '.cache', '.git'}
 IGNORE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.zip', '.rar', '.7z', '.pdf', '.mp4', '.mov', '.avi', '.mp3', '.wav'}
 
 
-def is_text_file(p: Path) -> bool:
-    ext = p.suffix.lower()
-    if ext in IGNORE_EXTS:
-        return False
-    if ext in TEXT_EXTS:
-        return True
-    # Fallback: try to read as utf-8 small chunk
+def read_text_prefix(p: Path, limit_chars: int) -> str | None:
+    """Return the first `limit_chars` characters of a utf-8 file, or None if it is not utf-8 text.
+
+    Reads at most 4 bytes per kept character (the utf-8 maximum) in a single open,
+    so large files (e.g. minified bundles) are never fully loaded or decoded.
+    """
+    max_bytes = limit_chars * 4
     try:
-        with p.open('r', encoding='utf-8') as f:
-            f.read(1024)
-        return True
-    except Exception:
-        return False
+        with p.open('rb') as f:
+            data = f.read(max_bytes + 1)
+    except OSError:
+        return None
+    at_eof = len(data) <= max_bytes
+    decoder = codecs.getincrementaldecoder('utf-8')('strict')
+    try:
+        # final=False tolerates a multi-byte character cut at the read boundary
+        text = decoder.decode(data[:max_bytes], final=at_eof)
+    except UnicodeDecodeError:
+        return None
+    return text[:limit_chars]
 
 
-def collect_files(student: str, task_folder: str, limit_files: int = 50, limit_bytes_per_file: int = 15000) -> list[dict]:
-    base = ROOT / 'students' / student / task_folder
-    result: list[dict] = []
-    if not base.exists():
-        return result
+def _walk_candidates(base: Path) -> list[Path]:
+    candidates: list[Path] = []
     for root, dirs, files in os.walk(base):
         # prune ignored dirs
         dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
         for name in files:
             p = Path(root) / name
-            rel = p.relative_to(base).as_posix()
-            if not is_text_file(p):
+            if p.suffix.lower() in IGNORE_EXTS:
                 continue
-            try:
-                content = p.read_text(encoding='utf-8')[:limit_bytes_per_file]
-            except Exception:
+            candidates.append(p)
+    # deterministic order keeps prompts reproducible (and cacheable)
+    candidates.sort(key=lambda p: p.relative_to(base).as_posix())
+    return candidates
+
+
+def collect_files(student: str, task_folder: str, limit_files: int = 50, limit_bytes_per_file: int = 15000, workers: int = 8) -> list[dict]:
+    """Collect up to `limit_files` text files (sorted by relative path) from the task folder.
+
+    `limit_bytes_per_file` caps the characters kept per file; only that prefix is read.
+    Files are read concurrently with a small thread pool.
+    """
+    base = ROOT / 'students' / student / task_folder
+    result: list[dict] = []
+    if not base.exists():
+        return result
+    candidates = _walk_candidates(base)
+    if not candidates:
+        return result
+
+    def _read(p: Path) -> dict | None:
+        content = read_text_prefix(p, limit_bytes_per_file)
+        if content is None:
+            return None
+        return {'name': p.relative_to(base).as_posix(), 'content': content}
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(candidates))))
+    try:
+        for item in pool.map(_read, candidates):
+            if item is None:
                 continue
-            result.append({'name': rel, 'content': content})
+            result.append(item)
             if len(result) >= limit_files:
-                return result
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
     return result
 
 
+def cache_key(engine: str, model: str, temperature: float, prompt: str) -> str:
+    h = hashlib.sha256()
+    for part in (engine, model, repr(float(temperature)), prompt):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _cache_path(cache_dir: Path, key: str) -> Path:
+    return cache_dir / key[:2] / f'{key}.json'
+
+
+def cache_get(cache_dir: Path, key: str, max_age_seconds: float | None = None) -> str | None:
+    """Return the cached response text for `key`, or None (missing, expired or unreadable)."""
+    path = _cache_path(cache_dir, key)
+    try:
+        if max_age_seconds is not None and time.time() - path.stat().st_mtime > max_age_seconds:
+            return None
+        entry = json.loads(path.read_text(encoding='utf-8'))
+        os.utime(path)  # mark as recently used for LRU eviction
+    except (OSError, ValueError):
+        return None
+    return entry.get('text')
+
+
+def cache_put(cache_dir: Path, key: str, text: str, meta: dict | None = None) -> None:
+    path = _cache_path(cache_dir, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps({**(meta or {}), 'created': time.time(), 'text': text}, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError as exc:
+        print(f'Warning: could not write response cache: {exc}', file=sys.stderr)
+
+
+def cache_evict(cache_dir: Path, max_bytes: int, max_age_seconds: float | None = None) -> int:
+    """Drop expired entries, then least recently used ones until the cache fits `max_bytes`.
+
+    Returns the number of removed entries.
+    """
+    entries = []
+    for p in cache_dir.glob('*/*.json'):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    entries.sort()
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for mtime, size, p in entries:
+        expired = max_age_seconds is not None and now - mtime > max_age_seconds
+        if not expired and total <= max_bytes:
+            continue
+        try:
+            p.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def model_context_tokens(model: str) -> int:
+    name = model.lower().rsplit('/', 1)[-1]
+    best = ''
+    for prefix in MODEL_CONTEXT_TOKENS:
+        if name.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return MODEL_CONTEXT_TOKENS[best] if best else DEFAULT_CONTEXT_TOKENS
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer.
+
+    ~4 bytes of utf-8 per token holds for English/code and for Cyrillic (2 bytes
+    per letter, ~2 letters per token); 3.5 leaves some headroom.
+    """
+    return math.ceil(len(text.encode('utf-8')) / 3.5)
+
+
+def file_priority(name: str) -> int:
+    """0 = markup/styles/scripts, 1 = other text, 2 = lockfiles and generated/minified files."""
+    lower = name.lower()
+    base = lower.rsplit('/', 1)[-1]
+    if base in LOCKFILE_NAMES or base.endswith('.map') or any(m in base for m in GENERATED_MARKERS):
+        return 2
+    if Path(base).suffix in FRONTEND_EXTS:
+        return 0
+    return 1
+
+
+def _file_block(f: dict) -> str:
+    return f"## {f['name']}\n{f['content']}"
+
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    max_bytes = int(tokens * 3.5)
+    return text.encode('utf-8')[:max_bytes].decode('utf-8', errors='ignore')
+
+
+def pack_prompt(prompt_text: str, files: list[dict], budget_tokens: int) -> dict:
+    """Fit the student files into `budget_tokens` (prompt included), greedily by priority.
+
+    Files are considered markup/styles/scripts first and lockfiles/minified last
+    (path order within a group). A file that does not fit is truncated if enough
+    budget is left, otherwise dropped. Included files keep their path order in the
+    final prompt. Returns {'prompt', 'included', 'truncated', 'dropped',
+    'estimated_tokens', 'budget'}.
+    """
+    used = estimate_tokens(combine_prompt(prompt_text, []))
+    kept: dict[int, dict] = {}
+    truncated: list[str] = []
+    dropped: list[str] = []
+    order = sorted(range(len(files)), key=lambda i: file_priority(files[i]['name']))
+    for i in order:
+        f = files[i]
+        cost = estimate_tokens(_file_block(f)) + 1  # + separator
+        free = budget_tokens - used
+        if cost <= free:
+            kept[i] = f
+            used += cost
+            continue
+        if free >= MIN_TRUNCATED_FILE_TOKENS:
+            header_cost = estimate_tokens(f"## {f['name']}\n") + 1
+            content = _truncate_to_tokens(f['content'], free - header_cost)
+            kept[i] = {'name': f['name'], 'content': content}
+            used += estimate_tokens(_file_block(kept[i])) + 1
+            truncated.append(f['name'])
+            continue
+        dropped.append(f['name'])
+    included = [kept[i] for i in sorted(kept)]
+    prompt = combine_prompt(prompt_text, included)
+    if dropped:
+        prompt += '\n\n(Omitted to fit the model context: ' + ', '.join(dropped) + ')'
+    return {
+        'prompt': prompt,
+        'included': [f['name'] for f in included],
+        'truncated': truncated,
+        'dropped': dropped,
+        'estimated_tokens': estimate_tokens(prompt),
+        'budget': budget_tokens,
+    }
+
+
+ENDPOINTS = {
+    'github': 'https://models.inference.ai.azure.com/v1/chat/completions',
+    'openai': 'https://api.openai.com/v1/chat/completions',
+}
+
+
+def engine_token(engine: str) -> str | None:
+    return os.environ.get('GITHUB_TOKEN') if engine == 'github' else os.environ.get('OPENAI_API_KEY')
+
+
+def dbg(msg: str, debug: bool = True) -> None:
+    if debug:
+        print(f'[DEBUG] {msg}', file=sys.stderr)
+
+
+def default_model(engine: str) -> str:
+    if engine == 'github':
+        return os.environ.get('MODEL', 'gpt5-mini')
+    # map a common env name to OpenAI model name; user can set MODEL env var to choose
+    return os.environ.get('MODEL', os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'))
+
+
+def combine_prompt(prompt_text: str, files: list[dict]) -> str:
+    return prompt_text + '\n\nStudent files (text only):\n' + '\n\n'.join(
+        [f"## {f['name']}\n{f['content']}" for f in files]
+    )
+
+
+def build_request(engine: str, model: str, token: str, prompt: str, stream: bool = False) -> tuple[str, dict, dict]:
+    """Return (endpoint, headers, payload) for a chat completion call."""
+    payload = {
+        'model': model,
+        'messages': [
+            {'role': 'user', 'content': prompt}
+        ],
+        'temperature': TEMPERATURE,
+    }
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Content-Type': 'application/json',
+    }
+    if stream:
+        payload['stream'] = True
+        if engine == 'openai':
+            # final chunk carries token usage
+            payload['stream_options'] = {'include_usage': True}
+        headers['Accept'] = 'text/event-stream'
+    elif engine == 'github':
+        headers['Accept'] = 'application/json'
+    return ENDPOINTS[engine], headers, payload
+
+
+def new_session(pool_size: int = 4) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    return session
+
+
+def _error_result(resp: requests.Response, endpoint: str, model: str, files_count: int, debug: bool) -> dict:
+    detail = resp.text
+    # Try to extract message field if JSON
+    try:
+        j = resp.json()
+        msg = j.get('error') or j.get('message') or j
+        detail = json.dumps(msg, ensure_ascii=False)
+    except Exception:
+        pass
+    latency = resp.elapsed.total_seconds() if hasattr(resp, 'elapsed') else None
+    remediation = ''
+    if resp.status_code in (401, 403):
+        remediation = (
+            'Remediation: The token used lacks the models permission. '\
+            'Create a fine-grained PAT (or org secret) with "models:read" (and if required, "models:write") scope, '\
+            'store it as GH_MODELS_TOKEN secret, and re-run. ' \
+            'Alternatively, if using the default GITHUB_TOKEN, ensure GitHub Models are enabled for this repository and workflow permissions include models.'
+        )
+    diagnostic = {
+        'status': resp.status_code,
+        'detail': detail[:2000],
+        'endpoint': endpoint,
+        'model': model,
+        'files_count': files_count,
+        'latency_seconds': latency,
+        'debug': debug
+    }
+    if remediation:
+        diagnostic['remediation'] = remediation
+    if debug:
+        dbg('Response status: ' + str(resp.status_code))
+        dbg('Raw response (truncated 500 chars): ' + resp.text[:500])
+    return {'ok': False, 'model': model, 'status': resp.status_code,
+            'error': 'Error invoking model:\n' + json.dumps(diagnostic, ensure_ascii=False, indent=2)}
+
+
+def _metrics(model: str, stream: bool, started: float, first_token_at: float | None, text: str, completion_tokens: int | None) -> dict:
+    total = time.monotonic() - started
+    ttft = first_token_at - started if first_token_at is not None else None
+    tokens = completion_tokens if completion_tokens is not None else estimate_tokens(text)
+    # generation rate excludes the wait for the first token when we know it
+    gen_seconds = total - ttft if ttft is not None else total
+    return {
+        'model': model,
+        'stream': stream,
+        'ttft_seconds': round(ttft, 3) if ttft is not None else None,
+        'total_seconds': round(total, 3),
+        'completion_tokens': tokens,
+        'tokens_estimated': completion_tokens is None,
+        'tokens_per_second': round(tokens / gen_seconds, 2) if gen_seconds > 0 and tokens else None,
+    }
+
+
+def _cancelled(model: str) -> dict:
+    return {'ok': False, 'model': model, 'cancelled': True,
+            'error': f'Call to model {model} cancelled: another model answered first'}
+
+
+def _read_stream(
+    resp: requests.Response,
+    model: str,
+    started: float,
+    *,
+    first_token_timeout: float,
+    timeout: float,
+    out_path: Path | None = None,
+    cancel: threading.Event | None = None,
+) -> dict:
+    """Consume an SSE chat completion, optionally appending deltas to `out_path` as they arrive.
+
+    Reading stops as soon as `cancel` is set (checked between chunks; closing the
+    response from another thread also ends a blocked read).
+    """
+    parts: list[str] = []
+    first_token_at: float | None = None
+    completion_tokens: int | None = None
+    out = None
+    try:
+        for raw in resp.iter_lines(chunk_size=None):
+            if cancel is not None and cancel.is_set():
+                return _cancelled(model)
+            now = time.monotonic()
+            if first_token_at is None and now - started > first_token_timeout:
+                return {'ok': False, 'model': model, 'status': resp.status_code,
+                        'error': f'No first token from model {model} within {first_token_timeout:g}s'}
+            if now - started > timeout:
+                return {'ok': False, 'model': model, 'status': resp.status_code,
+                        'error': f'Model {model} did not finish within {timeout:g}s'}
+            line = raw.decode('utf-8', errors='replace') if isinstance(raw, bytes) else raw
+            if not line.startswith('data:'):
+                continue  # blank separators, ': keep-alive' comments, event: lines
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            usage = chunk.get('usage') or {}
+            if usage.get('completion_tokens') is not None:
+                completion_tokens = usage['completion_tokens']
+            for choice in chunk.get('choices') or []:
+                delta = (choice.get('delta') or {}).get('content')
+                if not delta:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                    if out_path is not None:
+                        out = out_path.open('w', encoding='utf-8')
+                parts.append(delta)
+                if out is not None:
+                    out.write(delta)
+                    out.flush()
+    except Exception as e:
+        if cancel is not None and cancel.is_set():
+            return _cancelled(model)
+        if not isinstance(e, requests.RequestException):
+            raise
+        if first_token_at is None:
+            return {'ok': False, 'model': model, 'status': resp.status_code,
+                    'error': f'No first token from model {model} within {first_token_timeout:g}s: {e}'}
+        return {'ok': False, 'model': model, 'status': resp.status_code, 'error': 'Error reading model stream: ' + str(e)}
+    finally:
+        resp.close()
+        if out is not None:
+            out.close()
+
+    text = ''.join(parts)
+    if not text:
+        return {'ok': False, 'model': model, 'status': resp.status_code, 'error': 'No response'}
+    return {'ok': True, 'model': model, 'text': text,
+            'metrics': _metrics(model, True, started, first_token_at, text, completion_tokens)}
+
+
+def call_model(
+    session: requests.Session,
+    engine: str,
+    model: str,
+    token: str,
+    prompt: str,
+    *,
+    timeout: float = 120,
+    files_count: int = 0,
+    debug: bool = False,
+    limiter: RateLimiter | None = None,
+    stream: bool = False,
+    first_token_timeout: float | None = None,
+    out_path: Path | None = None,
+    cancel: threading.Event | None = None,
+    on_response: Callable[[requests.Response], None] | None = None,
+) -> dict:
+    """Call one model. Returns {'ok': True, 'model', 'text', 'metrics'} or {'ok': False, 'model', 'error'}.
+
+    `error` holds the text the workflow expects in the output file on failure.
+    With `stream` the completion is read as server-sent events: the call fails if
+    no content arrives within `first_token_timeout` seconds (the socket read timeout
+    is capped to it as well, so a stream idle that long is also aborted), and
+    deltas are written to `out_path` as they arrive when it is given.
+
+    `cancel` aborts the call once set (a cancelled result has 'cancelled': True);
+    `on_response` receives the response as soon as headers arrive, so a caller
+    can close it from another thread.
+    """
+    endpoint, headers, payload = build_request(engine, model, token, prompt, stream=stream)
+    if limiter is not None:
+        limiter.acquire()
+    if cancel is not None and cancel.is_set():
+        return _cancelled(model)
+    started = time.monotonic()
+    try:
+        print(f'Calling model {model} with {files_count} files, prompt length={len(prompt)}')
+        if debug:
+            redacted_headers = {k: ('***' if k.lower() == 'authorization' else v) for k, v in headers.items()}
+            dbg('Request headers: ' + json.dumps(redacted_headers))
+            dbg('Payload keys: ' + ','.join(payload.keys()))
+            dbg('Messages count: ' + str(len(payload.get('messages', []))))
+        if stream:
+            read_timeout = min(first_token_timeout or timeout, timeout)
+            resp = session.post(endpoint, headers=headers, data=json.dumps(payload), timeout=(timeout, read_timeout), stream=True)
+        else:
+            resp = session.post(endpoint, headers=headers, data=json.dumps(payload), timeout=timeout)
+    except requests.Timeout as e:
+        if stream:
+            return {'ok': False, 'model': model, 'error': f'No first token from model {model} within {read_timeout:g}s: {e}'}
+        return {'ok': False, 'model': model, 'error': 'Error calling models API: ' + str(e)}
+    except Exception as e:
+        return {'ok': False, 'model': model, 'error': 'Error calling models API: ' + str(e)}
+
+    if on_response is not None:
+        on_response(resp)
+    if cancel is not None and cancel.is_set():
+        resp.close()
+        return _cancelled(model)
+
+    if resp.status_code != 200:
+        return _error_result(resp, endpoint, model, files_count, debug)
+
+    if stream and 'text/event-stream' in resp.headers.get('Content-Type', ''):
+        return _read_stream(resp, model, started, first_token_timeout=first_token_timeout or timeout,
+                            timeout=timeout, out_path=out_path, cancel=cancel)
+
+    # non-streaming call, or an endpoint that ignored stream=true and sent plain JSON
+    try:
+        data = resp.json()
+    except ValueError:
+        return {'ok': False, 'model': model, 'status': resp.status_code, 'error': 'Invalid JSON from models API: ' + resp.text[:2000]}
+    if debug:
+        dbg('Parsed JSON keys: ' + ','.join(data.keys()))
+        dbg('Choices length: ' + str(len(data.get('choices', []))))
+    text = (data.get('choices') or [{}])[0].get('message', {}).get('content')
+    if not text:
+        return {'ok': False, 'model': model, 'status': resp.status_code, 'error': 'No response'}
+    usage = data.get('usage') or {}
+    return {'ok': True, 'model': model, 'text': text,
+            'metrics': _metrics(model, False, started, None, text, usage.get('completion_tokens'))}
+
+
+def _prompt_for(prompts: str | dict[str, str], model: str) -> str:
+    return prompts[model] if isinstance(prompts, dict) else prompts
+
+
+def _timed_call(session: requests.Session, engine: str, model: str, token: str, prompt: str, **kwargs) -> dict:
+    """call_model, with at least the elapsed time in `metrics` for failed attempts too."""
+    started = time.monotonic()
+    res = call_model(session, engine, model, token, prompt, **kwargs)
+    res.setdefault('metrics', {'model': model, 'stream': bool(kwargs.get('stream')),
+                               'total_seconds': round(time.monotonic() - started, 3)})
+    return res
+
+
+def _attempt_record(res: dict) -> dict:
+    return {**res['metrics'], 'ok': res['ok'], 'status': res.get('status')}
+
+
+def race_models(session: requests.Session, engine: str, models: list[str], token: str, prompts: str | dict[str, str], **kwargs) -> dict:
+    """Send the prompt to all `models` at once and return the first valid result.
+
+    If none succeeds, the last failure is returned. When a winner arrives the
+    other calls are cancelled: a shared event stops them before sending or
+    between stream chunks, and their open responses are closed. They run in
+    daemon threads, so a call still waiting for response headers does not keep
+    the process alive. Concurrent streams are never written to `out_path`. The
+    result's `attempts` lists the calls that finished before the winner.
+    """
+    cancel = threading.Event()
+    responses: list[requests.Response] = []
+    lock = threading.Lock()
+
+    def _track(resp: requests.Response) -> None:
+        with lock:
+            responses.append(resp)
+
+    kwargs = {**kwargs, 'out_path': None, 'cancel': cancel, 'on_response': _track}
+    results: queue.Queue = queue.Queue()
+    for model in models:
+        threading.Thread(
+            target=lambda m=model: results.put(_timed_call(session, engine, m, token, _prompt_for(prompts, m), **kwargs)),
+            name=f'race-{model}',
+            daemon=True,
+        ).start()
+    last: dict = {'ok': False, 'model': None, 'error': 'No models to try'}
+    attempts: list[dict] = []
+    for _ in models:
+        res = results.get()
+        attempts.append(_attempt_record(res))
+        if res['ok']:
+            cancel.set()
+            with lock:
+                for resp in responses:
+                    resp.close()
+            return {**res, 'attempts': attempts}
+        print(f'Model {res["model"]} failed', file=sys.stderr)
+        last = res
+    return {**last, 'attempts': attempts}
+
+
+def run_with_fallback(
+    session: requests.Session,
+    engine: str,
+    models: list[str],
+    token: str,
+    prompts: str | dict[str, str],
+    race: int = 0,
+    **kwargs,
+) -> dict:
+    """Try `models` in order until one returns a valid response.
+
+    `prompts` is one prompt for all models or a {model: prompt} mapping.
+    With race > 1 the first `race` candidates are sent concurrently and the first
+    valid answer wins; the remaining candidates are then tried one by one.
+    The result carries `attempts`: per-call metrics in the order calls finished.
+    """
+    remaining = list(models)
+    last: dict = {'ok': False, 'model': None, 'error': 'No models to try'}
+    attempts: list[dict] = []
+    if race > 1 and len(remaining) > 1:
+        batch, remaining = remaining[:race], remaining[race:]
+        print(f'Racing models: {", ".join(batch)}', file=sys.stderr)
+        last = race_models(session, engine, batch, token, prompts, **kwargs)
+        attempts.extend(last['attempts'])
+        if last['ok']:
+            return last
+    for model in remaining:
+        print(f'Attempting model: {model}', file=sys.stderr)
+        last = _timed_call(session, engine, model, token, _prompt_for(prompts, model), **kwargs)
+        attempts.append(_attempt_record(last))
+        if last['ok']:
+            break
+        print(f'Model {model} failed, trying next (if any)', file=sys.stderr)
+    return {**last, 'attempts': attempts}
+
+
+def build_model_prompts(prompt_text: str, files: list[dict], models: list[str], max_input_tokens: int = 0, debug: bool = False) -> dict[str, str]:
+    """Pack the files into each model's context window; models with equal budgets share a prompt."""
+    prompts: dict[str, str] = {}
+    packed_by_budget: dict[int, dict] = {}
+    for model in models:
+        budget = max_input_tokens or (model_context_tokens(model) - RESPONSE_TOKEN_RESERVE)
+        packed = packed_by_budget.get(budget)
+        if packed is None:
+            packed = packed_by_budget[budget] = pack_prompt(prompt_text, files, budget)
+            dbg(f'Prompt for budget {budget} tokens: ~{packed["estimated_tokens"]} tokens, '
+                f'{len(packed["included"])} files included', debug)
+            if packed['truncated']:
+                dbg('Truncated to fit: ' + ', '.join(packed['truncated']), debug)
+            if packed['dropped']:
+                dbg('Dropped to fit: ' + ', '.join(packed['dropped']), debug)
+        prompts[model] = packed['prompt']
+    return prompts
+
+
+def cached_response(cache_dir: Path, engine: str, models: list[str], prompts: dict[str, str], max_age_seconds: float | None) -> tuple[str, str] | None:
+    """Return (model, text) for the first candidate with a cached response."""
+    for model in models:
+        text = cache_get(cache_dir, cache_key(engine, model, TEMPERATURE, prompts[model]), max_age_seconds)
+        if text is not None:
+            return model, text
+    return None
+
+
+def store_response(cache_dir: Path, engine: str, model: str, prompt: str, text: str, max_mb: float, max_age_seconds: float | None) -> int:
+    """Cache a successful response and run eviction; returns the number of evicted entries."""
+    cache_put(cache_dir, cache_key(engine, model, TEMPERATURE, prompt), text, {'engine': engine, 'model': model})
+    return cache_evict(cache_dir, int(max_mb * 1024 * 1024), max_age_seconds)
+
+
+def report_chosen_model(model: str) -> None:
+    print(f'Chosen model: {model}', file=sys.stderr)
+    github_output = os.environ.get('GITHUB_OUTPUT')
+    if github_output:
+        with open(github_output, 'a', encoding='utf-8') as f:
+            f.write(f'chosen_model={model}\n')
+
+
+def write_metrics(path: Path, engine: str, result: dict | None, cached_model: str | None = None) -> None:
+    """Write the JSON metrics sidecar: chosen model plus per-attempt latency and throughput."""
+    if cached_model is not None:
+        data = {'engine': engine, 'ok': True, 'cached': True, 'chosen_model': cached_model, 'attempts': []}
+    else:
+        data = {'engine': engine, 'ok': result['ok'], 'cached': False,
+                'chosen_model': result['model'] if result['ok'] else None, 'attempts': result.get('attempts', [])}
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+
 def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser(description='Run AI check (GitHub Models or OpenAI)')
     ap.add_argument('--student', required=True)
@@ -89,30 +765,43 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument('--prompt-file', required=True)
     ap.add_argument('--out', default='ai_response.md')
     ap.add_argument('--engine', choices=['github', 'openai'], default='github', help='Which API to use: github (default) or openai')
+    ap.add_argument('--models', default=None, help='Comma-separated candidate models tried in order (default: MODEL env / engine default)')
+    ap.add_argument('--race', type=int, default=0, help='Send the first N candidates concurrently and keep the first valid response')
+    ap.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+    ap.add_argument('--stream', action='store_true', default=os.environ.get('AI_STREAM') == '1',
+                    help='Stream the completion (env AI_STREAM=1) and write the output file as it arrives')
+    ap.add_argument('--first-token-timeout', type=float, default=float(os.environ.get('AI_FIRST_TOKEN_TIMEOUT') or 30),
+                    help='With --stream, give up on a model that sends no content within this many seconds')
+    ap.add_argument('--metrics-file', default=None,
+                    help='JSON latency/throughput sidecar (default: <out>.metrics.json next to the output, "" disables)')
+    ap.add_argument('--max-input-tokens', type=int, default=int(os.environ.get('AI_MAX_INPUT_TOKENS') or 0),
+                    help='Prompt token budget for every model (env AI_MAX_INPUT_TOKENS); default: model context minus a response reserve')
     ap.add_argument('--debug', action='store_true', help='Enable verbose debug output')
+    ap.add_argument('--cache-dir', default=os.environ.get('AI_CACHE_DIR'), help='Response cache directory (env AI_CACHE_DIR); disabled if unset')
+    ap.add_argument('--cache-max-mb', type=float, default=DEFAULT_CACHE_MAX_MB, help='Evict least recently used responses above this size')
+    ap.add_argument('--cache-max-age-days', type=float, default=DEFAULT_CACHE_MAX_AGE_DAYS, help='Ignore and evict responses older than this')
     args = ap.parse_args(argv)
 
     engine = args.engine
     debug = args.debug or os.environ.get('DEBUG') == '1'
+    out_path = Path(args.out)
+    metrics_path = out_path.with_suffix('.metrics.json') if args.metrics_file is None else (Path(args.metrics_file) if args.metrics_file else None)
 
     # tokens / keys per engine
-    if engine == 'github':
-        token = os.environ.get('GITHUB_TOKEN')
-        if not token:
-            print('GITHUB_TOKEN is required in env for github engine', file=sys.stderr)
-            return 2
-        model = os.environ.get('MODEL', 'gpt5-mini')
-    else:  # openai
-        token = os.environ.get('OPENAI_API_KEY')
-        if not token:
-            print('OPENAI_API_KEY is required in env for openai engine', file=sys.stderr)
-            return 2
-        # map a common env name to OpenAI model name; user can set MODEL env var to choose
-        model = os.environ.get('MODEL', os.environ.get('OPENAI_MODEL', 'gpt-4o-mini'))
-
-    def dbg(msg: str):
-        if debug:
-            print(f'[DEBUG] {msg}', file=sys.stderr)
+    token = engine_token(engine)
+    if not token:
+        env_name = 'GITHUB_TOKEN' if engine == 'github' else 'OPENAI_API_KEY'
+        print(f'{env_name} is required in env for {engine} engine', file=sys.stderr)
+        return 2
+
+    models: list[str] = []
+    for m in (args.models or default_model(engine)).split(','):
+        m = m.strip()
+        if m and m not in models:
+            models.append(m)
+    if not models:
+        print('No candidate models given', file=sys.stderr)
+        return 2
 
     # sanitize student (remove stray brackets/colons)
     student_clean = re.sub(r'[^A-Za-z0-9_-]', '', args.student)
@@ -133,104 +822,60 @@ def main(argv: list[str] | None = None) -> int:
         return 2
     prompt_text = prompt_path.read_text(encoding='utf-8')
 
-    files = collect_files(student_clean, task_folder)
+    # the roster's Directory may differ from NameLatin; sparse_checkout.py resolves it the same way
+    student_dir = student_directory(student_clean, ROOT / 'students' / 'students.csv')
+    # collected once and reused for every candidate model
+    files = collect_files(student_dir, task_folder)
     if not files:
-        print(f'Warning: no files collected under students/{student_clean}/{task_folder}', file=sys.stderr)
+        print(f'Warning: no files collected under students/{student_dir}/{task_folder}', file=sys.stderr)
     else:
-        dbg(f'Collected {len(files)} files (showing up to first 5 names): ' + ', '.join(f["name"] for f in files[:5]))
+        dbg(f'Collected {len(files)} files (showing up to first 5 names): ' + ', '.join(f["name"] for f in files[:5]), debug)
 
-    # Combine prompt and files
-    combined = prompt_text + '\n\nStudent files (text only):\n' + '\n\n'.join(
-        [f"## {f['name']}\n{f['content']}" for f in files]
-    )
-    dbg(f'Combined prompt size: {len(combined)} characters')
+    prompts = build_model_prompts(prompt_text, files, models, args.max_input_tokens, debug)
+    combined = prompts[models[0]]
+    dbg(f'Combined prompt size: {len(combined)} characters', debug)
     if debug and len(combined) > 50000:
         dbg('Warning: very large prompt may be truncated or rejected by model API')
 
-    if engine == 'github':
-        endpoint = 'https://models.inference.ai.azure.com/v1/chat/completions'
-        payload = {
-            'model': model,
-            'messages': [
-                {'role': 'user', 'content': combined}
-            ],
-            'temperature': 0.3,
-        }
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        }
-    else:  # openai
-        # OpenAI Chat Completions endpoint
-        endpoint = 'https://api.openai.com/v1/chat/completions'
-        payload = {
-            'model': model,
-            'messages': [
-                {'role': 'user', 'content': combined}
-            ],
-            'temperature': 0.3,
-        }
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json',
-        }
-
-    try:
-        print(f'Calling model {model} with {len(files)} files, prompt length={len(combined)}')
-        if debug:
-            redacted_headers = {k: ('***' if k.lower() == 'authorization' else v) for k, v in headers.items()}
-            dbg('Request headers: ' + json.dumps(redacted_headers))
-            dbg('Payload keys: ' + ','.join(payload.keys()))
-            dbg('Messages count: ' + str(len(payload.get('messages', []))))
-        resp = requests.post(endpoint, headers=headers, data=json.dumps(payload), timeout=120)
-    except Exception as e:
-        Path(args.out).write_text('Error calling models API: ' + str(e), encoding='utf-8')
-        return 1
+    cache_dir = Path(args.cache_dir) if args.cache_dir else None
+    max_age = args.cache_max_age_days * 86400
+    if cache_dir is not None:
+        hit = cached_response(cache_dir, engine, models, prompts, max_age)
+        if hit is not None:
+            model, cached = hit
+            out_path.write_text(cached, encoding='utf-8')
+            print(f'Cache hit for model {model}; skipped API call')
+            report_chosen_model(model)
+            if metrics_path is not None:
+                write_metrics(metrics_path, engine, None, cached_model=model)
+            return 0
+        dbg('Cache miss for all candidate models', debug)
 
-    if resp.status_code != 200:
-        detail = resp.text
-        # Try to extract message field if JSON
-        try:
-            j = resp.json()
-            msg = j.get('error') or j.get('message') or j
-            detail = json.dumps(msg, ensure_ascii=False)
-        except Exception:
-            pass
-        latency = resp.elapsed.total_seconds() if hasattr(resp, 'elapsed') else None
-        remediation = ''
-        if resp.status_code in (401, 403):
-            remediation = (
-                'Remediation: The token used lacks the models permission. '\
-                'Create a fine-grained PAT (or org secret) with "models:read" (and if required, "models:write") scope, '\
-                'store it as GH_MODELS_TOKEN secret, and re-run. ' \
-                'Alternatively, if using the default GITHUB_TOKEN, ensure GitHub Models are enabled for this repository and workflow permissions include models.'
-            )
-        diagnostic = {
-            'status': resp.status_code,
-            'detail': detail[:2000],
-            'endpoint': endpoint,
-            'model': model,
-            'files_count': len(files),
-            'latency_seconds': latency,
-            'debug': debug
-        }
-        if remediation:
-            diagnostic['remediation'] = remediation
-        if debug:
-            dbg('Response status: ' + str(resp.status_code))
-            dbg('Raw response (truncated 500 chars): ' + resp.text[:500])
-        Path(args.out).write_text('Error invoking model:\n' + json.dumps(diagnostic, ensure_ascii=False, indent=2), encoding='utf-8')
+    session = new_session(pool_size=max(4, args.race))
+    result = run_with_fallback(
+        session, engine, models, token, prompts,
+        race=args.race, timeout=args.timeout, files_count=len(files), debug=debug,
+        stream=args.stream, first_token_timeout=args.first_token_timeout, out_path=out_path,
+    )
+    if metrics_path is not None:
+        write_metrics(metrics_path, engine, result)
+    for a in result['attempts']:
+        dbg(f'Attempt {a["model"]}: ok={a["ok"]} ttft={a.get("ttft_seconds")} total={a.get("total_seconds")}s '
+            f'tok/s={a.get("tokens_per_second")}', debug)
+    if not result['ok']:
+        print('No model succeeded; keeping last error output', file=sys.stderr)
+        out_path.write_text(result['error'], encoding='utf-8')
         return 1
 
-    data = resp.json()
-    if debug:
-        dbg('Parsed JSON keys: ' + ','.join(data.keys()))
-        dbg('Choices length: ' + str(len(data.get('choices', []))))
-    text = data.get('choices', [{}])[0].get('message', {}).get('content') or 'No response'
-    Path(args.out).write_text(text, encoding='utf-8')
-    if debug:
-        dbg('Wrote AI response with length ' + str(len(text)))
+    text = result['text']
+    # a streamed answer is already on disk, but rewrite it in case an earlier candidate left a partial one
+    out_path.write_text(text, encoding='utf-8')
+    report_chosen_model(result['model'])
+    if cache_dir is not None:
+        removed = store_response(cache_dir, engine, result['model'], prompts[result['model']], text, args.cache_max_mb, max_age)
+        if removed:
+            dbg(f'Evicted {removed} cached responses', debug)
+    dbg('Wrote AI response with length ' + str(len(text)), debug)
     return 0
 
 
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Sparse-checkout patterns for grading a single student's task.
+
+Grading only needs the scripts, the task descriptions, the roster and one
+`students/<Name>/<task>` folder, while the full `students/` tree is mostly images.
+The workflows start from a partial clone (`filter: blob:none`) with BASE_PATTERNS
+checked out and then add the student's folder:
+
+    python .github/scripts/sparse_checkout.py --name-task "[IvanovIvan][task03]" --apply
+
+Patterns use non-cone (gitignore-style) syntax so `students/students.csv` can be
+included without its sibling directories.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import subprocess
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import roster  # noqa: E402
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# enough to run the scripts, build prompts and look students up
+BASE_PATTERNS = ('/.github/', '/tasks/', '/students/students.csv')
+
+
+def parse_name_task(raw: str) -> Tuple[str, str]:
+    """'[IvanovIvan][task3]' (optionally prefixed with [LABS]) -> ('IvanovIvan', 'task_03').
+
+    Same normalization as the parse step of ai-check-student-lab.yml. Raises ValueError.
+    """
+    norm = re.sub(r'^[:\s]+', '', raw or '')
+    norm = re.sub(r'^\[LABS\]\[?', '', norm)
+    parts = re.sub(r'[\[\]]', ' ', norm.replace('][', ' ')).split()
+    if len(parts) < 2:
+        raise ValueError('Invalid input, expected [NameLatin][taskN]')
+    name = re.sub(r'[^A-Za-z0-9_-]', '', parts[0])
+    num = re.sub(r'[^0-9]', '', parts[1])
+    if not name or not num:
+        raise ValueError('Invalid input, expected [NameLatin][taskN]')
+    return name, f'task_{int(num):02d}'
+
+
+def student_directory(student: str, root: Path = ROOT) -> str:
+    """Directory name under students/ for a NameLatin (same resolver as run_ai_check)."""
+    return roster.student_directory(student, root / 'students' / 'students.csv')
+
+
+def sparse_patterns(student: Optional[str] = None, task_folder: Optional[str] = None, root: Path = ROOT) -> List[str]:
+    patterns = list(BASE_PATTERNS)
+    if student:
+        directory = student_directory(student, root)
+        patterns.append(f'/students/{directory}/{task_folder}/' if task_folder else f'/students/{directory}/')
+    return patterns
+
+
+@lru_cache(maxsize=None)
+def is_sparse_checkout(root: Path = ROOT) -> bool:
+    """True when `root` is a git checkout with sparse-checkout enabled."""
+    try:
+        out = subprocess.run(['git', 'config', '--bool', 'core.sparseCheckout'], cwd=str(root),
+                             capture_output=True, text=True)
+    except OSError:
+        return False
+    return out.stdout.strip() == 'true'
+
+
+def apply_patterns(patterns: List[str], root: Path = ROOT) -> None:
+    """Replace the sparse-checkout set; missing blobs of a partial clone are fetched on demand."""
+    subprocess.run(['git', 'sparse-checkout', 'set', '--no-cone', '--', *patterns], cwd=str(root), check=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description='Print or apply sparse-checkout patterns for one student task')
+    ap.add_argument('--name-task', help='Workflow input like [NameLatin][taskN]')
+    ap.add_argument('--student', help='NameLatin (instead of --name-task)')
+    ap.add_argument('--task', help='Task number or folder (instead of --name-task)')
+    ap.add_argument('--apply', action='store_true', help='Run git sparse-checkout set with the patterns')
+    args = ap.parse_args(argv)
+
+    student, task_folder = args.student, None
+    try:
+        if args.name_task:
+            student, task_folder = parse_name_task(args.name_task)
+        elif args.task:
+            m = re.search(r'(\d+)', args.task)
+            if not m:
+                raise ValueError('Invalid task format, expected a number')
+            task_folder = f'task_{int(m.group(1)):02d}'
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+
+    patterns = sparse_patterns(student, task_folder)
+    print('\n'.join(patterns))
+    if args.apply:
+        try:
+            apply_patterns(patterns)
+        except (OSError, subprocess.CalledProcessError) as exc:
+            print(f'git sparse-checkout failed: {exc}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Shared parser for `students/<NameLatin>/task_NN/...` paths in a PR file list.
+
+One precompiled pattern is matched once per path; (student, task number) pairs are
+de-duplicated before the task number is normalized, so a 3000-file PR costs one
+regex match per path and one int() per distinct pair. Task folders may be spelled
+`task_3`, `Task_03` or `task-3`; all become `task_03`.
+
+Benchmark on synthetic file lists (default: 3000 paths):
+
+    python .github/scripts/student_paths.py --bench 3000
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import timeit
+from typing import Iterable, List, Optional, Tuple
+
+# the task segment must be a directory: students/<Name>/task_NN/<file>
+TASK_PATH_RE = re.compile(r'(?:\./)?students/([^/]+)/[Tt]ask[_-]?(\d+)/')
+STUDENT_DIR_RE = re.compile(r'/?\.?/?students/([^/]+)')
+
+
+def task_folder(number: str | int) -> str:
+    return f'task_{int(number):02d}'
+
+
+def student_task_pairs(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """Distinct (student, 'task_NN') pairs in the order they first appear."""
+    raw = dict.fromkeys(m.groups() for m in map(TASK_PATH_RE.match, paths) if m)
+    return list(dict.fromkeys((student, task_folder(number)) for student, number in raw))
+
+
+def student_from_dir(allowed: Optional[str]) -> str:
+    """'students/NameLatin' (also './students/...', backslashes) -> 'NameLatin', or ''."""
+    m = STUDENT_DIR_RE.match((allowed or '').replace('\\', '/'))
+    return m.group(1) if m else ''
+
+
+def _sample_paths(count: int) -> List[str]:
+    paths = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            paths.append(f'docs/img/pic{i}.png')
+        elif kind == 1:
+            paths.append(f'students/User{i % 5}/Task_{i % 12 + 1}/src/file{i}.js')
+        else:
+            paths.append(f'students/User{i % 5}/task_{i % 12 + 1:02d}/index{i}.html')
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description='Time student_task_pairs on synthetic PR file lists')
+    ap.add_argument('--bench', type=int, default=3000, metavar='N', help='Paths per file list')
+    ap.add_argument('--repeat', type=int, default=50)
+    args = ap.parse_args(argv)
+
+    cases = {
+        'mixed': _sample_paths(args.bench),
+        'no student paths': [f'docs/pages/{i}.md' for i in range(args.bench)],
+    }
+    for name, paths in cases.items():
+        best = min(timeit.repeat(lambda: student_task_pairs(paths), number=args.repeat, repeat=5)) / args.repeat
+        print(f'{name:>16}: {len(paths)} paths, {len(student_task_pairs(paths))} pairs, {best * 1e3:.3f} ms')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
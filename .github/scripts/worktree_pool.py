@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Pool of per-PR `git worktree` checkouts for reviewing PRs side by side.
+
+Each PR gets its own detached worktree under the pool directory. Checking a PR
+out again only fetches new objects (`pull/N/head` into `refs/pr-pool/N`) and
+updates the files that changed, instead of switching the main working tree.
+The least recently used worktrees are removed once the pool holds more than
+`max_worktrees`.
+
+Usage:
+    from worktree_pool import WorktreePool
+    path = WorktreePool().checkout(123)
+
+Env:
+    PR_WORKTREE_DIR: pool directory (default: <git common dir>/pr-worktrees)
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Callable, List, Optional
+
+
+ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_MAX_WORKTREES = 5
+REF_PREFIX = 'refs/pr-pool'
+
+
+class WorktreeError(RuntimeError):
+    pass
+
+
+class WorktreePool:
+    def __init__(
+        self,
+        repo_root: Optional[os.PathLike] = None,
+        pool_dir: Optional[os.PathLike] = None,
+        max_worktrees: int = DEFAULT_MAX_WORKTREES,
+        remote: str = 'origin',
+        run: Callable[..., subprocess.CompletedProcess] = subprocess.run,
+    ):
+        self.repo_root = Path(repo_root or ROOT)
+        self.max_worktrees = max(1, max_worktrees)
+        self.remote = remote
+        self._run = run
+        if pool_dir is None and os.environ.get('PR_WORKTREE_DIR'):
+            pool_dir = os.environ['PR_WORKTREE_DIR']
+        if pool_dir is None:
+            # inside the git dir, so the pool never shows up as untracked files
+            common = self._git('rev-parse', '--git-common-dir').strip()
+            pool_dir = (self.repo_root / common).resolve() / 'pr-worktrees'
+        self.pool_dir = Path(pool_dir)
+
+    def _git(self, *args: str, cwd: Optional[Path] = None) -> str:
+        cmd = ['git', *args]
+        try:
+            result = self._run(cmd, cwd=str(cwd or self.repo_root), check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as exc:
+            raise WorktreeError(f'{" ".join(cmd)} failed: {(exc.stderr or "").strip()}') from exc
+        return result.stdout
+
+    def path_for(self, pr_number: int) -> Path:
+        return self.pool_dir / f'pr-{pr_number}'
+
+    def fetch(self, pr_number: int) -> str:
+        """Fetch the PR head into refs/pr-pool/N and return its commit sha."""
+        ref = f'{REF_PREFIX}/{pr_number}'
+        self._git('fetch', '--no-tags', '--quiet', self.remote, f'+pull/{pr_number}/head:{ref}')
+        return self._git('rev-parse', ref).strip()
+
+    def _registered(self) -> set:
+        out = self._git('worktree', 'list', '--porcelain')
+        return {Path(line[len('worktree '):]).resolve() for line in out.splitlines() if line.startswith('worktree ')}
+
+    def checkout(self, pr_number: int) -> Path:
+        """Create or update the worktree for a PR, evict old ones, and return its path."""
+        sha = self.fetch(pr_number)
+        path = self.path_for(pr_number)
+        if path.exists() and path.resolve() in self._registered():
+            # only files that differ between the old and new head are rewritten
+            self._git('checkout', '--quiet', '--force', '--detach', sha, cwd=path)
+        else:
+            if path.exists():
+                shutil.rmtree(path)
+            self._git('worktree', 'prune')
+            self.pool_dir.mkdir(parents=True, exist_ok=True)
+            self._git('worktree', 'add', '--quiet', '--force', '--detach', str(path), sha)
+        os.utime(path)  # mark as most recently used
+        self.evict(keep=path)
+        return path
+
+    def worktrees(self) -> List[Path]:
+        """Pool worktrees, least recently used first."""
+        if not self.pool_dir.is_dir():
+            return []
+        paths = [p for p in self.pool_dir.iterdir() if p.is_dir() and p.name.startswith('pr-')]
+        return sorted(paths, key=lambda p: p.stat().st_mtime)
+
+    def remove(self, path: Path) -> None:
+        try:
+            self._git('worktree', 'remove', '--force', str(path))
+        except WorktreeError:
+            shutil.rmtree(path, ignore_errors=True)
+            self._git('worktree', 'prune')
+        number = path.name[len('pr-'):]
+        if number.isdigit():
+            try:
+                self._git('update-ref', '-d', f'{REF_PREFIX}/{number}')
+            except WorktreeError:
+                pass
+
+    def evict(self, keep: Optional[Path] = None) -> List[Path]:
+        """Remove least recently used worktrees beyond max_worktrees; returns removed paths."""
+        candidates = [p for p in self.worktrees() if keep is None or p != keep]
+        excess = len(candidates) + (1 if keep is not None else 0) - self.max_worktrees
+        removed = []
+        for path in candidates[:max(excess, 0)]:
+            self.remove(path)
+            removed.append(path)
+        return removed
@@ -5,10 +5,13 @@ between markers <!-- STUDENTS_TABLE_START --> and <!-- STUDENTS_TABLE_END -->.
 
 Usage: python scripts/generate_students_table.py
 """
-import csv
+import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / ".github" / "scripts"))
+
+from roster import load_roster  # noqa: E402
 CSV_PATH = ROOT / "students" / "students.csv"
 README = ROOT / "README.md"
 STUDENTS_DIR = ROOT / "students"
@@ -17,10 +20,9 @@ START_MARKER = "<!-- STUDENTS_TABLE_START -->"
 END_MARKER = "<!-- STUDENTS_TABLE_END -->"
 
 def read_csv(path):
-    with path.open(newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        rows = [r for r in reader]
-    return rows
+    # shared roster parser: same encoding handling (utf-8-sig) and cache as the CI scripts
+    roster = load_roster(path)
+    return [list(roster.header)] + [list(r) for r in roster.rows]
 
 def make_md_table(rows):
     if not rows:
@@ -82,3 +82,179 @@ def test_find_non_task_files_flags_readme_and_misc():
     assert 'students/User/docs/note.txt' in non_task
     # file outside student dir should not be listed here
     assert 'some/other/place.txt' not in non_task
+
+
+def test_run_batch_writes_one_result_per_pr(tmp_path, requests_mock, monkeypatch):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    csv = tmp_path / 'students.csv'
+    csv.write_text('NameLatin,Directory,Github Username\nJohn,./students/John,john\nJane,./students/Jane,jane\n', encoding='utf-8')
+    monkeypatch.setattr(checker, 'STUDENTS_CSV', str(csv))
+    monkeypatch.setattr(checker, 'REPO_ROOT', str(tmp_path))
+    monkeypatch.delenv('WHITELIST', raising=False)
+
+    api = 'https://api.github.com/repos/org/repo/pulls'
+    requests_mock.get(f'{api}/1', json={'number': 1, 'url': f'{api}/1', 'user': {'login': 'john'}, 'head': {}, 'base': {}})
+    requests_mock.get(f'{api}/2', json={'number': 2, 'url': f'{api}/2', 'user': {'login': 'jane'}, 'head': {}, 'base': {}})
+    requests_mock.get(f'{api}/3', json={'number': 3, 'url': f'{api}/3', 'user': {'login': 'stranger'}, 'head': {}, 'base': {}})
+    requests_mock.get(f'{api}/4', json={'number': 4, 'url': f'{api}/4', 'user': {'login': 'john'}, 'head': {}, 'base': {}})
+    requests_mock.get(f'{api}/4/files', status_code=404, json={'message': 'Not Found'})
+    requests_mock.get(f'{api}/1/files', json=[{'filename': 'students/John/task_01/index.html'}])
+    requests_mock.get(f'{api}/2/files', json=[{'filename': 'students/John/task_01/index.html'}])
+
+    out = tmp_path / 'check_results.json'
+    rc = checker.run_batch('org/repo', ['1', '2', '3', '4'], str(out), workers=2)
+
+    results = json.loads(out.read_text(encoding='utf-8'))
+    assert rc == 1
+    assert results['1']['exit_code'] == 0 and results['1']['tasks'] == ['task_01']
+    assert results['2']['exit_code'] == 2
+    assert results['3']['exit_code'] == 3
+    # a failed file list is an error, not an empty (approved) PR
+    assert results['4']['exit_code'] == 1 and 'Failed to list changed files' in results['4']['message']
+    # unmapped author: no file list request
+    assert not any(r.url.startswith(f'{api}/3/files') for r in requests_mock.request_history)
+
+
+def test_fetch_changed_files_via_api_fetches_known_pages_concurrently(requests_mock):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    pr_url = 'https://api.github.com/repos/org/repo/pulls/43'
+    for page in (1, 2, 3):
+        requests_mock.get(
+            f'{pr_url}/files?per_page=100&page={page}',
+            json=[{'filename': f'p{page}_{i}.txt'} for i in range(100 if page < 3 else 50)],
+        )
+
+    files = checker.fetch_changed_files_via_api({'url': pr_url, 'changed_files': 250})
+
+    assert len(files) == 250
+    assert files[0] == 'p1_0.txt' and files[100] == 'p2_0.txt' and files[-1] == 'p3_49.txt'
+    assert len(requests_mock.request_history) == 3
+
+
+def _git(cwd, *args):
+    import subprocess
+    out = subprocess.run(
+        ['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    )
+    return out.stdout.strip()
+
+
+def test_fetch_changed_files_via_git_against_bare_repo(tmp_path):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    work = tmp_path / 'work'
+    work.mkdir()
+    _git(work, 'init', '-q')
+    (work / 'README.md').write_text('base\n', encoding='utf-8')
+    other = work / 'students' / 'Other' / 'task_01'
+    other.mkdir(parents=True)
+    (other / 'moved.html').write_text('<p>other student</p>\n' * 20, encoding='utf-8')
+    _git(work, 'add', '-A')
+    _git(work, 'commit', '-qm', 'base')
+    base_sha = _git(work, 'rev-parse', 'HEAD')
+    task_dir = work / 'students' / 'Иван' / 'task_01'
+    task_dir.mkdir(parents=True)
+    (task_dir / 'index.html').write_text('<html></html>\n', encoding='utf-8')
+    (work / 'README.md').write_text('changed\n', encoding='utf-8')
+    _git(work, 'mv', 'students/Other/task_01/moved.html', 'students/Иван/task_01/moved.html')
+    _git(work, 'add', '-A')
+    _git(work, 'commit', '-qm', 'head')
+    head_sha = _git(work, 'rev-parse', 'HEAD')
+    bare = tmp_path / 'repo.git'
+    _git(tmp_path, 'clone', '-q', '--bare', str(work), str(bare))
+
+    pr = {'base': {'sha': base_sha}, 'head': {'sha': head_sha}}
+    files = checker.fetch_changed_files_via_git(pr, repo_root=str(bare))
+
+    # a move is listed by both paths, so the other student's folder is checked too
+    assert sorted(files) == ['README.md', 'students/Other/task_01/moved.html',
+                             'students/Иван/task_01/index.html', 'students/Иван/task_01/moved.html']
+    # unknown commit -> None so the caller falls back to the API
+    missing = {'base': {'sha': base_sha}, 'head': {'sha': '0' * 40}}
+    assert checker.fetch_changed_files_via_git(missing, repo_root=str(bare)) is None
+
+
+def test_classify_pages_single_pass_and_early_stop():
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    consumed = []
+
+    def pages():
+        for page in (
+            ['students/User/task_01/a.html', 'students/User/README.md'],
+            ['node_modules/x.js', 'students/User/task_02/b.js'],
+            ['never/fetched.txt'],
+        ):
+            consumed.append(page)
+            yield page
+
+    full = checker.classify_pages(pages(), 'students/User')
+    assert full['violations'] == ['node_modules/x.js', 'never/fetched.txt']
+    assert full['non_task_files'] == ['students/User/README.md']
+    assert full['tasks'] == {'task_01', 'task_02'}
+    assert full['files_seen'] == 5 and not full['stopped_early']
+
+    consumed.clear()
+    fast = checker.classify_pages(pages(), 'students/User', stop_on_violation=True)
+    assert fast['violations'] == ['node_modules/x.js']
+    assert fast['stopped_early']
+    assert len(consumed) == 2
+
+
+def test_validate_changed_files_records_files_student_and_task():
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+
+    result = checker.validate_changed_files('user', 'students/User', [['./students/User/task_03/a.html'], ['students/User/task_03/b.css']])
+    assert result['exit_code'] == 0
+    assert result['changed_files'] == ['students/User/task_03/a.html', 'students/User/task_03/b.css']
+    assert (result['student'], result['task']) == ('User', 'task_03')
+
+
+def test_failed_page_fails_validation(requests_mock, monkeypatch):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+    monkeypatch.setenv('CHANGED_FILES_PROVIDER', 'api')
+
+    pr_url = 'https://api.github.com/repos/org/repo/pulls/44'
+    requests_mock.get(f'{pr_url}/files?per_page=100&page=1', json=[{'filename': 'students/User/task_01/a.html'}] * 100)
+    requests_mock.get(f'{pr_url}/files?per_page=100&page=2', status_code=404, json={'message': 'Not Found'})
+
+    _, pages = checker.iter_changed_file_pages({'url': pr_url, 'changed_files': 150})
+    result = checker.validate_changed_files('user', 'students/User', pages)
+
+    assert result['exit_code'] == 1
+    assert 'Failed to list changed files' in result['message']
+
+
+def test_run_batch_reports_failed_pr_listing(tmp_path, requests_mock, monkeypatch):
+    script_path = os.path.abspath('.github/scripts/check_student_directory.py')
+    spec = importlib.util.spec_from_file_location('checker', script_path)
+    checker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(checker)
+    monkeypatch.setattr(checker, 'STUDENTS_CSV', str(tmp_path / 'missing.csv'))
+    monkeypatch.setattr(checker, 'REPO_ROOT', str(tmp_path))
+    requests_mock.get('https://api.github.com/repos/org/repo/pulls', status_code=404, json={'message': 'Not Found'})
+
+    out = tmp_path / 'check_results.json'
+    assert checker.run_batch('org/repo', None, str(out)) == 1
+    assert not out.exists()
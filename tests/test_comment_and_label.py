@@ -33,23 +33,28 @@ def test_comment_and_label_adds_comment_and_label(tmp_path, requests_mock):
     # mock comments and labels endpoints
     comments_url = f'https://api.github.com/repos/{repo}/issues/{pr}/comments'
     labels_url = f'https://api.github.com/repos/{repo}/issues/{pr}/labels'
+    close_url = f'https://api.github.com/repos/{repo}/issues/{pr}'
     requests_mock.get(comments_url, json=[])
     # existing labels include 'Dir approved' to verify removal on failure
-    requests_mock.get(labels_url, json=[{'name': 'Dir approved'}])
+    requests_mock.get(close_url, json={'state': 'open', 'labels': [{'name': 'Dir approved'}, {'name': 'task_01'}]})
+    # a grader added 'needs-review' after the issue read; the PUT is built from a fresh read
+    requests_mock.get(labels_url, json=[{'name': 'Dir approved'}, {'name': 'task_01'}, {'name': 'needs-review'}])
     requests_mock.post(comments_url, json={'id': 1}, status_code=201)
-    requests_mock.post(labels_url, json=[{'name': 'invalid-directory'}], status_code=200)
-    requests_mock.delete(f'https://api.github.com/repos/{repo}/issues/{pr}/labels/Dir%20approved', status_code=200)
-    close_url = f'https://api.github.com/repos/{repo}/issues/{pr}'
+    requests_mock.put(labels_url, json=[{'name': 'Wrong dir'}], status_code=200)
     requests_mock.patch(close_url, json={'state': 'closed'}, status_code=200)
 
     env = {'REPO': repo, 'PR_NUMBER': pr, 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}
     exit_code = run_script(os.path.abspath('.github/scripts/comment_and_label.py'), env)
 
     assert exit_code == 0
-    requested_urls = [req.url for req in requests_mock.request_history]
-    assert close_url in requested_urls
-    # ensure label remove was called
-    assert f'https://api.github.com/repos/{repo}/issues/{pr}/labels/Dir%20approved' in requested_urls
+    calls = sorted((req.method, req.url) for req in requests_mock.request_history)
+    assert calls == [
+        ('GET', close_url), ('GET', comments_url + '?per_page=100'), ('GET', labels_url + '?per_page=100'),
+        ('PATCH', close_url), ('POST', comments_url), ('PUT', labels_url),
+    ]
+    # one PUT drops 'Dir approved', keeps other labels and adds 'Wrong dir'
+    put = [req for req in requests_mock.request_history if req.method == 'PUT'][0]
+    assert put.json() == {'labels': ['task_01', 'needs-review', 'Wrong dir']}
 
 
 def test_comment_for_multiple_tasks(tmp_path, requests_mock):
@@ -64,9 +69,10 @@ def test_comment_for_multiple_tasks(tmp_path, requests_mock):
     close_url = f'https://api.github.com/repos/{repo}/issues/{pr}'
 
     requests_mock.get(comments_url, json=[])
+    requests_mock.get(close_url, json={'state': 'open', 'labels': []})
     requests_mock.get(labels_url, json=[])
     requests_mock.post(comments_url, json={'id': 10}, status_code=201)
-    requests_mock.post(labels_url, json=[{'name': 'invalid-directory'}], status_code=200)
+    requests_mock.put(labels_url, json=[{'name': 'Wrong dir'}], status_code=200)
     requests_mock.patch(close_url, json={'state': 'closed'}, status_code=200)
 
     env = {'REPO': repo, 'PR_NUMBER': pr, 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}
@@ -100,9 +106,10 @@ def test_comment_for_non_task_files(tmp_path, requests_mock):
     close_url = f'https://api.github.com/repos/{repo}/issues/{pr}'
 
     requests_mock.get(comments_url, json=[])
+    requests_mock.get(close_url, json={'state': 'open', 'labels': []})
     requests_mock.get(labels_url, json=[])
     requests_mock.post(comments_url, json={'id': 11}, status_code=201)
-    requests_mock.post(labels_url, json=[{'name': 'invalid-directory'}], status_code=200)
+    requests_mock.put(labels_url, json=[{'name': 'Wrong dir'}], status_code=200)
     requests_mock.patch(close_url, json={'state': 'closed'}, status_code=200)
 
     env = {'REPO': repo, 'PR_NUMBER': pr, 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}
@@ -129,10 +136,10 @@ def test_success_adds_dir_approved_and_removes_wrong_dir(tmp_path, requests_mock
     pr = '99'
     comments_url = f'https://api.github.com/repos/{repo}/issues/{pr}/comments'
     labels_url = f'https://api.github.com/repos/{repo}/issues/{pr}/labels'
-    # existing labels include Wrong dir, expect delete; then add Dir approved
-    requests_mock.get(labels_url, json=[{'name': 'Wrong dir'}])
-    requests_mock.delete(f'https://api.github.com/repos/{repo}/issues/{pr}/labels/Wrong%20dir', status_code=200)
+    # existing labels include Wrong dir: it is deleted and Dir approved added, other labels untouched
+    requests_mock.get(f'https://api.github.com/repos/{repo}/issues/{pr}', json={'state': 'open', 'labels': [{'name': 'Wrong dir'}]})
     requests_mock.post(labels_url, json=[{'name': 'Dir approved'}], status_code=200)
+    requests_mock.delete(labels_url + '/Wrong%20dir', json=[], status_code=200)
 
     env = {'REPO': repo, 'PR_NUMBER': pr, 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}
     exit_code = run_script(os.path.abspath('.github/scripts/comment_and_label.py'), env)
@@ -141,3 +148,100 @@ def test_success_adds_dir_approved_and_removes_wrong_dir(tmp_path, requests_mock
     # No comment expected for success path
     posted_comments = [req for req in requests_mock.request_history if req.url == comments_url and req.method == 'POST']
     assert not posted_comments
+    assert sorted((req.method, req.path) for req in requests_mock.request_history if req.method != 'GET') == [
+        ('DELETE', '/repos/owner/repo/issues/99/labels/wrong%20dir'), ('POST', '/repos/owner/repo/issues/99/labels'),
+    ]
+    assert [req.json() for req in requests_mock.request_history if req.method == 'POST'] == [{'labels': ['Dir approved']}]
+    assert not any(req.method == 'PUT' for req in requests_mock.request_history)
+
+
+def test_marker_lookup_pages_newest_first_and_reuses_etag(tmp_path, requests_mock):
+    cr = tmp_path / 'check_result.json'
+    cr.write_text(json.dumps({'exit_code': 2, 'allowed': 'students/A', 'violations': ['README.md']}), encoding='utf-8')
+    state = tmp_path / 'state' / 'comments.json'
+
+    repo = 'owner/repo'
+    pr = '5'
+    api = f'https://api.github.com/repos/{repo}'
+    comments_url = f'{api}/issues/{pr}/comments'
+    marker = '<!-- student-dir-checker -->'
+    requests_mock.get(f'{api}/issues/{pr}', json={'state': 'closed', 'labels': [{'name': 'Wrong dir'}]})
+    requests_mock.get(comments_url + '?per_page=100', json=[{'id': 1, 'body': marker + '\nold'}],
+                      headers={'Link': f'<{comments_url}?per_page=100&page=3>; rel="last"'})
+    requests_mock.get(comments_url + '?per_page=100&page=3', json=[{'id': 300, 'body': 'hi'}])
+    requests_mock.get(comments_url + '?per_page=100&page=2', json=[{'id': 200, 'body': marker + '\nstale'}, {'id': 201, 'body': 'x'}])
+    requests_mock.patch(f'{api}/issues/comments/200', json={'id': 200}, headers={'ETag': 'W/"e1"'})
+
+    env = {'REPO': repo, 'PR_NUMBER': pr, 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr), 'COMMENT_STATE_PATH': str(state)}
+    assert run_script(os.path.abspath('.github/scripts/comment_and_label.py'), env) == 0
+
+    # page 3 then page 2; the newest marker comment is updated, nothing else is written
+    assert [r.qs.get('page') for r in requests_mock.request_history if r.path.endswith('/comments')] == [None, ['3'], ['2']]
+    assert [(r.method, r.path) for r in requests_mock.request_history if r.method != 'GET'] == [
+        ('PATCH', '/repos/owner/repo/issues/comments/200'),
+    ]
+    saved = json.loads(state.read_text(encoding='utf-8'))['owner/repo#5']
+    assert saved['comment_id'] == 200 and saved['etag'] == 'W/"e1"'
+
+    requests_mock.reset_mock()
+    requests_mock.get(f'{api}/issues/comments/200', status_code=304)
+    assert run_script(os.path.abspath('.github/scripts/comment_and_label.py'), env) == 0
+
+    assert sorted(r.path for r in requests_mock.request_history) == [
+        '/repos/owner/repo/issues/5', '/repos/owner/repo/issues/comments/200',
+    ]
+    conditional = [r for r in requests_mock.request_history if r.path.endswith('/comments/200')][0]
+    assert conditional.headers['If-None-Match'] == 'W/"e1"'
+
+
+def test_sweep_dry_run_then_apply(tmp_path, requests_mock, capsys):
+    results = tmp_path / 'results'
+    results.mkdir()
+    # a combined batch file plus a single result named after its PR
+    (results / 'check_results.json').write_text(json.dumps({
+        '7': {'exit_code': 0, 'allowed': 'students/A'},
+        '8': {'exit_code': 2, 'allowed': 'students/B', 'violations': ['README.md']},
+    }), encoding='utf-8')
+    (results / 'check_result_9.json').write_text(json.dumps({'exit_code': 0}), encoding='utf-8')
+
+    api = 'https://api.github.com/repos/owner/repo'
+    requests_mock.get(f'{api}/issues/7', json={'state': 'open', 'labels': [{'name': 'Wrong dir'}]})
+    requests_mock.get(f'{api}/issues/8', json={'state': 'open', 'labels': []})
+    requests_mock.get(f'{api}/issues/9', json={'state': 'open', 'labels': [{'name': 'Dir approved'}]})
+    requests_mock.get(f'{api}/issues/8/comments', json=[])
+    requests_mock.post(f'{api}/issues/7/labels', json=[])
+    requests_mock.delete(f'{api}/issues/7/labels/Wrong%20dir', json=[])
+    requests_mock.get(f'{api}/issues/8/labels', json=[])
+    requests_mock.put(f'{api}/issues/8/labels', json=[])
+    requests_mock.post(f'{api}/issues/8/comments', json={'id': 80}, status_code=201)
+    requests_mock.patch(f'{api}/issues/8', json={'state': 'closed'})
+
+    env = {'REPO': 'owner/repo', 'GITHUB_TOKEN': 'x'}
+    spec = importlib.util.spec_from_file_location('mod', os.path.abspath('.github/scripts/comment_and_label.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    original = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        assert mod.main(['--sweep', str(results), '--dry-run']) == 0
+        assert all(r.method == 'GET' for r in requests_mock.request_history)
+        planned = [line for line in capsys.readouterr().out.splitlines() if line.startswith('#')]
+        assert planned == [
+            '#7: POST labels: Dir approved', '#7: DELETE label: Wrong dir',
+            '#8: POST comment', '#8: PUT labels: Wrong dir', '#8: PATCH state: closed',
+        ]
+
+        requests_mock.reset_mock()
+        assert mod.main(['--sweep', str(results), '--workers', '2', '--writes-per-minute', '0']) == 0
+    finally:
+        for k, old in original.items():
+            if old is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = old
+    writes = sorted((r.method, r.path) for r in requests_mock.request_history if r.method != 'GET')
+    assert writes == [
+        ('DELETE', '/repos/owner/repo/issues/7/labels/wrong%20dir'),
+        ('PATCH', '/repos/owner/repo/issues/8'), ('POST', '/repos/owner/repo/issues/7/labels'),
+        ('POST', '/repos/owner/repo/issues/8/comments'), ('PUT', '/repos/owner/repo/issues/8/labels'),
+    ]
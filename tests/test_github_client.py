@@ -0,0 +1,96 @@
+import os
+import importlib.util
+
+import pytest
+import requests
+
+
+def load_client_module():
+    script = os.path.abspath('.github/scripts/github_client.py')
+    spec = importlib.util.spec_from_file_location('github_client', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_retries_on_5xx_then_succeeds(requests_mock):
+    gh = load_client_module()
+    sleeps = []
+    client = gh.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/pulls/1'
+    requests_mock.get(url, [{'status_code': 502}, {'status_code': 200, 'json': {'number': 1}}])
+
+    r = client.get('/repos/org/repo/pulls/1')
+
+    assert r.status_code == 200
+    assert len(sleeps) == 1
+    stats = client.stats['GET /repos/org/repo/pulls/:n']
+    assert stats['calls'] == 1 and stats['retries'] == 1
+
+
+def test_honors_retry_after_on_secondary_rate_limit(requests_mock):
+    gh = load_client_module()
+    sleeps = []
+    client = gh.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/issues/1/comments'
+    requests_mock.post(url, [
+        {'status_code': 403, 'headers': {'Retry-After': '7'}, 'text': 'secondary rate limit'},
+        {'status_code': 201, 'json': {'id': 5}},
+    ])
+
+    r = client.post(url, json={'body': 'hi'})
+
+    assert r.status_code == 201
+    assert sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries(requests_mock):
+    gh = load_client_module()
+    sleeps = []
+    client = gh.GitHubClient('x', max_retries=2, sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo'
+    requests_mock.get(url, status_code=503)
+
+    r = client.get(url)
+
+    assert r.status_code == 503
+    assert len(sleeps) == 2
+
+
+def test_post_is_not_retried_on_5xx_or_network_error(requests_mock):
+    gh = load_client_module()
+    sleeps = []
+    client = gh.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo/issues'
+    requests_mock.post(url, [{'status_code': 502}, {'status_code': 201, 'json': {'number': 9}}])
+    assert client.post(url, json={'title': 't'}).status_code == 502
+
+    requests_mock.patch(url + '/1', exc=requests.ConnectTimeout)
+    with pytest.raises(requests.ConnectTimeout):
+        client.patch(url + '/1', json={'state': 'closed'})
+    assert sleeps == []
+    assert len([r for r in requests_mock.request_history if r.method == 'POST']) == 1
+
+
+def test_plain_403_is_not_retried(requests_mock):
+    gh = load_client_module()
+    sleeps = []
+    client = gh.GitHubClient('x', sleep=sleeps.append)
+    url = 'https://api.github.com/repos/org/repo'
+    requests_mock.get(url, status_code=403, text='Resource not accessible by integration')
+
+    assert client.get(url).status_code == 403
+    assert sleeps == []
+
+
+def test_paginate_follows_link_header(requests_mock):
+    gh = load_client_module()
+    client = gh.GitHubClient('x')
+    first = 'https://api.github.com/repos/org/repo/pulls/1/files?per_page=100'
+    second = 'https://api.github.com/repos/org/repo/pulls/1/files?page=2'
+    requests_mock.get(first, json=[{'filename': 'a'}], headers={'Link': f'<{second}>; rel="next"'})
+    requests_mock.get(second, json=[{'filename': 'b'}])
+
+    items = list(client.paginate('/repos/org/repo/pulls/1/files', params={'per_page': 100}))
+
+    assert [i['filename'] for i in items] == ['a', 'b']
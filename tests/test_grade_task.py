@@ -0,0 +1,94 @@
+import os
+import csv
+import importlib.util
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/grade_task.py')
+    spec = importlib.util.spec_from_file_location('grade_task', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_extract_score_takes_last_total():
+    mod = load_module()
+    text = 'Пример: Итого: 10 / 100\n...\n**Итого: 87,5 / 100**'
+    assert mod.extract_score(text) == ('87.5', '100')
+    assert mod.extract_score('no score here') == ('', '')
+
+
+def test_main_grades_group_and_writes_summary(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setattr(mod.run_ai_check, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    monkeypatch.delenv('MODEL', raising=False)
+
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'Вариант,Group,NameLatin,Directory,Github Username\n'
+        '1,AS-63,Alice,./students/Alice,alice\n'
+        '2,AS-63,Bob,./students/Bob,bob\n'
+        '3,AS-64,Carol,./students/Carol,carol\n',
+        encoding='utf-8',
+    )
+    for name in ('Alice', 'Carol'):
+        d = tmp_path / 'students' / name / 'task_03'
+        d.mkdir(parents=True)
+        (d / 'index.html').write_text(f'<h1>{name}</h1>', encoding='utf-8')
+    task = tmp_path / 'tasks' / 'task_03'
+    task.mkdir(parents=True)
+    (task / 'readme.md').write_text('# Task 3', encoding='utf-8')
+    (task / 'Варианты.md').write_text('1. one\n2. two\n', encoding='utf-8')
+
+    requests_mock.post(
+        'https://models.inference.ai.azure.com/v1/chat/completions',
+        json={'choices': [{'message': {'content': 'Ок.\nИтого: 90 / 100'}}]},
+    )
+    out_dir = tmp_path / 'grades'
+
+    rc = mod.main(['--task', '3', '--group', 'AS-63', '--rpm', '0', '--out-dir', str(out_dir)])
+
+    assert rc == 0
+    assert requests_mock.call_count == 1
+    with (out_dir / 'task_03' / 'summary.csv').open(encoding='utf-8') as f:
+        rows = {r['student']: r for r in csv.DictReader(f)}
+    assert set(rows) == {'Alice', 'Bob'}
+    assert rows['Alice']['status'] == 'ok' and rows['Alice']['score'] == '90'
+    assert rows['Bob']['status'] == 'no submission'
+    assert 'Итого: 90 / 100' in (out_dir / 'task_03' / 'Alice.md').read_text(encoding='utf-8')
+
+
+def test_main_applies_cache_max_age(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setattr(mod.run_ai_check, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    monkeypatch.delenv('MODEL', raising=False)
+
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'Вариант,NameLatin,Directory,Github Username\n1,Alice,./students/Alice,alice\n', encoding='utf-8')
+    d = tmp_path / 'students' / 'Alice' / 'task_01'
+    d.mkdir(parents=True)
+    (d / 'index.html').write_text('<h1>Alice</h1>', encoding='utf-8')
+    requests_mock.post(
+        'https://models.inference.ai.azure.com/v1/chat/completions',
+        json={'choices': [{'message': {'content': 'Итого: 80 / 100'}}]},
+    )
+    cache = tmp_path / 'cache'
+    argv = ['--task', '1', '--rpm', '0', '--out-dir', str(tmp_path / 'grades'), '--cache-dir', str(cache)]
+
+    assert mod.main(argv) == 0
+    assert mod.main(argv) == 0
+    assert requests_mock.call_count == 1
+
+    # a two-day-old entry is ignored with --cache-max-age-days 1
+    for entry in cache.glob('*/*.json'):
+        old = entry.stat().st_mtime - 2 * 86400
+        os.utime(entry, (old, old))
+    assert mod.main(argv + ['--cache-max-age-days', '1']) == 0
+    assert requests_mock.call_count == 2
@@ -0,0 +1,96 @@
+import os
+import json
+import importlib.util
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location('on_success', os.path.abspath('.github/scripts/on_success_create_issue.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_success_uses_validator_result_without_listing_files(tmp_path, requests_mock, monkeypatch):
+    cr = tmp_path / 'check_result.json'
+    cr.write_text(json.dumps({
+        'exit_code': 0, 'allowed': 'students/IvanovIvan', 'student': 'IvanovIvan', 'task': 'task_03',
+        'changed_files': ['students/IvanovIvan/task_03/index.html'],
+    }), encoding='utf-8')
+    api = 'https://api.github.com/repos/owner/repo'
+    requests_mock.get(f'{api}/issues/12/labels', json=[{'name': 'Dir approved'}])
+    requests_mock.get(f'{api}/issues', json=[])
+    requests_mock.post(f'{api}/issues', json={'number': 50}, status_code=201)
+    requests_mock.post(f'{api}/issues/12/comments', json={'id': 1}, status_code=201)
+    for k, v in {'REPO': 'owner/repo', 'PR_NUMBER': '12', 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}.items():
+        monkeypatch.setenv(k, v)
+
+    assert load_module().main() == 0
+
+    assert not [r for r in requests_mock.request_history if r.path.endswith('/files')]
+    issue = [r for r in requests_mock.request_history if r.method == 'POST' and r.path == '/repos/owner/repo/issues'][0]
+    assert issue.json()['title'] == '[LABS][IvanovIvan][task3]'
+
+
+def test_success_falls_back_to_pr_files(tmp_path, requests_mock, monkeypatch):
+    cr = tmp_path / 'check_result.json'
+    cr.write_text(json.dumps({'exit_code': 0, 'message': 'whitelisted'}), encoding='utf-8')
+    api = 'https://api.github.com/repos/owner/repo'
+    requests_mock.get(f'{api}/pulls/12/files', json=[{'filename': 'students/PetrovPetr/task_01/a.js'}])
+    requests_mock.get(f'{api}/issues/12/labels', json=[])
+    requests_mock.post(f'{api}/issues/12/labels', json=[])
+    requests_mock.get(f'{api}/issues', json=[])
+    requests_mock.post(f'{api}/issues', json={'number': 51}, status_code=201)
+    requests_mock.post(f'{api}/issues/12/comments', json={'id': 1}, status_code=201)
+    for k, v in {'REPO': 'owner/repo', 'PR_NUMBER': '12', 'GITHUB_TOKEN': 'x', 'CHECK_RESULT_PATH': str(cr)}.items():
+        monkeypatch.setenv(k, v)
+
+    assert load_module().main() == 0
+
+    issue = [r for r in requests_mock.request_history if r.method == 'POST' and r.path == '/repos/owner/repo/issues'][0]
+    assert issue.json()['title'] == '[LABS][PetrovPetr][task1]'
+
+
+def test_rerun_reuses_open_issue_and_revalidates_index(tmp_path, requests_mock, monkeypatch):
+    cr = tmp_path / 'check_result.json'
+    cr.write_text(json.dumps({'exit_code': 0, 'student': 'IvanovIvan', 'task': 'task_03'}), encoding='utf-8')
+    index_path = tmp_path / 'index' / 'issues.json'
+    api = 'https://api.github.com/repos/owner/repo'
+    body = 'NameLatin = IvanovIvan\n\ntaskN = task3\n\n(Auto-created by CI on directory approval)'
+    open_issues = [
+        {'number': 40, 'title': 'some PR', 'state': 'open', 'updated_at': '2026-02-02T00:00:00Z', 'pull_request': {}},
+        {'number': 30, 'title': '[LABS][IvanovIvan][task3]', 'state': 'open', 'updated_at': '2026-02-01T00:00:00Z', 'body': body},
+    ]
+    requests_mock.get(f'{api}/issues?state=open', json=open_issues)
+    requests_mock.get(f'{api}/issues/12/labels', json=[{'name': 'Dir approved'}])
+    for k, v in {'REPO': 'owner/repo', 'PR_NUMBER': '12', 'GITHUB_TOKEN': 'x',
+                 'CHECK_RESULT_PATH': str(cr), 'ISSUE_INDEX_PATH': str(index_path)}.items():
+        monkeypatch.setenv(k, v)
+
+    mod = load_module()
+    # cold run: one state=open listing; open issue #30 has the same title and body, nothing is written
+    assert mod.main() == 0
+    assert [r.method for r in requests_mock.request_history] == ['GET', 'GET']
+    index = json.loads(index_path.read_text(encoding='utf-8'))
+    assert sorted(index['issues']) == ['30'] and index['updated_at'] == '2026-02-02T00:00:00Z'
+
+    # warm run: state=all sorted by updated, stops at the watermark
+    requests_mock.reset_mock()
+    requests_mock.get(f'{api}/issues?state=all', headers={'ETag': '"i1"', 'Link': f'<{api}/issues?page=2>; rel="next"'}, json=[
+        {'number': 30, 'title': '[LABS][IvanovIvan][task3]', 'state': 'closed', 'updated_at': '2026-03-01T00:00:00Z', 'body': body},
+        {'number': 20, 'title': 'old', 'state': 'closed', 'updated_at': '2026-01-01T00:00:00Z', 'body': ''},
+    ])
+    requests_mock.post(f'{api}/issues', json={'number': 41}, status_code=201)
+    requests_mock.post(f'{api}/issues/12/comments', json={'id': 1}, status_code=201)
+    assert mod.main() == 0
+    listing = [r for r in requests_mock.request_history if r.path == '/repos/owner/repo/issues' and r.method == 'GET']
+    assert len(listing) == 1 and listing[0].qs['state'] == ['all'] and 'If-None-Match' not in listing[0].headers
+    # #30 was closed since, so a new tracking issue is opened
+    assert [r.method for r in requests_mock.request_history if r.path == '/repos/owner/repo/issues'] == ['GET', 'POST']
+
+    # third run: 304 on the conditional listing, #41 is reused
+    requests_mock.reset_mock()
+    requests_mock.get(f'{api}/issues?state=all', status_code=304)
+    assert mod.main() == 0
+    listing = [r for r in requests_mock.request_history if r.path == '/repos/owner/repo/issues']
+    assert len(listing) == 1 and listing[0].headers['If-None-Match'] == '"i1"'
+    assert all(r.method == 'GET' for r in requests_mock.request_history)
@@ -0,0 +1,106 @@
+import os
+import importlib.util
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/prepare_AI_prompt.py')
+    spec = importlib.util.spec_from_file_location('prepare_AI_prompt', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+README = """# Task
+
+## Описание
+Сверстать страницу.
+
+<!-- START: criteria -->
+## Критерии оценивания
+- семантика — 50
+<!-- END: criteria -->
+
+##  критерии   оценивания
+ignored, markers win
+
+## Бонусы
++ анимации
+"""
+
+
+def test_section_index_headers_and_markers():
+    mod = load_module()
+    index = mod.SectionIndex(README)
+
+    assert index.section(['Описание'], ['description']) == 'Сверстать страницу.\n\n<!-- START: criteria -->'
+    assert index.section(['Критерии оценивания'], ['criteria']) == '- семантика — 50'
+    assert index.by_headers(['Нет такого', 'бонусы']) == '+ анимации'
+    assert index.by_markers(['missing']) == ''
+    assert mod.extract_section(README, ['Бонусы']) == '+ анимации'
+
+
+def test_load_section_index_is_memoized_by_mtime(tmp_path):
+    mod = load_module()
+    readme = tmp_path / 'readme.md'
+    readme.write_text('## Описание\nv1\n', encoding='utf-8')
+
+    first = mod.load_section_index(readme)
+    assert mod.load_section_index(readme) is first
+
+    readme.write_text('## Описание\nversion 2\n', encoding='utf-8')
+    later = readme.stat().st_mtime_ns + 10**9
+    os.utime(readme, ns=(later, later))
+    assert mod.load_section_index(readme).by_headers(['Описание']) == 'version 2'
+    assert mod.load_section_index(tmp_path / 'missing.md').text == ''
+
+
+def test_prompt_cache_hit_skips_parsing_and_warm_fills_roster(tmp_path, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'Вариант,NameLatin,Directory\n1,Alice,./students/Alice\n2,Bob,./students/Bob\n', encoding='utf-8')
+    task = tmp_path / 'tasks' / 'task_02'
+    task.mkdir(parents=True)
+    (task / 'readme.md').write_text(README, encoding='utf-8')
+    (task / 'Варианты.md').write_text('1. Кофейня\n2. Музей\n', encoding='utf-8')
+    cache = tmp_path / 'cache'
+
+    assert mod.main(['--warm', '2', '--cache-dir', str(cache)]) == 0
+    assert len(list(cache.glob('*.txt'))) == 2
+
+    monkeypatch.setattr(mod, 'assemble_prompt', lambda *a: 'rebuilt')
+    assert 'Вариант 2: Музей' in mod.build_prompt('Bob', 'task_02', cache)
+
+    (task / 'Варианты.md').write_text('1. Кофейня\n2. Галерея\n', encoding='utf-8')
+    assert mod.build_prompt('Bob', 'task_02', cache) == 'rebuilt'
+    # a different prompt template (this script's source) misses the cache as well
+    (task / 'Варианты.md').write_text('1. Кофейня\n2. Музей\n', encoding='utf-8')
+    assert mod.build_prompt('Alice', 'task_02', cache) != 'rebuilt'
+    monkeypatch.setattr(mod, 'TEMPLATE_DIGEST', 'edited')
+    assert mod.build_prompt('Alice', 'task_02', cache) == 'rebuilt'
+
+
+def test_parse_variants_keeps_multiline_entries():
+    mod = load_module()
+    text = (
+        '# Темы\n\n'
+        'Вступление.\n\n'
+        '1. Кофейня — меню,\n'
+        '   бронь столиков.\n'
+        '   - отзывы\n\n'
+        '   Бонус: доставка.\n'
+        '2. Музей\n\n'
+        'Примечание для всех вариантов.\n'
+        '10. Галерея\n'
+    )
+
+    table = mod.parse_variants(text)
+
+    assert dict(table) == {
+        1: 'Кофейня — меню,\nбронь столиков.\n- отзывы\n\nБонус: доставка.',
+        2: 'Музей',
+        10: 'Галерея',
+    }
+    assert 'Вариант 1: Кофейня — меню,\nбронь столиков.' in mod.assemble_prompt('A', 'task_01', '1', '', text)
@@ -0,0 +1,59 @@
+import os
+import importlib.util
+
+from typer.testing import CliRunner
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/prepare_ai_prompt_for_pr.py')
+    spec = importlib.util.spec_from_file_location('prepare_ai_prompt_for_pr', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_prompts_for_several_prs_in_process(monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    monkeypatch.setattr(mod.subprocess, 'run', lambda *a, **k: (_ for _ in ()).throw(AssertionError('no subprocess')))
+    api = 'https://api.github.com/repos/org/repo'
+    for pr, path in ((1, 'students/VashchukAnatoliy/task_03/index.html'), (2, 'README.md')):
+        requests_mock.get(f'{api}/pulls/{pr}', json={'title': f'PR {pr}'})
+        requests_mock.get(f'{api}/pulls/{pr}/files', json=[{'filename': path, 'status': 'added'}])
+
+    result = CliRunner().invoke(mod.app, ['--pr', '1', '--pr', '2', '--repo', 'org/repo', '--token', 'x'])
+
+    assert result.exit_code == 1
+    expected = mod.prepare_AI_prompt.build_prompt('VashchukAnatoliy', 'task_03').strip()
+    assert f'=== Prepared prompt (PR #1) ===\n\n{expected}\n' in result.output
+    assert 'Failed PRs: 2' in result.output
+
+
+def test_label_queue_prefetch_writes_prompt_files(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    api = 'https://api.github.com/repos/org/repo'
+    requests_mock.get(f'{api}/issues', json=[
+        {'number': 7, 'pull_request': {}},
+        {'number': 8},
+        {'number': 9, 'pull_request': {}},
+    ])
+    for pr in (5, 7, 9):
+        requests_mock.get(f'{api}/pulls/{pr}', json={'title': f'PR {pr}', 'changed_files': 2, 'html_url': f'u/{pr}'})
+        requests_mock.get(f'{api}/pulls/{pr}/files', json=[
+            {'filename': 'students/VashchukAnatoliy/task_02/index.html', 'status': 'added'},
+            {'filename': 'students/VashchukAnatoliy/task_02/style.css', 'status': 'modified'},
+        ])
+    out = tmp_path / 'prompts'
+
+    result = CliRunner().invoke(mod.app, ['--prs', '5,7', '--label-queue', 'rated', '--repo', 'org/repo',
+                                          '--token', 'x', '--out-dir', str(out)])
+
+    assert result.exit_code == 0, result.output
+    assert sorted(p.name for p in out.iterdir()) == ['pr-5.md', 'pr-7.md', 'pr-9.md']
+    text = (out / 'pr-9.md').read_text(encoding='utf-8')
+    assert text.startswith('# PR #9: PR 9')
+    assert '- modified `students/VashchukAnatoliy/task_02/style.css`' in text
+    assert 'Вариант 1:' in text
+    issues = [r for r in requests_mock.request_history if r.path.endswith('/issues')]
+    assert issues[0].qs['labels'] == ['rated']
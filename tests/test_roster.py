@@ -0,0 +1,55 @@
+import os
+import importlib.util
+
+
+def load_roster_module():
+    script = os.path.abspath('.github/scripts/roster.py')
+    spec = importlib.util.spec_from_file_location('roster', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+CSV = (
+    '\ufeffВариант,NameLatin,Directory,Github Username\n'
+    '7,JohnDoe,./students/JohnDoe,@JohnSmith\n'
+    '8,JaneRoe,.\\students\\JaneRoe,https://github.com/jane-roe/\n'
+)
+
+
+def test_lookups_by_github_name_and_directory(tmp_path):
+    roster_mod = load_roster_module()
+    csv_path = tmp_path / 'students.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+
+    roster = roster_mod.load_roster(csv_path, cache_dir=tmp_path / 'cache')
+
+    assert len(roster) == 2
+    assert roster.by_github('johnsmith').name_latin == 'JohnDoe'
+    assert roster.by_github('Jane-Roe').variant == '8'
+    assert roster.by_name_latin('JaneRoe').dir_name == 'JaneRoe'
+    assert roster.by_directory('students/JohnDoe').variant == '7'
+    assert roster.find('JaneRoe').github == 'jane-roe'
+    assert roster.github_directories() == {'johnsmith': './students/JohnDoe', 'jane-roe': '.\\students\\JaneRoe'}
+
+
+def test_snapshot_skips_parsing_on_next_process(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'students.csv'
+    csv_path.write_text(CSV, encoding='utf-8')
+    cache = tmp_path / 'cache'
+    load_roster_module().load_roster(csv_path, cache_dir=cache)
+    assert len(list(cache.glob('roster-*.json'))) == 1
+
+    # a fresh module has an empty in-process memo, so this must come from the snapshot
+    fresh = load_roster_module()
+    monkeypatch.setattr(fresh, 'parse_csv_text', lambda text: (_ for _ in ()).throw(AssertionError('parsed again')))
+    # mtime and size match the snapshot: the CSV is not read (or hashed) at all
+    monkeypatch.setattr(type(csv_path), 'read_bytes', lambda self: (_ for _ in ()).throw(AssertionError('read again')))
+    roster = fresh.load_roster(csv_path, cache_dir=cache)
+    assert roster.by_github('johnsmith').name_latin == 'JohnDoe'
+    monkeypatch.undo()
+
+    # editing the CSV invalidates the snapshot, which is replaced rather than added to
+    csv_path.write_text(CSV + '9,New,./students/New,newbie\n', encoding='utf-8')
+    assert fresh.load_roster(csv_path, cache_dir=cache).by_github('newbie').variant == '9'
+    assert len(list(cache.glob('roster-*.json'))) == 1
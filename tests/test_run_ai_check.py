@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import importlib.util
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/run_ai_check.py')
+    spec = importlib.util.spec_from_file_location('run_ai_check', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_collect_files_sorted_bounded_and_text_only(tmp_path, monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    base = tmp_path / 'students' / 'User' / 'task_01'
+    (base / 'src').mkdir(parents=True)
+    (base / 'node_modules').mkdir()
+    (base / 'src' / 'z.js').write_text('console.log(1)', encoding='utf-8')
+    (base / 'src' / 'bundle.min.js').write_text('я' * 100000, encoding='utf-8')
+    (base / 'a.md').write_text('# readme', encoding='utf-8')
+    (base / 'LICENSE').write_text('MIT', encoding='utf-8')
+    (base / 'blob.bin').write_bytes(b'\xff\xfe\x00\x81' * 10)
+    (base / 'pic.png').write_bytes(b'\x89PNG')
+    (base / 'node_modules' / 'x.js').write_text('ignored', encoding='utf-8')
+
+    files = mod.collect_files('User', 'task_01', limit_bytes_per_file=1000)
+
+    assert [f['name'] for f in files] == ['LICENSE', 'a.md', 'src/bundle.min.js', 'src/z.js']
+    bundle = files[2]['content']
+    assert bundle == 'я' * 1000
+
+    assert len(mod.collect_files('User', 'task_01', limit_files=2)) == 2
+
+
+def test_main_serves_repeat_runs_from_response_cache(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    monkeypatch.delenv('MODEL', raising=False)
+    monkeypatch.delenv('GITHUB_OUTPUT', raising=False)
+    base = tmp_path / 'students' / 'User' / 'task_01'
+    base.mkdir(parents=True)
+    (base / 'index.html').write_text('<html></html>', encoding='utf-8')
+    prompt = tmp_path / 'prompt.txt'
+    prompt.write_text('Grade it', encoding='utf-8')
+    out = tmp_path / 'ai_response.md'
+    cache = tmp_path / 'cache'
+    endpoint = 'https://models.inference.ai.azure.com/v1/chat/completions'
+    requests_mock.post(endpoint, json={'choices': [{'message': {'content': 'Итого: 90 / 100'}}]})
+    argv = ['--student', 'User', '--task', '1', '--prompt-file', str(prompt), '--out', str(out), '--cache-dir', str(cache)]
+
+    assert mod.main(argv) == 0
+    assert mod.main(argv) == 0
+
+    assert out.read_text(encoding='utf-8') == 'Итого: 90 / 100'
+    assert requests_mock.call_count == 1
+
+
+def test_cache_evict_drops_least_recently_used(tmp_path):
+    mod = load_module()
+    for i, key in enumerate(['aa' + '0' * 62, 'bb' + '0' * 62, 'cc' + '0' * 62]):
+        mod.cache_put(tmp_path, key, 'x' * 1000)
+        path = tmp_path / key[:2] / f'{key}.json'
+        os.utime(path, (1000 + i, 1000 + i))
+
+    removed = mod.cache_evict(tmp_path, max_bytes=1500)
+
+    assert removed == 2
+    assert [p.parent.name for p in tmp_path.glob('*/*.json')] == ['cc']
+
+
+def _model_callback(answers):
+    def callback(request, context):
+        model = request.json()['model']
+        status, text = answers[model]
+        context.status_code = status
+        return {'choices': [{'message': {'content': text}}]} if status == 200 else {'error': text}
+    return callback
+
+
+def test_main_falls_back_in_process_and_reports_chosen_model(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    github_output = tmp_path / 'gh_output'
+    monkeypatch.setenv('GITHUB_OUTPUT', str(github_output))
+    monkeypatch.setattr(mod, 'collect_files', lambda *a, **k: [])
+    prompt = tmp_path / 'prompt.txt'
+    prompt.write_text('Grade it', encoding='utf-8')
+    out = tmp_path / 'ai_response.md'
+    answers = {'big': (429, 'rate limited'), 'empty': (200, ''), 'small': (200, 'ok')}
+    requests_mock.post(mod.ENDPOINTS['github'], json=_model_callback(answers))
+
+    rc = mod.main(['--student', 'User', '--task', '1', '--prompt-file', str(prompt), '--out', str(out),
+                   '--models', 'big,empty,small,never'])
+
+    assert rc == 0
+    assert out.read_text(encoding='utf-8') == 'ok'
+    assert [r.json()['model'] for r in requests_mock.request_history] == ['big', 'empty', 'small']
+    assert github_output.read_text(encoding='utf-8') == 'chosen_model=small\n'
+
+
+def test_race_keeps_first_valid_response(requests_mock):
+    mod = load_module()
+    answers = {'a': (500, 'boom'), 'b': (200, 'from b'), 'c': (200, 'from c')}
+    requests_mock.post(mod.ENDPOINTS['github'], json=_model_callback(answers))
+
+    result = mod.run_with_fallback(mod.new_session(), 'github', ['a', 'b', 'c'], 'x', 'prompt', race=2)
+
+    assert result['ok'] and result['model'] == 'b'
+    # 'c' is only a sequential fallback after the raced pair ('a' may still be in flight)
+    assert 'c' not in [r.json()['model'] for r in requests_mock.request_history]
+
+
+def test_pack_prompt_prioritises_source_and_reports_dropped():
+    mod = load_module()
+    files = [
+        {'name': 'doc/readme.md', 'content': 'r' * 700},
+        {'name': 'package-lock.json', 'content': 'l' * 7000},
+        {'name': 'src/app.min.js', 'content': 'm' * 7000},
+        {'name': 'src/index.html', 'content': 'h' * 700},
+        {'name': 'src/styles.css', 'content': 'c' * 700},
+    ]
+
+    packed = mod.pack_prompt('Grade it', files, budget_tokens=1000)
+
+    # included files keep path order; the lockfile only got the leftover budget
+    assert packed['included'] == ['doc/readme.md', 'package-lock.json', 'src/index.html', 'src/styles.css']
+    assert packed['truncated'] == ['package-lock.json']
+    assert packed['dropped'] == ['src/app.min.js']
+    assert packed['estimated_tokens'] <= 1000 + 20  # omitted-files note is outside the budget
+    assert 'src/app.min.js' in packed['prompt'].rsplit('\n', 1)[-1]
+
+    roomy = mod.pack_prompt('Grade it', files, budget_tokens=100000)
+    assert roomy['prompt'] == mod.combine_prompt('Grade it', files)
+
+
+def test_model_context_tokens_uses_longest_prefix():
+    mod = load_module()
+    assert mod.model_context_tokens('phi-3-mini-4k') == 4096
+    assert mod.model_context_tokens('phi-3-mini-128k') == 128000
+    assert mod.model_context_tokens('openai/gpt-4o-mini') == 128000
+    assert mod.model_context_tokens('unknown-model') == mod.DEFAULT_CONTEXT_TOKENS
+
+
+class _SlowSSE:
+    """File-like SSE body; the first read is delayed by `delay` seconds."""
+
+    def __init__(self, deltas, delay=0.0):
+        events = [': keep-alive\n\n'] + [
+            'data: ' + json.dumps({'choices': [{'delta': {'content': d}}]}) + '\n\n' for d in deltas
+        ] + ['data: {"choices": [], "usage": {"completion_tokens": 7}}\n\n', 'data: [DONE]\n\n']
+        self._chunks = [e.encode('utf-8') for e in events]
+        self._delay = delay
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def read(self, amt=None, **kwargs):
+        if self._delay:
+            time.sleep(self._delay)
+            self._delay = 0
+        return self._chunks.pop(0) if self._chunks else b''
+
+
+def test_stream_abandons_slow_first_token_and_writes_metrics(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    monkeypatch.setattr(mod, 'collect_files', lambda *a, **k: [])
+    prompt = tmp_path / 'prompt.txt'
+    prompt.write_text('Check', encoding='utf-8')
+    out = tmp_path / 'ai_response.md'
+    bodies = {'slow': _SlowSSE(['late'], delay=0.3), 'fast': _SlowSSE(['Итого: ', '90 / 100'])}
+
+    def callback(request, context):
+        assert request.json()['stream'] is True
+        context.headers['Content-Type'] = 'text/event-stream'
+        return bodies[request.json()['model']]
+
+    requests_mock.post(mod.ENDPOINTS['github'], body=callback)
+
+    rc = mod.main(['--student', 'User', '--task', '1', '--prompt-file', str(prompt), '--out', str(out),
+                   '--models', 'slow,fast', '--stream', '--first-token-timeout', '0.1'])
+
+    assert rc == 0
+    assert out.read_text(encoding='utf-8') == 'Итого: 90 / 100'
+    metrics = json.loads((tmp_path / 'ai_response.metrics.json').read_text(encoding='utf-8'))
+    assert metrics['chosen_model'] == 'fast'
+    slow, fast = metrics['attempts']
+    assert slow['model'] == 'slow' and slow['ok'] is False
+    assert fast['ok'] is True and fast['stream'] is True
+    assert fast['completion_tokens'] == 7 and not fast['tokens_estimated']
+    assert fast['ttft_seconds'] is not None and fast['ttft_seconds'] <= fast['total_seconds']
+
+
+def test_race_cancels_losing_stream(requests_mock):
+    mod = load_module()
+    slow = _SlowSSE(['never ', 'read'] * 50, delay=0.2)
+    bodies = {'slow': slow, 'fast': _SlowSSE(['Итого: 90 / 100'])}
+
+    def callback(request, context):
+        context.headers['Content-Type'] = 'text/event-stream'
+        return bodies[request.json()['model']]
+
+    requests_mock.post(mod.ENDPOINTS['github'], body=callback)
+
+    result = mod.race_models(mod.new_session(), 'github', ['slow', 'fast'], 'x', 'prompt',
+                             stream=True, first_token_timeout=5, timeout=5)
+
+    assert result['ok'] and result['model'] == 'fast'
+    # the loser's response is closed (by the race, or by the loser itself if its headers
+    # arrive after the winner) long before its body is read through
+    deadline = time.monotonic() + 2
+    while not slow.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slow.closed
+    time.sleep(0.4)
+    assert len(slow._chunks) > 90
+
+
+def test_main_reads_roster_directory_like_sparse_checkout(tmp_path, monkeypatch, requests_mock):
+    mod = load_module()
+    monkeypatch.setattr(mod, 'ROOT', tmp_path)
+    monkeypatch.setenv('GITHUB_TOKEN', 'x')
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    monkeypatch.delenv('GITHUB_OUTPUT', raising=False)
+    (tmp_path / 'students').mkdir()
+    (tmp_path / 'students' / 'students.csv').write_text(
+        'NameLatin,Directory\nIvanovIvan,./students/ivanov-i\n', encoding='utf-8')
+    base = tmp_path / 'students' / 'ivanov-i' / 'task_01'
+    base.mkdir(parents=True)
+    (base / 'index.html').write_text('<h1>mine</h1>', encoding='utf-8')
+    prompt = tmp_path / 'prompt.txt'
+    prompt.write_text('Grade it', encoding='utf-8')
+    requests_mock.post(mod.ENDPOINTS['github'], json={'choices': [{'message': {'content': 'ok'}}]})
+
+    rc = mod.main(['--student', 'IvanovIvan', '--task', '1', '--prompt-file', str(prompt),
+                   '--out', str(tmp_path / 'ai_response.md')])
+
+    assert rc == 0
+    sent = requests_mock.request_history[0].json()['messages'][-1]['content']
+    assert '<h1>mine</h1>' in sent
+    spec = importlib.util.spec_from_file_location('sparse_checkout', os.path.abspath('.github/scripts/sparse_checkout.py'))
+    sparse = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sparse)
+    assert sparse.sparse_patterns('IvanovIvan', 'task_01', root=tmp_path)[-1] == '/students/ivanov-i/task_01/'
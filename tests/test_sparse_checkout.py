@@ -0,0 +1,43 @@
+import os
+import importlib.util
+import subprocess
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/sparse_checkout.py')
+    spec = importlib.util.spec_from_file_location('sparse_checkout', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_parse_name_task_matches_workflow_normalization():
+    mod = load_module()
+    assert mod.parse_name_task('[IvanovIvan][task3]') == ('IvanovIvan', 'task_03')
+    assert mod.parse_name_task(':[LABS][Petrov_P][task_12]') == ('Petrov_P', 'task_12')
+
+
+def test_apply_patterns_checks_out_only_student_task(tmp_path, monkeypatch):
+    mod = load_module()
+    monkeypatch.setenv('ROSTER_CACHE_DIR', '')
+    for rel in ('.github/scripts/x.py', 'tasks/task_03/readme.md', 'students/students.csv',
+                'students/Alice/task_03/index.html', 'students/Alice/task_01/index.html',
+                'students/Bob/task_03/index.html', 'README.md'):
+        p = tmp_path / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text('NameLatin,Directory\nAlice,./students/Alice\n' if rel.endswith('.csv') else rel, encoding='utf-8')
+    git = ['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com']
+    subprocess.run(git + ['init', '-q'], cwd=tmp_path, check=True)
+    subprocess.run(git + ['add', '.'], cwd=tmp_path, check=True)
+    subprocess.run(git + ['commit', '-q', '-m', 'init'], cwd=tmp_path, check=True)
+    assert not mod.is_sparse_checkout(tmp_path)
+
+    patterns = mod.sparse_patterns('Alice', 'task_03', root=tmp_path)
+    mod.apply_patterns(patterns, root=tmp_path)
+
+    rel = [p.relative_to(tmp_path) for p in tmp_path.rglob('*') if p.is_file()]
+    files = sorted(str(p) for p in rel if p.parts[0] != '.git')
+    assert files == ['.github/scripts/x.py', 'students/Alice/task_03/index.html',
+                     'students/students.csv', 'tasks/task_03/readme.md']
+    mod.is_sparse_checkout.cache_clear()
+    assert mod.is_sparse_checkout(tmp_path)
@@ -0,0 +1,39 @@
+import os
+import importlib.util
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location('student_paths', os.path.abspath('.github/scripts/student_paths.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_pairs_are_normalized_distinct_and_ordered():
+    mod = load_module()
+    paths = [
+        'README.md',
+        'students/Petrov/Task_3/src/app.js',
+        './students/Petrov/task_03/index.html',
+        'students/Ivanov/task-12/a.css',
+        'students/Ivanov/notes2.md',           # a file, not a task folder
+        'students/Ivanov/images2/x.png',       # not a task folder
+        'tasks/task_05/README.md',
+    ]
+    assert mod.student_task_pairs(paths) == [('Petrov', 'task_03'), ('Ivanov', 'task_12')]
+    assert mod.student_task_pairs(iter(paths[:1])) == []
+
+
+def test_pairs_on_3000_paths():
+    mod = load_module()
+    paths = mod._sample_paths(3000)
+    pairs = mod.student_task_pairs(paths)
+    assert len(pairs) == len(set(pairs)) == 40
+    assert all(task.startswith('task_') and len(task) == 7 for _, task in pairs)
+
+
+def test_student_from_dir():
+    mod = load_module()
+    assert mod.student_from_dir('./students/IvanovIvan') == 'IvanovIvan'
+    assert mod.student_from_dir('students\\IvanovIvan\\') == 'IvanovIvan'
+    assert mod.student_from_dir(None) == ''
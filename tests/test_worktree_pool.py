@@ -0,0 +1,57 @@
+import os
+import importlib.util
+import subprocess
+
+
+def load_module():
+    script = os.path.abspath('.github/scripts/worktree_pool.py')
+    spec = importlib.util.spec_from_file_location('worktree_pool', script)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _git(cwd, *args):
+    out = subprocess.run(
+        ['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+        cwd=cwd, check=True, capture_output=True, text=True,
+    )
+    return out.stdout.strip()
+
+
+def _commit(repo, name, text):
+    (repo / name).write_text(text, encoding='utf-8')
+    _git(repo, 'add', name)
+    _git(repo, 'commit', '-q', '-m', name)
+    return _git(repo, 'rev-parse', 'HEAD')
+
+
+def test_pool_reuses_updates_and_evicts_lru(tmp_path):
+    mod = load_module()
+    origin = tmp_path / 'origin'
+    origin.mkdir()
+    _git(origin, 'init', '-q')
+    base = _commit(origin, 'README.md', 'base')
+    for pr in (1, 2):
+        _git(origin, 'checkout', '-q', '-b', f'pr{pr}', base)
+        _git(origin, 'update-ref', f'refs/pull/{pr}/head', _commit(origin, f'pr{pr}.txt', 'v1'))
+    clone = tmp_path / 'clone'
+    _git(tmp_path, 'clone', '-q', str(origin), str(clone))
+    (clone / 'dirty.txt').write_text('uncommitted work', encoding='utf-8')
+
+    pool = mod.WorktreePool(repo_root=clone, pool_dir=tmp_path / 'pool', max_worktrees=1)
+
+    first = pool.checkout(1)
+    assert (first / 'pr1.txt').read_text(encoding='utf-8') == 'v1'
+
+    _git(origin, 'checkout', '-q', 'pr1')
+    _git(origin, 'update-ref', 'refs/pull/1/head', _commit(origin, 'pr1.txt', 'v2'))
+    assert pool.checkout(1) == first
+    assert (first / 'pr1.txt').read_text(encoding='utf-8') == 'v2'
+
+    second = pool.checkout(2)
+    assert (second / 'pr2.txt').exists()
+    assert not first.exists()
+    assert pool.worktrees() == [second]
+    assert (clone / 'dirty.txt').exists()
+    assert str(first) not in _git(clone, 'worktree', 'list')